@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Vectorized metric computation for whole batches of influencers.
+
+Computes the derived columns that process_record/process_reel calculate one
+dict at a time (engagement_rate, comment_conversion, follower_quality,
+estimated_cpm, cost_efficiency, follower_tier) in a single NumPy pass over
+columnar arrays. Results match the scalar code exactly, including Python's
+round() and the zero-division fallbacks.
+
+Usage:
+    python batch_metrics.py round_6_db_preview.json             # Re-score in place
+    python batch_metrics.py round_6_db_preview.json rescored.json
+"""
+
+import sys
+import json
+import numpy as np
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+# PostgreSQL integer maximum, same cap as safe_int
+INT_MAX = 2147483647
+
+METRIC_COLUMNS = [
+    'engagement_rate',
+    'comment_conversion',
+    'follower_quality',
+    'estimated_cpm',
+    'cost_efficiency',
+    'follower_tier',
+]
+
+
+def to_int_column(values, default: int = 0, max_val: int = INT_MAX) -> np.ndarray:
+    """Vectorized safe_int: None/NaN/invalid become default, capped at max_val"""
+    out = np.empty(len(values), dtype=np.int64)
+    for i, value in enumerate(values):
+        if value is None or (isinstance(value, float) and value != value):
+            out[i] = default
+            continue
+        try:
+            out[i] = min(int(value), max_val)
+        except (TypeError, ValueError, OverflowError):
+            out[i] = default
+    return out
+
+
+def round2(values: np.ndarray) -> np.ndarray:
+    """
+    Round to 2 decimals exactly like Python's round(x, 2).
+
+    np.round scales by 100 first, which can land on the wrong side of a
+    half-way point. Only values that close to .5 are re-rounded in Python.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    rounded = np.round(values, 2)
+
+    scaled = values * 100
+    near_half = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) < 1e-6
+    for i in np.flatnonzero(near_half):
+        rounded[i] = round(float(values[i]), 2)
+
+    return rounded
+
+
+def follower_tiers(followers: np.ndarray, zero_is_unknown: bool = True) -> np.ndarray:
+    """
+    Vectorized determine_follower_tier.
+
+    The TikTok processors treat 0 followers as "Unknown" (`if not follower_count`);
+    the Instagram processor only does so for None, so pass zero_is_unknown=False.
+    """
+    tiers = np.where(followers < 100_000, "마이크로", "메가").astype(object)
+    if zero_is_unknown:
+        tiers[followers == 0] = "Unknown"
+    return tiers
+
+
+def compute_metrics(plays, likes, comments, shares, followers,
+                    zero_is_unknown: bool = True) -> Dict[str, np.ndarray]:
+    """Compute every derived metric column for a batch in one pass"""
+    plays = np.asarray(plays, dtype=np.int64)
+    likes = np.asarray(likes, dtype=np.int64)
+    comments = np.asarray(comments, dtype=np.int64)
+    shares = np.asarray(shares, dtype=np.int64)
+    followers = np.asarray(followers, dtype=np.int64)
+
+    has_plays = plays > 0
+    has_followers = followers > 0
+    safe_plays = np.where(has_plays, plays, 1)
+    safe_followers = np.where(has_followers, followers, 1)
+
+    engagement_rate = np.where(
+        has_plays, round2((likes + comments + shares) / safe_plays * 100), 0.0)
+    comment_conversion = np.where(
+        has_plays, round2(comments / safe_plays * 100), 0.0)
+    follower_quality = np.where(
+        has_followers, round2((likes + comments) / safe_followers * 100), 0.0)
+
+    estimated_cpm = round2(np.minimum(followers / 1000 * 1.5, 150))
+    cost_efficiency = round2(100 / (estimated_cpm + 1))
+
+    return {
+        'engagement_rate': engagement_rate,
+        'comment_conversion': comment_conversion,
+        'follower_quality': follower_quality,
+        'estimated_cpm': estimated_cpm,
+        'cost_efficiency': cost_efficiency,
+        'follower_tier': follower_tiers(followers, zero_is_unknown),
+    }
+
+
+def columns_from_rows(rows: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """Pull the count columns of normalized rows into NumPy arrays"""
+    return {
+        'plays': to_int_column([r.get('views_count') for r in rows]),
+        'likes': to_int_column([r.get('likes_count') for r in rows]),
+        'comments': to_int_column([r.get('comments_count') for r in rows]),
+        'shares': to_int_column([r.get('shares_count') for r in rows]),
+        'followers': to_int_column([r.get('follower_count') for r in rows]),
+    }
+
+
+def rescore_rows(rows: List[Dict[str, Any]], zero_is_unknown: Optional[bool] = None) -> None:
+    """Recompute the metric columns of normalized rows in place"""
+    if not rows:
+        return
+
+    columns = columns_from_rows(rows)
+    if zero_is_unknown is None:
+        # Instagram rows carry platform='instagram'; TikTok rows have no platform
+        zero_is_unknown = rows[0].get('platform') != 'instagram'
+
+    metrics = compute_metrics(zero_is_unknown=zero_is_unknown, **columns)
+    # tolist() converts back to plain Python floats/str for JSON output
+    metric_lists = {name: metrics[name].tolist() for name in METRIC_COLUMNS}
+
+    for i, row in enumerate(rows):
+        for name in METRIC_COLUMNS:
+            row[name] = metric_lists[name][i]
+
+
+def main():
+    """Re-score a JSON dump of normalized rows (e.g. round_N_db_preview.json)"""
+    if len(sys.argv) < 2:
+        print("Usage: python batch_metrics.py <rows.json> [output.json]")
+        sys.exit(1)
+
+    input_file = sys.argv[1]
+    output_file = sys.argv[2] if len(sys.argv) > 2 else input_file
+
+    print(f"Loading {input_file}...")
+    with open(input_file, 'r', encoding='utf-8') as f:
+        rows = json.load(f)
+    print(f"  Loaded {len(rows)} rows")
+
+    start = datetime.now()
+    rescore_rows(rows)
+    elapsed = (datetime.now() - start).total_seconds()
+    print(f"✓ Re-scored {len(rows)} rows in {elapsed:.2f}s")
+
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(rows, f, indent=2, ensure_ascii=False)
+    print(f"✅ Saved to {output_file}")
+
+
+if __name__ == "__main__":
+    main()
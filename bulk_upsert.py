@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Chunked bulk upsert of influencer rows keyed on account_id.
+
+Instead of a SELECT + UPDATE/INSERT per influencer, each chunk costs two
+PostgREST requests:
+1. One `in.(…)` lookup of which account_ids already exist, and for which author_id
+2. One `upsert(..., on_conflict='account_id')` carrying every row
+
+The returned ids are mapped back to the input rows so callers can split
+their stats into inserted and updated.
+"""
+
+from typing import Any, Dict, Iterator, List
+from normalized_influencer import NormalizedInfluencer
+
+# Keeps the account_id `in.(…)` filter comfortably under URL length limits
+DEFAULT_CHUNK_SIZE = 200
+
+
+def chunked(items: List[Any], size: int) -> Iterator[List[Any]]:
+    """Yield successive slices of at most `size` items"""
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def prepare_row(data: NormalizedInfluencer) -> Dict[str, Any]:
+    """Build the DB payload for a processed record"""
+    row = data.to_row()
+
+    # Ensure required fields
+    if not row.get('author_id'):
+        row['author_id'] = f"unknown_{data.get('account_id', 'unknown')}"
+
+    return row
+
+
+def bulk_upsert_influencers(supabase, rows: List[NormalizedInfluencer],
+                            chunk_size: int = DEFAULT_CHUNK_SIZE,
+                            table: str = 'influencers',
+                            match_author: bool = True) -> List[Dict[str, Any]]:
+    """
+    Upsert processed rows in chunks and return one outcome per input row.
+
+    Each outcome is a dict with 'account_id', 'id' and 'action', where action
+    is 'inserted', 'updated' or 'failed' (failed outcomes carry 'error').
+    When the same account_id appears more than once, the last row wins and
+    later occurrences count as updates, as they would if written one by one.
+
+    The upsert itself can only conflict on account_id. With match_author
+    (the default), a row is only written over an existing one - in the DB or
+    earlier in the chunk - with the same author_id, as the single-row paths
+    match on (author_id, account_id); any other row sharing the account_id
+    is reported as failed instead of overwriting a different influencer.
+    """
+    outcomes: List[Dict[str, Any]] = []
+
+    for chunk in chunked(rows, chunk_size):
+        payloads = [prepare_row(data) for data in chunk]
+        account_ids = list(dict.fromkeys(str(data.get('account_id', '')) for data in chunk))
+
+        try:
+            existing = supabase.table(table).select('account_id,author_id').in_(
+                'account_id', account_ids
+            ).execute()
+            existing_authors = {r['account_id']: str(r.get('author_id')) for r in (existing.data or [])}
+        except Exception as e:
+            outcomes.extend(
+                {'account_id': str(data.get('account_id', '')), 'id': None,
+                 'action': 'failed', 'error': str(e)}
+                for data in chunk
+            )
+            continue
+
+        # Collapse repeated account_ids - Postgres rejects an upsert that
+        # touches the same row twice in one statement
+        payload_by_account: Dict[str, Dict[str, Any]] = {}
+        conflicts: Dict[int, str] = {}
+        authors = dict(existing_authors)
+        for position, (data, payload) in enumerate(zip(chunk, payloads)):
+            account_id = str(data.get('account_id', ''))
+            author_id = str(payload.get('author_id'))
+            if match_author and authors.get(account_id, author_id) != author_id:
+                conflicts[position] = (f"account_id {account_id} already belongs to "
+                                       f"author_id {authors[account_id]}, not {author_id}")
+                continue
+            authors[account_id] = author_id
+            payload_by_account[account_id] = payload
+
+        try:
+            result = supabase.table(table).upsert(
+                list(payload_by_account.values()),
+                on_conflict='account_id'
+            ).execute() if payload_by_account else None
+            returned_ids = {r.get('account_id'): r.get('id') for r in (result.data or [])} if result else {}
+
+        except Exception as e:
+            outcomes.extend(
+                {'account_id': str(data.get('account_id', '')), 'id': None,
+                 'action': 'failed', 'error': conflicts.get(position, str(e))}
+                for position, data in enumerate(chunk)
+            )
+            continue
+
+        seen = set()
+        for position, data in enumerate(chunk):
+            account_id = str(data.get('account_id', ''))
+            if position in conflicts:
+                outcomes.append({'account_id': account_id, 'id': None,
+                                 'action': 'failed', 'error': conflicts[position]})
+                continue
+            if account_id not in returned_ids:
+                outcomes.append({'account_id': account_id, 'id': None,
+                                 'action': 'failed', 'error': 'Upsert returned no data'})
+                continue
+
+            if account_id in existing_authors or account_id in seen:
+                action = 'updated'
+            else:
+                action = 'inserted'
+            seen.add(account_id)
+
+            outcomes.append({'account_id': account_id, 'id': returned_ids[account_id],
+                             'action': action})
+
+    return outcomes
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Durable checkpoint journal for ingestion runs.
+
+One append-only JSON Lines file per input file and scraping round, e.g.
+checkpoints/verish_round_3_round_4.jsonl. Every processed record appends its
+outcome (status, thumbnail key, DB id, content hash). Entries are flushed and
+fsynced as they are written, so a crash loses at most the record in flight.
+
+On restart the journal is replayed into memory. Records whose last entry is
+'done' with an unchanged content hash are skipped without any DB lookup;
+failed or changed records are processed again.
+"""
+
+import os
+import json
+import hashlib
+from pathlib import Path
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+DEFAULT_JOURNAL_DIR = 'checkpoints'
+
+
+def record_key(data: Dict[str, Any]) -> str:
+    """Stable identity of a processed record (author_id + account_id)"""
+    return f"{data.get('author_id', '')}|{data.get('account_id', '')}"
+
+
+def content_hash(data: Dict[str, Any]) -> str:
+    """SHA-256 of a processed record's column values"""
+    payload = json.dumps(dict(data), sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class CheckpointJournal:
+    def __init__(self, input_file: str, scraping_round, journal_dir: str = DEFAULT_JOURNAL_DIR,
+                 resume: bool = True):
+        """
+        Open the journal for an input file and round.
+
+        With resume=False earlier entries are ignored (but kept on disk), so
+        every record is processed again.
+        """
+        journal_dir = Path(journal_dir)
+        journal_dir.mkdir(exist_ok=True)
+        self.path = journal_dir / f"{Path(input_file).stem}_round_{scraping_round}.jsonl"
+
+        # Last entry per record key
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        if resume:
+            self._load()
+
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def _load(self) -> None:
+        """Replay existing entries, ignoring a torn final line from a crash"""
+        if not self.path.exists():
+            return
+
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                self.entries[entry['key']] = entry
+
+    def is_done(self, key: str, digest: Optional[str] = None) -> bool:
+        """True if the record finished successfully with the same content hash"""
+        entry = self.entries.get(key)
+        if not entry or entry.get('status') != 'done':
+            return False
+        return digest is None or entry.get('content_hash') == digest
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the last journal entry for a record"""
+        return self.entries.get(key)
+
+    def record(self, key: str, status: str, **fields) -> None:
+        """Append an outcome ('done' or 'failed') for a record"""
+        entry = {'key': key, 'status': status, **fields,
+                 'at': datetime.now().isoformat(timespec='seconds')}
+        self._file.write(json.dumps(entry, ensure_ascii=False, default=str) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.entries[key] = entry
+
+    def summary(self) -> Dict[str, int]:
+        """Count records by their latest status"""
+        counts: Dict[str, int] = {}
+        for entry in self.entries.values():
+            counts[entry['status']] = counts.get(entry['status'], 0) + 1
+        return counts
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> 'CheckpointJournal':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
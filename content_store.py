@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Content-addressed thumbnail keys for R2.
+
+In content-addressed mode a cover's R2 key is derived from the SHA-256 of
+its image bytes instead of the author's display name:
+
+    thumbnails/sha256/3f/3fa9...c2.jpg
+
+so the same cover is stored once no matter how many rounds (or creators
+with the same display name) reference it, and two different covers can
+never overwrite each other.
+
+ContentIndex remembers which digests are already in which bucket. Before
+uploading, the processors look the digest up for their own bucket and
+reuse the stored key, so only images never seen before cost an R2 PUT.
+Like the fingerprint index it is a small SQLite file at the repository
+root shared by all rounds; rounds writing to different buckets (verish,
+seedlab, ...) never see each other's entries.
+"""
+
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from datetime import datetime
+from typing import Optional
+
+DEFAULT_INDEX_PATH = Path(__file__).resolve().parent / 'thumbnail_digests.sqlite'
+DEFAULT_KEY_PREFIX = 'thumbnails/sha256/'
+
+
+def image_digest(file_path) -> str:
+    """SHA-256 of a file's bytes, read in chunks (or of in-memory bytes)"""
+    if isinstance(file_path, (bytes, bytearray)):
+        return hashlib.sha256(file_path).hexdigest()
+
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def content_key(digest: str, suffix: str = '.jpg', key_prefix: str = DEFAULT_KEY_PREFIX) -> str:
+    """R2 key for a digest, fanned out by its first two hex digits"""
+    return f"{key_prefix}{digest[:2]}/{digest}{suffix}"
+
+
+class ContentIndex:
+    def __init__(self, bucket: str, path=DEFAULT_INDEX_PATH):
+        """Open (or create) the digest → R2 key index of one bucket"""
+        self.bucket = bucket
+        self.path = Path(path)
+        # Pipeline mode calls in from several threads
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        columns = [row[1] for row in self._conn.execute('PRAGMA table_info(digests)')]
+        if columns and 'bucket' not in columns:
+            # Entries from before buckets were recorded can't be attributed to one
+            self._conn.execute('DROP TABLE digests')
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS digests (
+                bucket TEXT NOT NULL,
+                digest TEXT NOT NULL,
+                key TEXT NOT NULL,
+                size INTEGER,
+                uploaded_at TEXT,
+                PRIMARY KEY (bucket, digest)
+            )
+        """)
+        self._conn.commit()
+
+    def get(self, digest: str) -> Optional[str]:
+        """R2 key already holding these bytes in the bucket, if any"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT key FROM digests WHERE bucket = ? AND digest = ?', (self.bucket, digest)
+            ).fetchone()
+        return row[0] if row else None
+
+    def store(self, digest: str, key: str, size: int = None) -> None:
+        """Record that `key` in the bucket now holds the bytes with this digest"""
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO digests VALUES (?, ?, ?, ?, ?)',
+                (self.bucket, digest, key, size, datetime.now().isoformat(timespec='seconds'))
+            )
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                'SELECT COUNT(*) FROM digests WHERE bucket = ?', (self.bucket,)
+            ).fetchone()[0]
+
+    def close(self) -> None:
+        self._conn.close()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Expiry of signed cover URLs.
+
+Scraped cover URLs are signed and stop working after a while:
+
+    TikTok      ...image?dr=9636&x-expires=1758888000&x-signature=...
+    Instagram   ...jpg?...&oe=68D9C0F1          (hex epoch seconds)
+    CloudFront  ...?Expires=1758888000&Signature=...
+    S3 presign  ...?X-Amz-Date=20250926T120000Z&X-Amz-Expires=3600&...
+
+url_expiry reads that deadline out of the query string, so the processors
+can fetch the covers that expire soonest first and recognise already
+expired URLs without spending a request on them. Such rows need a
+re-scrape for a fresh URL, not another download attempt.
+"""
+
+import time
+from datetime import datetime, timezone
+from typing import Callable, Iterable, List, Optional, TypeVar
+from urllib.parse import urlsplit, parse_qs
+
+# URLs expiring within this many seconds are treated as expired already
+DEFAULT_MARGIN = 60
+
+T = TypeVar('T')
+
+
+def url_expiry(url: str) -> Optional[int]:
+    """Epoch seconds at which a signed URL expires (None if it isn't signed)"""
+    if not url:
+        return None
+    query = {k.lower(): v[0] for k, v in parse_qs(urlsplit(url).query).items()}
+
+    try:
+        if 'x-expires' in query:
+            return int(query['x-expires'])
+        if 'oe' in query:
+            return int(query['oe'], 16)
+        if 'expires' in query:
+            return int(query['expires'])
+        if 'x-amz-date' in query and 'x-amz-expires' in query:
+            signed = datetime.strptime(query['x-amz-date'], '%Y%m%dT%H%M%SZ')
+            return int(signed.replace(tzinfo=timezone.utc).timestamp()) + int(query['x-amz-expires'])
+    except ValueError:
+        pass
+    return None
+
+
+def is_expired(url: str, now: float = None, margin: int = DEFAULT_MARGIN) -> bool:
+    """True if the URL's signature has (or is about to) run out"""
+    expiry = url_expiry(url)
+    if expiry is None:
+        return False
+    return expiry <= (time.time() if now is None else now) + margin
+
+
+def by_expiry(items: Iterable[T], url_of: Callable[[T], str]) -> List[T]:
+    """Items ordered soonest-expiring URL first; unsigned URLs keep their order at the end"""
+    def sort_key(item):
+        expiry = url_expiry(url_of(item))
+        return (expiry is None, expiry or 0)
+    return sorted(items, key=sort_key)
+
+
+def format_expiry(url: str) -> str:
+    """Human readable expiry of a URL, for log lines"""
+    expiry = url_expiry(url)
+    if expiry is None:
+        return 'no expiry'
+    return datetime.fromtimestamp(expiry).strftime('%Y-%m-%d %H:%M')
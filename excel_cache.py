@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Cached Excel loading for the round 3/4 workbooks.
+
+pd.read_excel on the scraper workbooks takes seconds, every run. load_excel
+parses a workbook once and keeps a pickled DataFrame (columnar blocks, exact
+dtypes) in a .excel_cache directory next to it. The cache file name includes
+the workbook's size and mtime, so editing or replacing the workbook
+invalidates it automatically.
+
+iter_rows replaces df.iterrows(): rows come out of itertuples as plain dicts
+(optionally only the needed columns), which is much cheaper than building a
+pandas Series per row.
+"""
+
+import pandas as pd
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+CACHE_DIR_NAME = '.excel_cache'
+
+
+def cache_path(file_path) -> Path:
+    """Cache file for the workbook's current size and mtime"""
+    file_path = Path(file_path)
+    st = file_path.stat()
+    return file_path.parent / CACHE_DIR_NAME / f"{file_path.stem}_{st.st_size}_{st.st_mtime_ns}.pkl"
+
+
+def load_excel(file_path, use_cache: bool = True) -> pd.DataFrame:
+    """Read a workbook, from the cached conversion when it is still current"""
+    if not use_cache:
+        return pd.read_excel(file_path)
+
+    cached = cache_path(file_path)
+    if cached.exists():
+        try:
+            return pd.read_pickle(cached)
+        except Exception as e:
+            print(f"  ⚠ Ignoring unreadable Excel cache {cached.name}: {str(e)}")
+
+    df = pd.read_excel(file_path)
+
+    # Drop conversions of older versions of the same workbook
+    cached.parent.mkdir(exist_ok=True)
+    for stale in cached.parent.glob(f"{Path(file_path).stem}_[0-9]*_[0-9]*.pkl"):
+        stale.unlink()
+
+    # Write to a temp name first so an interrupted run never leaves a torn cache
+    tmp = cached.with_suffix('.tmp')
+    df.to_pickle(tmp)
+    tmp.replace(cached)
+    print(f"  ✓ Cached Excel conversion: {cached}")
+    return df
+
+
+def iter_rows(df: pd.DataFrame, columns: Optional[List[str]] = None) -> Iterator[Tuple[Any, Dict[str, Any]]]:
+    """
+    Yield (index, row dict) pairs, like df.iterrows() but without Series.
+
+    With `columns`, only those columns (the ones present in df) are included;
+    row.get() on anything else returns its default, as for a missing column.
+    """
+    if columns is not None:
+        df = df[[c for c in columns if c in df.columns]]
+
+    keys = list(df.columns)
+    for values in df.itertuples(index=True, name=None):
+        yield values[0], dict(zip(keys, values[1:]))
@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""
+Declarative field mappings from scraper exports to influencer rows.
+
+Each source format is described once as a MappingSpec, a list of fields with
+their source path and conversion. The same spec is used by the processors and
+the preview scripts:
+- TIKTOK_JSON      Apify TikTok JSON (nested `authorMeta`, `videoMeta`, ...)
+- TIKTOK_EXCEL     The same export flattened to Excel (`authorMeta/fans` columns)
+- INSTAGRAM_REEL   Instagram reels joined with their owner's profile
+
+compile_mapping() turns a spec into a plain Python function (generated source,
+compiled once) that does every lookup, conversion and metric calculation
+inline and fills a NormalizedInfluencer. Shared lookups are only done once
+per record.
+
+Usage:
+    extract = compile_mapping(TIKTOK_JSON, scraping_round=6)
+    data = extract(record)
+"""
+
+import re
+from collections import namedtuple
+from typing import Any, Callable, Dict, List, Optional
+from normalized_influencer import NormalizedInfluencer, COLUMNS
+
+# PostgreSQL integer maximum
+INT_MAX = 2147483647
+
+EMAIL_PATTERN = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+
+# Metric inputs every spec has to provide
+METRIC_INPUTS = ['views_count', 'likes_count', 'comments_count', 'shares_count', 'follower_count']
+
+
+def is_missing(value) -> bool:
+    """None or NaN/NaT (empty Excel cells)"""
+    return value is None or value != value
+
+
+def safe_int(value, default: int = 0, max_val: int = INT_MAX) -> int:
+    """Convert to int with bounds checking (PostgreSQL integer max is 2147483647)"""
+    if is_missing(value):
+        return default
+    try:
+        return min(int(value), max_val)
+    except (TypeError, ValueError, OverflowError):
+        return default
+
+
+def format_number(num) -> str:
+    """Format number with K, M notation"""
+    if is_missing(num):
+        return '0'
+
+    try:
+        num = int(num)
+    except (TypeError, ValueError, OverflowError):
+        return '0'
+
+    if num >= 1_000_000:
+        return f"{num/1_000_000:.1f}M"
+    elif num >= 1_000:
+        return f"{num/1_000:.1f}K"
+    else:
+        return str(num)
+
+
+def extract_email(text: str) -> Optional[str]:
+    """Extract email from text using regex"""
+    if not text or is_missing(text):
+        return None
+
+    match = EMAIL_PATTERN.search(str(text))
+    if match:
+        return match.group(0).lower()
+    return None
+
+
+# How each conversion is applied to the looked-up value `v`, and the value
+# used when the source key is absent
+CONVERTERS = {
+    'raw': ('{v}', None),
+    'int': ('_safe_int({v})', 0),
+    'formatted': ('_format_number({v})', 0),
+    'str': ('str({v})', ''),
+    # Excel cells are NaN when empty
+    'text': ("('' if _is_missing({v}) else str({v}))", ''),
+    'optional_text': ("(None if _is_missing({v}) else str({v}))", None),
+}
+
+_UNSET = object()
+
+Field = namedtuple('Field', ['column', 'kind', 'path', 'default', 'source'])
+
+MappingSpec = namedtuple('MappingSpec', [
+    'name',             # Used in the generated function name
+    'fields',           # List of Field, in output column order
+    'nested',           # True: 'a/b' walks nested dicts, False: 'a/b' is a flat key
+    'zero_is_unknown',  # Whether 0 followers is tier "Unknown" (else 마이크로)
+    'email_from',       # Column the email is extracted from
+    'defaults',         # Constant columns appended to every row
+])
+
+
+def field(column: str, path, kind: str = 'raw', default=_UNSET, source: str = 'record') -> Field:
+    """
+    Map a source value to a column.
+
+    `path` is a key ('playCount'), a nested path ('authorMeta/fans') or a
+    tuple of paths, in which case the first truthy value is used. `source`
+    names the extractor argument the path is read from.
+    """
+    if kind not in CONVERTERS:
+        raise ValueError(f"Unknown field kind: {kind}")
+    if default is _UNSET:
+        default = CONVERTERS[kind][1]
+    return Field(column, kind, path, default, source)
+
+
+def const(column: str, value) -> Field:
+    """A column with the same value for every record"""
+    return Field(column, 'const', None, value, None)
+
+
+def param(column: str) -> Field:
+    """A column whose value is passed to compile_mapping (e.g. scraping_round)"""
+    return Field(column, 'param', None, None, None)
+
+
+# TikTok fields shared by the JSON and Excel exports (same paths, flattened
+# with '/' in Excel)
+_TIKTOK_COUNTS = [
+    field('shares_count', 'shareCount', 'int'),
+    field('shares_count_formatted', 'shareCount', 'formatted'),
+    field('comments_count', 'commentCount', 'int'),
+    field('comments_count_formatted', 'commentCount', 'formatted'),
+    field('views_count', 'playCount', 'int'),
+    field('views_count_formatted', 'playCount', 'formatted'),
+    field('likes_count', 'diggCount', 'int'),
+    field('likes_count_formatted', 'diggCount', 'formatted'),
+    field('follower_count', 'authorMeta/fans', 'int'),
+    field('follower_count_formatted', 'authorMeta/fans', 'formatted'),
+]
+
+_ROW_DEFAULTS = {
+    'influencer_type': 'regular',
+    'status': 'none',
+    'saved': False,
+}
+
+TIKTOK_JSON = MappingSpec(
+    name='tiktok_json',
+    fields=_TIKTOK_COUNTS + [
+        # Account info
+        field('account_id', 'authorMeta/name', 'str'),  # username
+        field('author_id', 'authorMeta/id', 'str'),
+        field('author_name', 'authorMeta/nickName', 'str'),  # display name
+
+        # Video info
+        field('upload_time', 'createTimeISO'),
+        field('upload_count', 'authorMeta/video', 'int'),
+        field('video_duration', 'videoMeta/duration', 'int'),
+        field('video_caption', 'text', 'str'),
+        field('thumbnail_url', 'videoMeta/coverUrl', 'str'),
+        field('video_url', 'webVideoUrl', 'str'),
+
+        # Music info
+        field('music_artist', 'musicMeta/musicAuthor', 'str'),
+        field('music_title', 'musicMeta/musicName', 'str'),
+
+        # Profile info
+        field('profile_intro', 'authorMeta/signature', 'str'),
+        field('profile_entry', 'authorMeta/profileUrl', 'str'),
+
+        param('scraping_round'),
+    ],
+    nested=True,
+    zero_is_unknown=True,
+    email_from='profile_intro',
+    defaults=_ROW_DEFAULTS,
+)
+
+TIKTOK_EXCEL = MappingSpec(
+    name='tiktok_excel',
+    fields=_TIKTOK_COUNTS + [
+        # Account info - rounds 3/4 were loaded with nickName as the account
+        # key, the opposite of the JSON rounds; kept so existing rows still match
+        field('account_id', 'authorMeta/nickName', 'str'),
+        field('author_id', 'authorMeta/id', 'str'),
+        field('author_name', 'authorMeta/name', 'str'),
+
+        # Video info
+        field('upload_time', 'createTimeISO', 'optional_text'),
+        field('upload_count', 'authorMeta/video', 'int'),
+        field('video_duration', 'videoMeta/duration', 'int'),
+        field('video_caption', 'text', 'text'),
+        field('thumbnail_url', 'videoMeta/coverUrl', 'text'),
+        field('video_url', 'webVideoUrl', 'text'),
+
+        # Music info
+        field('music_artist', 'musicMeta/musicAuthor', 'text'),
+        field('music_title', 'musicMeta/musicName', 'text'),
+
+        # Profile info
+        field('profile_intro', 'authorMeta/signature', 'text'),
+        field('profile_entry', 'authorMeta/profileUrl', 'text'),
+
+        param('scraping_round'),
+    ],
+    nested=False,
+    zero_is_unknown=False,
+    email_from='profile_intro',
+    defaults=_ROW_DEFAULTS,
+)
+
+INSTAGRAM_REEL = MappingSpec(
+    name='instagram_reel',
+    fields=[
+        const('shares_count', 0),
+        const('shares_count_formatted', '0'),
+        field('comments_count', 'commentsCount', 'int'),
+        field('comments_count_formatted', 'commentsCount', 'formatted'),
+        field('views_count', 'videoPlayCount', 'int'),
+        field('views_count_formatted', 'videoPlayCount', 'formatted'),
+        field('likes_count', 'likesCount', 'int'),
+        field('likes_count_formatted', 'likesCount', 'formatted'),
+
+        field('account_id', 'ownerUsername', default=''),
+        field('author_id', 'ownerId', 'str'),
+        field('author_name', ('ownerFullName', 'ownerUsername'), default=''),
+
+        field('upload_time', 'timestamp', default=''),
+        field('video_duration', 'videoDuration', 'int'),
+        field('video_caption', 'caption', default=''),
+        field('video_url', 'url', default=''),
+
+        const('music_artist', ''),
+        const('music_title', ''),
+
+        field('profile_entry', 'inputUrl', default=''),
+
+        param('company'),
+        param('platform'),
+        param('scraping_round'),
+
+        # Profile fields (all zero/empty when the owner has no profile)
+        field('follower_count', 'followersCount', 'int', source='profile'),
+        field('follower_count_formatted', 'followersCount', 'formatted', source='profile'),
+        field('profile_intro', 'biography', default='', source='profile'),
+        field('upload_count', 'postsCount', 'int', source='profile'),
+    ],
+    nested=True,
+    zero_is_unknown=False,
+    email_from='profile_intro',
+    defaults=_ROW_DEFAULTS,
+)
+
+
+def source_keys(spec: MappingSpec, source: str = 'record') -> List[str]:
+    """Top-level keys (Excel column names for flat specs) a spec reads from a source"""
+    keys = []
+    for f in spec.fields:
+        if f.source != source:
+            continue
+        for path in (f.path if isinstance(f.path, tuple) else (f.path,)):
+            key = path.split('/')[0] if spec.nested else path
+            if key not in keys:
+                keys.append(key)
+    return keys
+
+
+def _generate_source(spec: MappingSpec) -> str:
+    """Generate the extractor source for a spec"""
+    sources = []
+    for f in spec.fields:
+        if f.source and f.source not in sources:
+            sources.append(f.source)
+    args = ', '.join(sources[:1] + [f"{s}=None" for s in sources[1:]])
+
+    lines = [f"def extract_{spec.name}({args}):"]
+    for s in sources[1:]:
+        lines.append(f"    if {s} is None: {s} = {{}}")
+
+    names: Dict[Any, str] = {}
+
+    def lookup(source: str, path: str, default) -> str:
+        """Local variable holding source[path], hoisting nested dicts"""
+        parts = path.split('/') if spec.nested else [path]
+        parent = source
+        for depth in range(1, len(parts) + 1):
+            is_leaf = depth == len(parts)
+            key = (source, tuple(parts[:depth]), repr(default) if is_leaf else None)
+            if key not in names:
+                names[key] = f"_v{len(names)}"
+                if is_leaf:
+                    get = f"{parent}.get({parts[-1]!r}, {default!r})"
+                else:
+                    get = f"({parent}.get({parts[depth - 1]!r}) or {{}})"
+                lines.append(f"    {names[key]} = {get}")
+            parent = names[key]
+        return parent
+
+    columns = []
+    for f in spec.fields:
+        if f.kind == 'const':
+            expr = repr(f.default)
+        elif f.kind == 'param':
+            expr = f"_params[{f.column!r}]"
+        else:
+            paths = f.path if isinstance(f.path, tuple) else (f.path,)
+            value = ' or '.join(lookup(f.source, p, f.default) for p in paths)
+            if len(paths) > 1:
+                value = f"({value})"
+            expr = CONVERTERS[f.kind][0].format(v=value)
+        columns.append((f.column, f"c_{f.column}"))
+        lines.append(f"    c_{f.column} = {expr}")
+
+    missing = [c for c in METRIC_INPUTS if f"c_{c}" not in dict(columns).values()]
+    if missing:
+        raise ValueError(f"Mapping {spec.name} is missing metric inputs: {missing}")
+
+    # Metrics, same formulas as batch_metrics.compute_metrics
+    lines += [
+        "    plays = c_views_count",
+        "    likes = c_likes_count",
+        "    comments = c_comments_count",
+        "    followers = c_follower_count",
+        "    if plays > 0:",
+        "        engagement_rate = round((likes + comments + c_shares_count) / plays * 100, 2)",
+        "        comment_conversion = round(comments / plays * 100, 2)",
+        "    else:",
+        "        engagement_rate = 0.0",
+        "        comment_conversion = 0.0",
+        "    follower_quality = round((likes + comments) / followers * 100, 2) if followers > 0 else 0.0",
+        "    estimated_cpm = round(min(followers / 1000 * 1.5, 150), 2)",
+    ]
+    if spec.zero_is_unknown:
+        tier = "'Unknown' if not followers else '마이크로' if followers < 100_000 else '메가'"
+    else:
+        tier = "'마이크로' if followers < 100_000 else '메가'"
+
+    derived = [
+        ('engagement_rate', 'engagement_rate'),
+        ('comment_conversion', 'comment_conversion'),
+        ('follower_quality', 'follower_quality'),
+        ('estimated_cpm', 'estimated_cpm'),
+        ('cost_efficiency', 'round(100 / (estimated_cpm + 1), 2)'),
+        ('follower_tier', tier),
+        ('email', f"_extract_email(c_{spec.email_from})"),
+    ]
+    derived += [(column, repr(value)) for column, value in spec.defaults.items()]
+
+    unknown = [column for column, _ in columns + derived if column not in COLUMNS]
+    if unknown:
+        raise ValueError(f"Mapping {spec.name} has columns NormalizedInfluencer lacks: {unknown}")
+
+    lines.append("    row = _NormalizedInfluencer()")
+    lines += [f"    row.{column} = {name}" for column, name in columns]
+    lines += [f"    row.{column} = {expr}" for column, expr in derived]
+    lines.append("    return row")
+
+    return '\n'.join(lines) + '\n'
+
+
+def compile_mapping(spec: MappingSpec, **params) -> Callable[..., NormalizedInfluencer]:
+    """
+    Compile a spec into an extractor function.
+
+    Keyword arguments supply the spec's param() columns. The extractor takes
+    the record (plus any extra sources, e.g. profile=) and returns a new
+    NormalizedInfluencer.
+    """
+    required = [f.column for f in spec.fields if f.kind == 'param']
+    missing = [column for column in required if column not in params]
+    if missing:
+        raise ValueError(f"Mapping {spec.name} needs values for: {missing}")
+
+    namespace = {
+        '_safe_int': safe_int,
+        '_format_number': format_number,
+        '_extract_email': extract_email,
+        '_is_missing': is_missing,
+        '_NormalizedInfluencer': NormalizedInfluencer,
+        '_params': {column: params[column] for column in required},
+    }
+    source = _generate_source(spec)
+    exec(compile(source, f"<field_mapping {spec.name}>", 'exec'), namespace)
+
+    extractor = namespace[f"extract_{spec.name}"]
+    extractor.source = source
+    return extractor
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Local index of row fingerprints for change detection.
+
+A fingerprint is a SHA-256 of a normalized row's stable columns, i.e.
+everything except the round number and the (re-signed on every scrape)
+thumbnail URLs. After a row has been written to the DB with its thumbnail,
+its fingerprint is stored here by account_id. When a re-run or a later round
+produces the same fingerprint again, the processors skip the thumbnail
+upload and the DB write entirely - once the DB confirms the row still
+exists with the stored r2_thumbnail_url, since the maintenance tools may
+have deleted it or cleared its thumbnail since. Those tools also forget()
+the accounts they touch.
+
+The index is a small SQLite file at the repository root, shared by all
+rounds and safe to use from several worker processes at once.
+"""
+
+import json
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+
+DEFAULT_INDEX_PATH = Path(__file__).resolve().parent / 'row_fingerprints.sqlite'
+
+# Columns that change between scrapes without the influencer data changing
+VOLATILE_COLUMNS = {'id', 'scraping_round', 'thumbnail_url', 'r2_thumbnail_url', 'r2_thumbnail_variants'}
+
+
+def row_fingerprint(data: Dict[str, Any]) -> str:
+    """SHA-256 of a row's stable column values"""
+    stable = {k: v for k, v in data.items() if k not in VOLATILE_COLUMNS}
+    payload = json.dumps(stable, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class FingerprintIndex:
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        """Open (or create) the fingerprint index"""
+        self.path = Path(path)
+        # Pipeline mode calls in from several threads
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS fingerprints (
+                account_id TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                r2_thumbnail_url TEXT,
+                updated_at TEXT
+            )
+        """)
+        self._conn.commit()
+
+    def get(self, account_id: str) -> Optional[Dict[str, Any]]:
+        """Return the stored fingerprint entry for an account"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT fingerprint, r2_thumbnail_url, updated_at FROM fingerprints WHERE account_id = ?',
+                (account_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {'fingerprint': row[0], 'r2_thumbnail_url': row[1], 'updated_at': row[2]}
+
+    def store(self, account_id: str, fingerprint: str, r2_thumbnail_url: str = '') -> None:
+        """Record the fingerprint of a row that was fully written"""
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO fingerprints VALUES (?, ?, ?, ?)',
+                (account_id, fingerprint, r2_thumbnail_url,
+                 datetime.now().isoformat(timespec='seconds'))
+            )
+            self._conn.commit()
+
+    def forget(self, account_ids: Iterable[str]) -> None:
+        """Drop entries whose DB row was deleted or changed outside the processors"""
+        with self._lock:
+            self._conn.executemany(
+                'DELETE FROM fingerprints WHERE account_id = ?',
+                ((str(account_id),) for account_id in account_ids)
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        self._conn.close()
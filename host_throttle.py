@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Adaptive per-host concurrency, retry and circuit breaking.
+
+AdaptiveThrottle wraps calls to a remote host (a CDN for cover downloads,
+R2 for uploads):
+
+- Concurrency per host follows AIMD: every success raises the host's limit
+  by 1/limit (about +1 per round of requests) up to max_limit, and every
+  throttling response (429/5xx, connection error, timeout) halves it.
+- Retryable failures are retried with full-jitter exponential backoff,
+  honouring a Retry-After header when the host sends one.
+- After failure_threshold consecutive failures the host's circuit opens:
+  calls fail immediately with CircuitOpenError for `cooldown` seconds, then
+  a single probe request is let through, which closes the circuit again on
+  success.
+
+Other errors (e.g. 403/404 for an expired or deleted cover) are raised
+right away and are neutral: they don't count against the host, since it
+answered fine, but don't raise its limit either, since the request did no
+useful work.
+
+    throttle = AdaptiveThrottle()
+    content = throttle.call(host, lambda: fetch(url))
+"""
+
+import time
+import random
+import threading
+from typing import Callable, Dict, Optional
+
+import requests
+
+try:
+    from botocore.exceptions import ConnectionError as BotoConnectionError, HTTPClientError
+    _BOTO_TRANSIENT = (BotoConnectionError, HTTPClientError)
+except ImportError:
+    _BOTO_TRANSIENT = ()
+
+# Statuses meaning "slow down / try again", as opposed to a final answer
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+TRANSIENT_ERRORS = (requests.ConnectionError, requests.Timeout,
+                    ConnectionError, TimeoutError) + _BOTO_TRANSIENT
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a host whose circuit is open"""
+
+
+def status_of(error: Exception) -> Optional[int]:
+    """HTTP status behind a requests or botocore error, if there was a response"""
+    response = getattr(error, 'response', None)
+    if isinstance(response, dict):
+        return response.get('ResponseMetadata', {}).get('HTTPStatusCode')
+    return getattr(response, 'status_code', None)
+
+
+def is_retryable(error: Exception) -> bool:
+    """True for throttling/server errors and connection failures"""
+    status = status_of(error)
+    if status is not None:
+        return status in RETRY_STATUSES
+    return isinstance(error, TRANSIENT_ERRORS)
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Seconds requested by a Retry-After header (delta-seconds form only)"""
+    response = getattr(error, 'response', None)
+    if isinstance(response, dict):
+        headers = response.get('ResponseMetadata', {}).get('HTTPHeaders', {})
+    else:
+        headers = getattr(response, 'headers', None) or {}
+    try:
+        return float(headers.get('retry-after') or headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+
+class HostThrottle:
+    def __init__(self, host: str, initial: int, min_limit: int, max_limit: int,
+                 failure_threshold: int, cooldown: float):
+        """Concurrency limit and circuit state of one host"""
+        self.host = host
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+
+        self.in_flight = 0
+        self.failures = 0
+        self.open_until = 0.0
+        self._cond = threading.Condition()
+
+    @property
+    def tripped(self) -> bool:
+        return self.failures >= self.failure_threshold
+
+    def acquire(self) -> None:
+        """Wait for a free slot; raise CircuitOpenError while the host is parked"""
+        with self._cond:
+            while True:
+                remaining = self.open_until - time.monotonic()
+                if remaining > 0:
+                    raise CircuitOpenError(
+                        f"{self.host} parked for {remaining:.0f}s after "
+                        f"{self.failures} consecutive failures"
+                    )
+                # Half-open: only one probe at a time until a call succeeds
+                allowed = 1 if self.tripped else int(self.limit)
+                if self.in_flight < allowed:
+                    self.in_flight += 1
+                    return
+                self._cond.wait(0.5)
+
+    def release(self, healthy: Optional[bool]) -> None:
+        """Free the slot and adapt the limit to the outcome (None: leave the limit as is)"""
+        with self._cond:
+            self.in_flight -= 1
+            if healthy is None:
+                # The host answered, so a failure streak (and an open circuit) ends
+                self.failures = 0
+            elif healthy:
+                self.failures = 0
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            else:
+                self.failures += 1
+                self.limit = max(self.min_limit, self.limit / 2)
+                if self.tripped:
+                    self.open_until = time.monotonic() + self.cooldown
+            self._cond.notify_all()
+
+
+class AdaptiveThrottle:
+    def __init__(self, initial: int = 8, min_limit: int = 1, max_limit: int = 32,
+                 max_retries: int = 4, base_delay: float = 0.5, max_delay: float = 30.0,
+                 failure_threshold: int = 5, cooldown: float = 60.0):
+        """Shared throttle; each host gets its own HostThrottle on first use"""
+        self.initial = initial
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+
+        self._hosts: Dict[str, HostThrottle] = {}
+        self._lock = threading.Lock()
+
+    def host(self, host: str) -> HostThrottle:
+        """Throttle state for a host"""
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = HostThrottle(host, self.initial, self.min_limit, self.max_limit,
+                                                 self.failure_threshold, self.cooldown)
+            return self._hosts[host]
+
+    def backoff(self, attempt: int, error: Exception = None) -> float:
+        """Delay before retry number `attempt` (0-based): Retry-After or full jitter"""
+        requested = retry_after(error) if error is not None else None
+        if requested is not None:
+            return min(requested, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def call(self, host: str, fn: Callable, retries: int = None):
+        """Run fn() against host under its concurrency limit, retrying transient failures"""
+        if retries is None:
+            retries = self.max_retries
+        slot = self.host(host)
+
+        for attempt in range(retries + 1):
+            slot.acquire()
+            try:
+                result = fn()
+            except Exception as e:
+                transient = is_retryable(e)
+                slot.release(healthy=False if transient else None)
+                if not transient or attempt == retries:
+                    raise
+                delay = self.backoff(attempt, e)
+            else:
+                slot.release(healthy=True)
+                return result
+            time.sleep(delay)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Current limit and failure streak per host"""
+        with self._lock:
+            hosts = list(self._hosts.values())
+        return {h.host: {'limit': round(h.limit, 1), 'failures': h.failures} for h in hosts}
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Local read-replica of the influencers table (and its likes/tags).
+
+Dedup, merges and new-record detection each used to page the whole
+influencers table out of Supabase on every run. InfluencerMirror keeps a
+SQLite copy at the repository root instead, and sync() only fetches what
+changed since the last run:
+
+- Tables with a watermark column (influencers.updated_at,
+  influencer_likes.created_at) are keyset-paged by (watermark, id) from the
+  last synced pair, so updates are picked up as well as inserts
+- Tables without one (influencer_tags, which is rewritten rather than
+  updated) are keyset-paged by id from the largest id mirrored
+
+The watermark timestamps come from now(), i.e. when the writing
+transaction started, so a row can commit after a sync has already moved
+past its timestamp. Each sync therefore starts `overlap` seconds (default
+SYNC_OVERLAP) before the saved watermark; re-stored rows are simply
+replaced. Transactions running longer than the overlap can still be
+missed until a fresh mirror is built.
+
+Deletes leave no watermark behind; prune() pulls just the remote ids and
+drops local rows that are gone. The watermark is saved after every page,
+so an interrupted sync resumes where it stopped.
+
+    python3 influencer_mirror.py                 # sync influencers
+    python3 influencer_mirror.py --all --prune   # every table, dropping deleted rows
+
+Tools then read locally:
+
+    mirror = InfluencerMirror()
+    rows = mirror.rows('influencers', columns=('id', 'account_id'))
+    mirror.rows('influencers', where={'account_id': 'kaigrace'})
+
+sql/add_influencers_updated_at_index.sql adds the (updated_at, id) index
+the influencers sync pages by.
+"""
+
+import os
+import sys
+import json
+import sqlite3
+import argparse
+import threading
+from pathlib import Path
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from remove_duplicates_simple import SimpleSupabaseClient, keyset_pages
+
+DEFAULT_MIRROR_PATH = Path(__file__).resolve().parent / 'influencers_mirror.sqlite'
+
+# Mirrored table → watermark column (None: new rows are found by id alone)
+MIRRORED_TABLES = {
+    'influencers': 'updated_at',
+    'influencer_likes': 'created_at',
+    'influencer_tags': None,
+}
+
+# Seconds re-read before the saved watermark, for rows committed late
+SYNC_OVERLAP = 300
+
+# Columns looked up often enough to deserve an index
+INDEXED_COLUMNS = {
+    'influencers': ('account_id', 'author_id'),
+    'influencer_likes': ('influencer_id',),
+    'influencer_tags': ('influencer_id',),
+}
+
+
+class InfluencerMirror:
+    def __init__(self, client: SimpleSupabaseClient = None, path=DEFAULT_MIRROR_PATH):
+        """Open (or create) the mirror; a client is only needed to sync"""
+        self.client = client
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS sync_state (
+                table_name TEXT PRIMARY KEY,
+                watermark TEXT,
+                last_id TEXT,
+                synced_at TEXT
+            )
+        """)
+        for table in MIRRORED_TABLES:
+            # Rows are kept whole as JSON; the id keeps its remote type
+            self._conn.execute(f'CREATE TABLE IF NOT EXISTS "{table}" (id PRIMARY KEY, data TEXT NOT NULL)')
+            for column in INDEXED_COLUMNS.get(table, ()):
+                self._conn.execute(
+                    f'CREATE INDEX IF NOT EXISTS "{table}_{column}" '
+                    f'ON "{table}" (json_extract(data, \'$.{column}\'))'
+                )
+        self._conn.commit()
+
+    def state(self, table: str) -> Dict[str, Any]:
+        """Last synced watermark/id of a table"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT watermark, last_id, synced_at FROM sync_state WHERE table_name = ?', (table,)
+            ).fetchone()
+        if not row:
+            return {'watermark': None, 'last_id': None, 'synced_at': None}
+        last_id = json.loads(row[1]) if row[1] is not None else None
+        return {'watermark': row[0], 'last_id': last_id, 'synced_at': row[2]}
+
+    def _fetch_page(self, table: str, watermark: Optional[str]):
+        """fetch_page for keyset_pages over (watermark, id), or id alone"""
+        def fetch_page(after, limit):
+            params = [('select', '*'), ('limit', limit)]
+            if watermark is None:
+                params.append(('order', 'id'))
+                if after is not None:
+                    params.append(('id', f'gt.{after}'))
+            else:
+                params.append(('order', f'{watermark}.asc.nullsfirst,id.asc'))
+                if after is not None:
+                    mark, last_id = after
+                    if last_id is None:
+                        # Overlap start: everything from the rewound watermark on
+                        params.append((watermark, f'gte.{mark}'))
+                    elif mark is None:
+                        params.append(('or', f'({watermark}.not.is.null,and({watermark}.is.null,id.gt.{last_id}))'))
+                    else:
+                        # Quoted: timestamps contain the ':' and '.' PostgREST splits on
+                        params.append(('or', f'({watermark}.gt."{mark}",'
+                                             f'and({watermark}.eq."{mark}",id.gt.{last_id}))'))
+            return self.client.get(table, params)
+        return fetch_page
+
+    def sync(self, table: str = 'influencers', page_size: int = 1000,
+             overlap: int = SYNC_OVERLAP) -> int:
+        """Fetch rows changed since the last sync (and the overlap before it); returns how many were stored"""
+        if self.client is None:
+            raise ValueError("InfluencerMirror needs a SimpleSupabaseClient to sync")
+        watermark = MIRRORED_TABLES[table]
+        state = self.state(table)
+
+        if watermark is None:
+            after = state['last_id']
+            key = 'id'
+        else:
+            after = (state['watermark'], state['last_id']) if state['last_id'] is not None else None
+            key = (watermark, 'id')
+            if overlap > 0 and after is not None and after[0] is not None:
+                try:
+                    mark = datetime.fromisoformat(after[0].replace('Z', '+00:00'))
+                    after = ((mark - timedelta(seconds=overlap)).isoformat(), None)
+                except ValueError:
+                    pass
+
+        stored = 0
+        for rows in keyset_pages(self._fetch_page(table, watermark), page_size, key=key, after=after):
+            last = rows[-1]
+            with self._lock:
+                self._conn.executemany(
+                    f'INSERT OR REPLACE INTO "{table}" (id, data) VALUES (?, ?)',
+                    [(row['id'], json.dumps(row, ensure_ascii=False)) for row in rows]
+                )
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?, ?)',
+                    (table, last.get(watermark) if watermark else None, json.dumps(last['id']),
+                     datetime.now().isoformat(timespec='seconds'))
+                )
+                self._conn.commit()
+            stored += len(rows)
+            print(f"  {table}: synced {len(rows)} rows (total: {stored})")
+        return stored
+
+    def prune(self, table: str = 'influencers', page_size: int = 10000) -> int:
+        """Drop local rows whose id no longer exists remotely; returns how many"""
+        if self.client is None:
+            raise ValueError("InfluencerMirror needs a SimpleSupabaseClient to prune")
+        remote_ids = []
+        for rows in self.client.iter_pages(table, page_size, columns=('id',)):
+            remote_ids.extend(row['id'] for row in rows)
+
+        with self._lock:
+            self._conn.execute('CREATE TEMP TABLE IF NOT EXISTS remote_ids (id PRIMARY KEY)')
+            self._conn.execute('DELETE FROM remote_ids')
+            self._conn.executemany('INSERT OR IGNORE INTO remote_ids VALUES (?)', ((i,) for i in remote_ids))
+            deleted = self._conn.execute(
+                f'DELETE FROM "{table}" WHERE id NOT IN (SELECT id FROM remote_ids)'
+            ).rowcount
+            self._conn.commit()
+        return deleted
+
+    def forget(self, table: str, ids: Iterable[Any]) -> None:
+        """Drop rows the caller just deleted remotely"""
+        with self._lock:
+            self._conn.executemany(f'DELETE FROM "{table}" WHERE id = ?', ((i,) for i in ids))
+            self._conn.commit()
+
+    def rows(self, table: str = 'influencers', columns: Sequence[str] = None,
+             where: Dict[str, Any] = None) -> List[Dict]:
+        """
+        Mirrored rows in id order, optionally projected to `columns` and
+        filtered on column equality (indexed columns are looked up directly).
+        """
+        sql = f'SELECT data FROM "{table}"'
+        params = []
+        if where:
+            sql += ' WHERE ' + ' AND '.join(f"json_extract(data, '$.{column}') = ?" for column in where)
+            params = list(where.values())
+        with self._lock:
+            found = [json.loads(data) for (data,) in self._conn.execute(sql + ' ORDER BY id', params)]
+        if columns:
+            found = [{column: row.get(column) for column in columns} for row in found]
+        return found
+
+    def get(self, table: str, id) -> Optional[Dict]:
+        """One mirrored row by id"""
+        with self._lock:
+            row = self._conn.execute(f'SELECT data FROM "{table}" WHERE id = ?', (id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def count(self, table: str = 'influencers') -> int:
+        with self._lock:
+            return self._conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def main():
+    """Sync (and optionally prune) the mirror"""
+    parser = argparse.ArgumentParser(
+        description='Sync the local SQLite mirror of the influencers table'
+    )
+    parser.add_argument(
+        'tables',
+        nargs='*',
+        help=f"Tables to sync (default: influencers; one of {', '.join(MIRRORED_TABLES)})"
+    )
+    parser.add_argument(
+        '--all',
+        action='store_true',
+        help='Sync every mirrored table'
+    )
+    parser.add_argument(
+        '--prune',
+        action='store_true',
+        help='Also drop local rows deleted remotely (fetches every remote id)'
+    )
+    parser.add_argument(
+        '--config',
+        default='supabase_config.json',
+        help='Path to Supabase configuration file'
+    )
+
+    args = parser.parse_args()
+
+    tables = list(MIRRORED_TABLES) if args.all else (args.tables or ['influencers'])
+    for table in tables:
+        if table not in MIRRORED_TABLES:
+            print(f"Error: '{table}' is not a mirrored table")
+            sys.exit(1)
+
+    if not os.path.exists(args.config):
+        print(f"Error: Config file '{args.config}' not found!")
+        sys.exit(1)
+    with open(args.config, 'r') as f:
+        config = json.load(f)
+
+    mirror = InfluencerMirror(SimpleSupabaseClient(config['supabase_url'], config['supabase_key']))
+    for table in tables:
+        before = mirror.state(table)['synced_at']
+        print(f"\n🔄 Syncing {table} (last sync: {before or 'never'})...")
+        stored = mirror.sync(table)
+        print(f"✅ {stored} rows fetched (new, changed or re-read), {mirror.count(table)} mirrored")
+        if args.prune:
+            print(f"🧹 Dropped {mirror.prune(table)} rows deleted remotely")
+    mirror.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Asyncio staged ingestion pipeline for the round processors.
+
+Records flow through three stages connected by bounded queues:
+1. Fetch cover image
+2. Upload to Cloudflare R2
+3. Upsert into Supabase
+
+Every stage has its own worker count (and thread pool for the blocking
+requests/boto3/supabase calls), so network round trips overlap instead of
+running back to back for each record.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Optional
+
+# Queue marker telling a stage worker that no more records will arrive
+_DONE = object()
+
+
+class StagedIngestPipeline:
+    def __init__(self, processor, fetch_concurrency: int = 16,
+                 upload_concurrency: int = 8, db_concurrency: int = 4,
+                 queue_size: int = 64):
+        """
+        Wrap a round processor in a staged pipeline.
+
+        The processor must provide process_record, unchanged_accounts, cover_url,
+        download_image, upload_thumbnail, save_record and remember, and
+        keep its counters in `stats`.
+        """
+        self.processor = processor
+        self.fetch_concurrency = fetch_concurrency
+        self.upload_concurrency = upload_concurrency
+        self.db_concurrency = db_concurrency
+        self.queue_size = queue_size
+
+    def _fetch(self, item: Dict[str, Any]) -> None:
+        """Stage 1: download the cover image to the local thumbnails dir"""
+        data = item['data']
+        thumbnail_url = self.processor.cover_url(item['record'], data)
+        if thumbnail_url:
+            item['image_path'] = self.processor.download_image(thumbnail_url, data['author_name'])
+
+    def _upload(self, item: Dict[str, Any]) -> None:
+        """Stage 2: upload the downloaded cover (and its variants) to R2"""
+        self.processor.upload_thumbnail(item.get('image_path'), item['data'])
+
+    def _save(self, item: Dict[str, Any]) -> None:
+        """Stage 3: insert or update the row in Supabase"""
+        if self.processor.save_record(item['data']) is not None:
+            self.processor.remember(item['data'])
+        self.processor.count('processed')
+
+    async def _run_stage(self, handler, inbox: asyncio.Queue,
+                         outbox: Optional[asyncio.Queue], workers: int,
+                         downstream_workers: int = 0) -> None:
+        """Run `workers` copies of a stage until the inbox is drained"""
+        loop = asyncio.get_running_loop()
+
+        async def worker(executor: ThreadPoolExecutor):
+            while True:
+                item = await inbox.get()
+                if item is _DONE:
+                    break
+                try:
+                    await loop.run_in_executor(executor, handler, item)
+                except Exception as e:
+                    # Drop the record from later stages, same as process_batch
+                    print(f"  ✗ Error processing record {item['idx']}: {str(e)}")
+                    self.processor.stats['errors'].append(f"Record {item['idx']} error: {str(e)}")
+                    continue
+                if outbox is not None:
+                    await outbox.put(item)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            await asyncio.gather(*(worker(executor) for _ in range(workers)))
+
+        # Tell every worker of the next stage that this stage is finished
+        if outbox is not None:
+            for _ in range(downstream_workers):
+                await outbox.put(_DONE)
+
+    async def run(self, records: Iterable[Dict[str, Any]], total: Optional[int] = None) -> None:
+        """Push all records through the fetch → upload → upsert stages"""
+        fetch_queue = asyncio.Queue(maxsize=self.queue_size)
+        upload_queue = asyncio.Queue(maxsize=self.queue_size)
+        db_queue = asyncio.Queue(maxsize=self.queue_size)
+
+        stages: List[asyncio.Task] = [
+            asyncio.create_task(self._run_stage(
+                self._fetch, fetch_queue, upload_queue,
+                self.fetch_concurrency, self.upload_concurrency)),
+            asyncio.create_task(self._run_stage(
+                self._upload, upload_queue, db_queue,
+                self.upload_concurrency, self.db_concurrency)),
+            asyncio.create_task(self._run_stage(
+                self._save, db_queue, None, self.db_concurrency)),
+        ]
+
+        loop = asyncio.get_running_loop()
+        numbered = enumerate(records)
+        while True:
+            # Normalize a queue's worth of records so unchanged rows are confirmed in one lookup
+            batch = list(islice(numbered, self.queue_size))
+            if not batch:
+                break
+
+            items = []
+            for idx, record in batch:
+                try:
+                    author_meta = record.get('authorMeta', {})
+                    account_name = author_meta.get('nickName', 'Unknown')
+                    print(f"\n[{idx+1}/{total or '?'}] Queued {account_name}...")
+
+                    items.append({'idx': idx, 'record': record, 'data': self.processor.process_record(record)})
+                except Exception as e:
+                    print(f"  ✗ Error processing record {idx}: {str(e)}")
+                    self.processor.stats['errors'].append(f"Record {idx} error: {str(e)}")
+
+            unchanged = await loop.run_in_executor(
+                None, self.processor.unchanged_accounts, [item['data'] for item in items]
+            )
+
+            for item in items:
+                if item['data']['account_id'] in unchanged:
+                    print(f"  ↷ {item['data']['author_name']} unchanged since last write, skipping")
+                    self.processor.count('unchanged')
+                    continue
+
+                # Blocks here when the fetch stage falls behind (backpressure)
+                await fetch_queue.put(item)
+
+        for _ in range(self.fetch_concurrency):
+            await fetch_queue.put(_DONE)
+
+        await asyncio.gather(*stages)
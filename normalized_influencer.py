@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Compact record type for normalized influencer rows.
+
+NormalizedInfluencer keeps one slot per influencers column instead of a
+per-record dict, which cuts the memory of a normalized row to roughly a
+quarter. It still behaves like a dict (data['account_id'], data.get(...),
+data['r2_thumbnail_url'] = ..., items()), so the processors use it as
+before.
+
+Columns that were never set (e.g. company/platform for TikTok rows) are
+left out of to_row(), the PostgREST payload, exactly as they were absent
+from the old dicts. There is no id slot, so payloads never carry an id.
+"""
+
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator
+
+# Column order of the serialized rows (and of round_N_db_preview.json)
+COLUMNS = (
+    'shares_count',
+    'shares_count_formatted',
+    'comments_count',
+    'comments_count_formatted',
+    'views_count',
+    'views_count_formatted',
+    'likes_count',
+    'likes_count_formatted',
+    'follower_count',
+    'follower_count_formatted',
+    'account_id',
+    'author_id',
+    'author_name',
+    'upload_time',
+    'upload_count',
+    'video_duration',
+    'video_caption',
+    'thumbnail_url',
+    'video_url',
+    'music_artist',
+    'music_title',
+    'profile_intro',
+    'profile_entry',
+    'company',
+    'platform',
+    'scraping_round',
+    'engagement_rate',
+    'comment_conversion',
+    'follower_quality',
+    'estimated_cpm',
+    'cost_efficiency',
+    'follower_tier',
+    'email',
+    'influencer_type',
+    'status',
+    'saved',
+    'r2_thumbnail_url',
+    'r2_thumbnail_variants',
+)
+
+_UNSET = object()
+
+_COLUMN_SET = frozenset(COLUMNS)
+
+
+def _is_column(key: Any) -> bool:
+    """True only for real columns, never for method or dunder names"""
+    return isinstance(key, str) and key in _COLUMN_SET
+
+
+class NormalizedInfluencer(MutableMapping):
+    __slots__ = COLUMNS
+
+    def __init__(self, **values):
+        for column, value in values.items():
+            self[column] = value
+
+    def __getitem__(self, column: str) -> Any:
+        if not _is_column(column):
+            raise KeyError(column)
+        try:
+            return getattr(self, column)
+        except AttributeError:
+            raise KeyError(column) from None
+
+    def __setitem__(self, column: str, value: Any) -> None:
+        if not _is_column(column):
+            raise KeyError(f"Unknown influencer column: {column}")
+        setattr(self, column, value)
+
+    def __delitem__(self, column: str) -> None:
+        if not _is_column(column):
+            raise KeyError(column)
+        try:
+            delattr(self, column)
+        except AttributeError:
+            raise KeyError(column) from None
+
+    def __iter__(self) -> Iterator[str]:
+        for column in COLUMNS:
+            if getattr(self, column, _UNSET) is not _UNSET:
+                yield column
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"NormalizedInfluencer({self.to_row()!r})"
+
+    def to_row(self) -> Dict[str, Any]:
+        """Serialize to the PostgREST JSON payload (set columns only, no id)"""
+        row = {}
+        for column in COLUMNS:
+            value = getattr(self, column, _UNSET)
+            if value is not _UNSET:
+                row[column] = value
+        return row
+
+    # Pickle by value (multiprocessing, caches)
+    def __getstate__(self) -> Dict[str, Any]:
+        return self.to_row()
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        for column, value in state.items():
+            setattr(self, column, value)
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Perceptual-hash index of uploaded covers.
+
+The same creator's cover comes back in every round (and on Instagram)
+re-encoded, resized or recompressed, so byte hashes never match. A dHash
+compares the brightness gradient of a 9x8 grayscale thumbnail instead,
+which survives re-encoding: two copies of the same cover end up a few bits
+apart, different covers about half the 64 bits apart.
+
+PerceptualIndex keeps (dHash → R2 key) for every cover already in a
+bucket. A new cover within max_distance bits of an indexed one reuses its
+key instead of being uploaded again. Only content-addressed keys
+(content_store.content_key) are indexed: they never change content,
+whereas a name key like thumbnails_round_6/<author>.jpg is overwritten by
+that author's next cover. Each bucket has its own entries, so a cover is
+never matched against an object of another bucket.
+
+Build or refresh the index from the thumbnail directories of a bucket
+(see r2_buckets.py). A local file is indexed when the content index knows
+its bytes are stored in that bucket:
+
+    python3 perceptual_index.py --r2-config r2_config_verish.json
+    python3 perceptual_index.py --r2-config r2_config_verish.json verish_data/6th/thumbnails_round_6
+"""
+
+import sys
+import sqlite3
+import threading
+from array import array
+from io import BytesIO
+from pathlib import Path
+from datetime import datetime
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from content_store import ContentIndex, image_digest
+from r2_buckets import bucket_of_config, bucket_of_directory, directories_for_bucket
+
+DEFAULT_INDEX_PATH = Path(__file__).resolve().parent / 'perceptual_hashes.sqlite'
+
+# Bits of 64 two covers may differ in and still count as the same image
+DEFAULT_MAX_DISTANCE = 4
+
+# Number of set bits in every byte value, for a vectorized popcount
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def dhash(source) -> int:
+    """64-bit difference hash of an image (path, file object or bytes)"""
+    if isinstance(source, (bytes, bytearray)):
+        source = BytesIO(source)
+
+    with Image.open(source) as image:
+        # Let the JPEG decoder downscale while decoding; far cheaper than a full decode
+        image.draft('L', (64, 64))
+        pixels = np.asarray(image.convert('L').resize((9, 8), Image.LANCZOS), dtype=np.int16)
+
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int(np.packbits(bits).view('>u8')[0])
+
+
+def hamming(a: int, b: int) -> int:
+    """Number of differing bits between two hashes"""
+    return bin(a ^ b).count('1')
+
+
+class PerceptualIndex:
+    def __init__(self, bucket: str, path=DEFAULT_INDEX_PATH,
+                 max_distance: int = DEFAULT_MAX_DISTANCE):
+        """Open (or create) the index and load the bucket's hashes into memory"""
+        self.bucket = bucket
+        self.path = Path(path)
+        self.max_distance = max_distance
+        # Pipeline mode calls in from several threads
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        columns = [row[1] for row in self._conn.execute('PRAGMA table_info(phashes)')]
+        if columns and 'bucket' not in columns:
+            # Entries from before buckets were recorded point at mutable name keys
+            self._conn.execute('DROP TABLE phashes')
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS phashes (
+                bucket TEXT NOT NULL,
+                key TEXT NOT NULL,
+                dhash TEXT NOT NULL,
+                source TEXT,
+                indexed_at TEXT,
+                PRIMARY KEY (bucket, key)
+            )
+        """)
+        self._conn.commit()
+
+        # Lookups scan an in-memory array of every hash in the bucket
+        self._hashes = array('Q')
+        self._keys = []
+        self._positions = {}
+        for key, hex_hash in self._conn.execute('SELECT key, dhash FROM phashes WHERE bucket = ?', (bucket,)):
+            self._positions[key] = len(self._keys)
+            self._hashes.append(int(hex_hash, 16))
+            self._keys.append(key)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def lookup(self, value: int, max_distance: int = None) -> Optional[Tuple[str, int]]:
+        """(key, distance) of the closest indexed cover within max_distance bits"""
+        if max_distance is None:
+            max_distance = self.max_distance
+
+        with self._lock:
+            if not self._keys:
+                return None
+            hashes = np.frombuffer(self._hashes, dtype=np.uint64)
+            diff = np.bitwise_xor(hashes, np.uint64(value))
+            distances = _POPCOUNT[diff.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+            best = int(distances.argmin())
+            if distances[best] > max_distance:
+                return None
+            return self._keys[best], int(distances[best])
+
+    def add(self, value: int, key: str, source: str = None) -> None:
+        """Index the cover stored at (content-addressed) key in the bucket"""
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO phashes VALUES (?, ?, ?, ?, ?)',
+                (self.bucket, key, f"{value:016x}", source, datetime.now().isoformat(timespec='seconds'))
+            )
+            self._conn.commit()
+            if key in self._positions:
+                self._hashes[self._positions[key]] = value
+            else:
+                self._positions[key] = len(self._keys)
+                self._hashes.append(value)
+                self._keys.append(key)
+
+    def has_source(self, source: str) -> bool:
+        """True if a local file was already indexed for the bucket"""
+        with self._lock:
+            return self._conn.execute(
+                'SELECT 1 FROM phashes WHERE bucket = ? AND source = ?', (self.bucket, source)
+            ).fetchone() is not None
+
+    def build(self, directories: Iterable[Path], content_index: ContentIndex) -> int:
+        """
+        Index every *.jpg of the given thumbnail directories that content_index
+        knows to be stored in the bucket, under its content-addressed key
+        """
+        added = 0
+        for directory in directories:
+            directory = Path(directory)
+            files = sorted(directory.glob('*.jpg'))
+            print(f"\nIndexing {len(files)} covers in {directory}...")
+            for file_path in files:
+                source = str(file_path.resolve())
+                if self.has_source(source):
+                    continue
+                key = content_index.get(image_digest(file_path))
+                if not key:
+                    # Not uploaded content-addressed yet; its name key is mutable
+                    continue
+                try:
+                    self.add(dhash(file_path), key, source)
+                    added += 1
+                except Exception as e:
+                    print(f"  ✗ Could not hash {file_path.name}: {str(e)}")
+        return added
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def main():
+    """Build the bucket's index over the given (or all of its) thumbnail directories"""
+    if '--r2-config' not in sys.argv:
+        print("Usage: python3 perceptual_index.py --r2-config <r2 config> [directory ...]")
+        sys.exit(1)
+    position = sys.argv.index('--r2-config')
+    config_file = sys.argv[position + 1]
+    bucket = bucket_of_config(config_file)
+    if not bucket:
+        print(f"Error: R2 config '{config_file}' not found!")
+        sys.exit(1)
+
+    directories = [Path(a) for i, a in enumerate(sys.argv[1:], start=1)
+                   if not a.startswith('--') and i != position + 1]
+    for directory in directories:
+        if bucket_of_directory(directory) != bucket:
+            print(f"Error: {directory} was not uploaded to bucket '{bucket}'")
+            sys.exit(1)
+    if not directories:
+        directories = directories_for_bucket(bucket)
+
+    content_index = ContentIndex(bucket)
+    index = PerceptualIndex(bucket)
+    added = index.build(directories, content_index)
+    print(f"\n✅ Indexed {added} new covers ({len(index)} total in {bucket}) in {index.path.name}")
+    index.close()
+    content_index.close()
+
+
+if __name__ == "__main__":
+    main()
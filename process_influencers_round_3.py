@@ -11,18 +11,23 @@ import os
 import sys
 import json
 import re
-import requests
 import pandas as pd
 import numpy as np
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
 from supabase import create_client
 import boto3
 from botocore.config import Config
 import time
 import hashlib
+from bulk_upsert import bulk_upsert_influencers, DEFAULT_CHUNK_SIZE
+from checkpoint_journal import CheckpointJournal, record_key, content_hash
+from field_mapping import compile_mapping, source_keys, TIKTOK_EXCEL
+from excel_cache import load_excel, iter_rows
+from thumbnail_fetcher import ThumbnailFetcher
 
 class InfluencerDataProcessor:
     def __init__(self, config_file: str = 'supabase_config.json', r2_config_file: str = 'r2_config.json'):
@@ -36,6 +41,9 @@ class InfluencerDataProcessor:
             supabase_config['supabase_key']
         )
         self.scraping_round = supabase_config.get('scraping_round', 4)
+        self.extract_row = compile_mapping(TIKTOK_EXCEL, scraping_round=self.scraping_round)
+        # Only these workbook columns are read per row
+        self.row_columns = source_keys(TIKTOK_EXCEL)
 
         # Load R2 config
         with open(r2_config_file, 'r') as f:
@@ -54,7 +62,8 @@ class InfluencerDataProcessor:
             region_name='auto',
             config=Config(
                 signature_version='s3v4',
-                retries={'max_attempts': 3}
+                # Retries/backoff are handled by the fetcher's adaptive throttle
+                retries={'total_max_attempts': 1}
             )
         )
 
@@ -62,6 +71,9 @@ class InfluencerDataProcessor:
         self.thumbnails_dir = Path(f'thumbnails_round_{self.scraping_round}')
         self.thumbnails_dir.mkdir(exist_ok=True)
 
+        # Pooled keep-alive session for cover downloads
+        self.fetcher = ThumbnailFetcher()
+
         # Stats tracking
         self.stats = {
             'total': 0,
@@ -69,45 +81,11 @@ class InfluencerDataProcessor:
             'images_downloaded': 0,
             'images_uploaded': 0,
             'db_inserted': 0,
+            'db_updated': 0,
+            'skipped': 0,
             'errors': []
         }
 
-    def format_number(self, num: int) -> str:
-        """Format number with K, M notation"""
-        if pd.isna(num) or num is None:
-            return '0'
-
-        num = int(num)
-        if num >= 1_000_000:
-            return f"{num/1_000_000:.1f}M"
-        elif num >= 1_000:
-            return f"{num/1_000:.1f}K"
-        else:
-            return str(num)
-
-    def extract_email(self, text: str) -> Optional[str]:
-        """Extract email from text using regex"""
-        if pd.isna(text) or not text:
-            return None
-
-        # Common email patterns
-        email_pattern = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
-        match = re.search(email_pattern, str(text))
-
-        if match:
-            return match.group(0).lower()
-        return None
-
-    def determine_follower_tier(self, follower_count: int) -> str:
-        """Determine follower tier (마이크로/메가)"""
-        if pd.isna(follower_count):
-            return "Unknown"
-
-        if follower_count < 100_000:
-            return "마이크로"
-        else:
-            return "메가"
-
     def download_image(self, url: str, account_id: str) -> Optional[Path]:
         """Download image from URL"""
         if pd.isna(url) or not url:
@@ -123,15 +101,12 @@ class InfluencerDataProcessor:
                 print(f"  ✓ Image already exists: {image_path.name}")
                 return image_path
 
-            # Download image
-            response = requests.get(url, timeout=10, headers={
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            })
-            response.raise_for_status()
+            # Download image (pooled keep-alive session)
+            content = self.fetcher.fetch(url)
 
             # Save image
             with open(image_path, 'wb') as f:
-                f.write(response.content)
+                f.write(content)
 
             self.stats['images_downloaded'] += 1
             print(f"  ✓ Downloaded: {image_path.name}")
@@ -150,15 +125,15 @@ class InfluencerDataProcessor:
             key = f"{key_prefix}{file_path.name}"
 
             # Upload to R2
-            self.s3_client.upload_file(
-                str(file_path),
-                self.bucket_name,
-                key,
-                ExtraArgs={
-                    'ContentType': 'image/jpeg',
-                    'CacheControl': 'public, max-age=31536000'
-                }
-            )
+            # Retried with backoff (and parked on repeated failures) by the throttle
+            self.fetcher.throttle.call('r2', partial(
+                self.s3_client.put_object,
+                Bucket=self.bucket_name,
+                Key=key,
+                Body=file_path.read_bytes(),
+                ContentType='image/jpeg',
+                CacheControl='public, max-age=31536000'
+            ))
 
             self.stats['images_uploaded'] += 1
             r2_url = f"{self.thumbnails_base_url}{key}"
@@ -170,115 +145,109 @@ class InfluencerDataProcessor:
             self.stats['errors'].append(f"Upload failed for {file_path.name}: {str(e)}")
             return None
 
-    def process_row(self, row: pd.Series) -> Dict[str, Any]:
+    def process_row(self, row: Dict[str, Any]) -> Dict[str, Any]:
         """Process a single row of data"""
-        # Helper function to safely convert to int with max limit
-        def safe_int(value, default=0, max_val=2147483647):
-            """Convert to int with bounds checking (PostgreSQL integer max is 2147483647)"""
-            if pd.isna(value):
-                return default
-            try:
-                val = int(value)
-                # Cap at PostgreSQL integer maximum
-                return min(val, max_val)
-            except:
-                return default
-
-        # Basic fields mapping
-        data = {
-            # Counts and formatted versions
-            'shares_count': safe_int(row.get('shareCount', 0)),
-            'shares_count_formatted': self.format_number(row.get('shareCount', 0)),
-            'comments_count': safe_int(row.get('commentCount', 0)),
-            'comments_count_formatted': self.format_number(row.get('commentCount', 0)),
-            'views_count': safe_int(row.get('playCount', 0)),
-            'views_count_formatted': self.format_number(row.get('playCount', 0)),
-            'likes_count': safe_int(row.get('diggCount', 0)),
-            'likes_count_formatted': self.format_number(row.get('diggCount', 0)),
-            'follower_count': safe_int(row.get('authorMeta/fans', 0)),
-            'follower_count_formatted': self.format_number(row.get('authorMeta/fans', 0)),
-
-            # Account info
-            'account_id': str(row.get('authorMeta/nickName', '')),
-            'author_id': str(row.get('authorMeta/id', '')),
-            'author_name': str(row.get('authorMeta/name', '')),
-
-            # Video info
-            'upload_time': str(row.get('createTimeISO', '')) if not pd.isna(row.get('createTimeISO')) else None,
-            'upload_count': safe_int(row.get('authorMeta/video', 0)),
-            'video_duration': safe_int(row.get('videoMeta/duration', 0)),
-            'video_caption': str(row.get('text', '')) if not pd.isna(row.get('text')) else '',
-            'thumbnail_url': str(row.get('videoMeta/coverUrl', '')) if not pd.isna(row.get('videoMeta/coverUrl')) else '',
-            'video_url': str(row.get('webVideoUrl', '')) if not pd.isna(row.get('webVideoUrl')) else '',
-
-            # Music info
-            'music_artist': str(row.get('musicMeta/musicAuthor', '')) if not pd.isna(row.get('musicMeta/musicAuthor')) else '',
-            'music_title': str(row.get('musicMeta/musicName', '')) if not pd.isna(row.get('musicMeta/musicName')) else '',
-
-            # Profile info
-            'profile_intro': str(row.get('authorMeta/signature', '')) if not pd.isna(row.get('authorMeta/signature')) else '',
-            'profile_entry': str(row.get('authorMeta/profileUrl', '')) if not pd.isna(row.get('authorMeta/profileUrl')) else '',
-
-            # Scraping info
-            'scraping_round': self.scraping_round
-        }
-
-        # Calculate metrics
-        plays = data['views_count']
-        likes = data['likes_count']
-        comments = data['comments_count']
-        shares = data['shares_count']
-        followers = data['follower_count']
-
-        # Engagement rate
-        if plays > 0:
-            data['engagement_rate'] = round((likes + comments + shares) / plays * 100, 2)
-            data['comment_conversion'] = round(comments / plays * 100, 2)
-        else:
-            data['engagement_rate'] = 0.0
-            data['comment_conversion'] = 0.0
+        return self.extract_row(row)
 
-        # Follower quality
-        if followers > 0:
-            data['follower_quality'] = round((likes + comments) / followers * 100, 2)
-        else:
-            data['follower_quality'] = 0.0
-
-        # Estimated CPM - ensure it's a proper float with 2 decimal places
-        data['estimated_cpm'] = round(min(followers / 1000 * 1.5, 150), 2)
-
-        # Cost efficiency
-        data['cost_efficiency'] = round(100 / (data['estimated_cpm'] + 1), 2)
-
-        # Follower tier
-        data['follower_tier'] = self.determine_follower_tier(followers)
-
-        # Extract email
-        data['email'] = self.extract_email(data['profile_intro'])
+    def save_record(self, data: Dict[str, Any]) -> Optional[Any]:
+        """Insert or update a processed row in the database, returning its ID"""
+        try:
+            # Check if record exists (by author_id AND account_id combination)
+            # This is more accurate as it checks for the exact same influencer
+            existing = self.supabase.table('influencers').select('id').eq('author_id', data['author_id']).eq('account_id', data['account_id']).execute()
+
+            if existing.data and len(existing.data) > 0:
+                # Update existing record
+                print(f"  Found existing record (ID: {existing.data[0]['id']})")
+                update_data = data.to_row()
+                result = self.supabase.table('influencers').update(update_data).eq('id', existing.data[0]['id']).execute()
+                print(f"  ✓ Updated in database (ID: {existing.data[0]['id']})")
+                self.stats['db_inserted'] += 1
+                return existing.data[0]['id']
+            else:
+                # Insert new record - database will auto-generate the ID
+                print(f"  Inserting new record...")
+                # Remove any id field to let database auto-generate it
+                insert_data = data.to_row()
+
+                # Ensure required fields are not null
+                if not insert_data.get('author_id'):
+                    insert_data['author_id'] = f"unknown_{data.get('account_id', 'unknown')}"
+
+                result = self.supabase.table('influencers').insert(insert_data).execute()
+                if result.data and len(result.data) > 0:
+                    new_id = result.data[0].get('id', 'unknown')
+                    print(f"  ✓ Inserted into database (New ID: {new_id})")
+                    self.stats['db_inserted'] += 1
+                    return new_id
+                else:
+                    print(f"  ⚠ Insert returned no data")
 
-        # Set default values for additional fields
-        data['influencer_type'] = 'regular'  # Can be changed based on criteria
-        data['status'] = 'none'
-        data['saved'] = False
+        except Exception as e:
+            print(f"  ✗ Database error: {str(e)}")
+            self.stats['errors'].append(f"DB error for {data['account_id']}: {str(e)}")
 
-        return data
+        return None
 
-    def process_batch(self, df: pd.DataFrame, start_idx: int = 0, batch_size: int = 10) -> None:
-        """Process a batch of records"""
+    def save_records(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Bulk upsert processed rows keyed on account_id, returning one outcome per row"""
+        if not rows:
+            return []
+
+        print(f"\n  Upserting {len(rows)} records in bulk...")
+        outcomes = bulk_upsert_influencers(self.supabase, rows)
+        for outcome in outcomes:
+            if outcome['action'] == 'inserted':
+                self.stats['db_inserted'] += 1
+            elif outcome['action'] == 'updated':
+                self.stats['db_updated'] += 1
+            else:
+                print(f"  ✗ Database error for {outcome['account_id']}: {outcome['error']}")
+                self.stats['errors'].append(f"DB error for {outcome['account_id']}: {outcome['error']}")
+        print(f"  ✓ Bulk upsert done (inserted: {self.stats['db_inserted']}, updated: {self.stats['db_updated']})")
+        return outcomes
+
+    def checkpoint(self, journal: CheckpointJournal, idx, data: Dict[str, Any], digest: str,
+                   db_id, thumbnail_failed: bool) -> None:
+        """Journal the outcome of a row so a restarted run can skip or retry it"""
+        r2_url = data.get('r2_thumbnail_url') or ''
+        thumbnail_key = r2_url[len(self.thumbnails_base_url):] if r2_url.startswith(self.thumbnails_base_url) else None
+        status = 'done' if db_id is not None and not thumbnail_failed else 'failed'
+
+        journal.record(record_key(data), status, row=int(idx), db_id=db_id,
+                       thumbnail_key=thumbnail_key, content_hash=digest)
+
+    def process_batch(self, df: pd.DataFrame, start_idx: int = 0, batch_size: int = 10,
+                      bulk: bool = False, journal: Optional[CheckpointJournal] = None) -> None:
+        """
+        Process a batch of records.
+
+        With a checkpoint journal, rows already finished with the same content
+        are skipped without touching the network, and every outcome is journaled.
+        """
         end_idx = min(start_idx + batch_size, len(df))
         batch_df = df.iloc[start_idx:end_idx]
+        pending_rows = []
 
         print(f"\nProcessing batch {start_idx+1}-{end_idx} of {len(df)} records...")
 
-        for idx, row in batch_df.iterrows():
+        for idx, row in iter_rows(batch_df, self.row_columns):
             try:
                 print(f"\n[{idx+1}/{len(df)}] Processing {row.get('authorMeta/nickName', 'Unknown')}...")
 
                 # Process row data
                 data = self.process_row(row)
 
+                # Skip rows the journal has already finished
+                digest = content_hash(data)
+                if journal and journal.is_done(record_key(data), digest):
+                    print(f"  ↷ Already done (ID: {journal.get(record_key(data)).get('db_id')}), skipping")
+                    self.stats['skipped'] += 1
+                    continue
+
                 # Download and upload thumbnail
                 thumbnail_url = row.get('videoMeta/coverUrl')
+                thumbnail_failed = False
                 if thumbnail_url and not pd.isna(thumbnail_url):
                     image_path = self.download_image(thumbnail_url, data['account_id'])
                     if image_path:
@@ -286,54 +255,32 @@ class InfluencerDataProcessor:
                         data['r2_thumbnail_url'] = r2_url or ''
                     else:
                         data['r2_thumbnail_url'] = ''
+                    thumbnail_failed = not data['r2_thumbnail_url']
                 else:
                     data['r2_thumbnail_url'] = ''
 
-                # Insert into database
-                try:
-                    # Check if record exists (by author_id AND account_id combination)
-                    # This is more accurate as it checks for the exact same influencer
-                    existing = self.supabase.table('influencers').select('id').eq('author_id', data['author_id']).eq('account_id', data['account_id']).execute()
-
-                    if existing.data and len(existing.data) > 0:
-                        # Update existing record
-                        print(f"  Found existing record (ID: {existing.data[0]['id']})")
-                        update_data = {k: v for k, v in data.items() if k != 'id'}
-                        result = self.supabase.table('influencers').update(update_data).eq('id', existing.data[0]['id']).execute()
-                        print(f"  ✓ Updated in database (ID: {existing.data[0]['id']})")
-                        self.stats['db_inserted'] += 1
-                    else:
-                        # Insert new record - database will auto-generate the ID
-                        print(f"  Inserting new record...")
-                        # Remove any id field to let database auto-generate it
-                        insert_data = {k: v for k, v in data.items() if k != 'id'}
-
-                        # Ensure required fields are not null
-                        if not insert_data.get('author_id'):
-                            insert_data['author_id'] = f"unknown_{data.get('account_id', 'unknown')}"
-
-                        result = self.supabase.table('influencers').insert(insert_data).execute()
-                        if result.data and len(result.data) > 0:
-                            new_id = result.data[0].get('id', 'unknown')
-                            print(f"  ✓ Inserted into database (New ID: {new_id})")
-                            self.stats['db_inserted'] += 1
-                        else:
-                            print(f"  ⚠ Insert returned no data")
-
-                except Exception as e:
-                    print(f"  ✗ Database error: {str(e)}")
-                    self.stats['errors'].append(f"DB error for {data['account_id']}: {str(e)}")
+                # Insert into database (deferred to one upsert per batch in bulk mode)
+                if bulk:
+                    pending_rows.append((idx, data, digest, thumbnail_failed))
+                else:
+                    db_id = self.save_record(data)
+                    if journal:
+                        self.checkpoint(journal, idx, data, digest, db_id, thumbnail_failed)
 
                 self.stats['processed'] += 1
 
-                # Small delay to avoid rate limiting
-                time.sleep(0.5)
-
             except Exception as e:
                 print(f"  ✗ Error processing row {idx}: {str(e)}")
                 self.stats['errors'].append(f"Row {idx} error: {str(e)}")
 
-    def process_excel_file(self, file_path: str, test_mode: bool = False):
+        if bulk:
+            outcomes = self.save_records([data for _, data, _, _ in pending_rows])
+            if journal:
+                for (idx, data, digest, thumbnail_failed), outcome in zip(pending_rows, outcomes):
+                    self.checkpoint(journal, idx, data, digest, outcome['id'], thumbnail_failed)
+
+    def process_excel_file(self, file_path: str, test_mode: bool = False, bulk: bool = False,
+                           resume: bool = True):
         """Main processing function"""
         print("=" * 60)
         print("Influencer Data Processor")
@@ -341,7 +288,7 @@ class InfluencerDataProcessor:
 
         # Read Excel file
         print(f"\nReading Excel file: {file_path}")
-        df = pd.read_excel(file_path)
+        df = load_excel(file_path)
         self.stats['total'] = len(df)
 
         print(f"Found {len(df)} records to process")
@@ -350,10 +297,12 @@ class InfluencerDataProcessor:
             print("\n⚠️  TEST MODE: Processing only first 5 records")
             df = df.head(5)
 
-        # Process in batches
-        batch_size = 10
-        for i in range(0, len(df), batch_size):
-            self.process_batch(df, i, batch_size)
+        # Process in batches (bulk mode writes each batch with one upsert)
+        batch_size = DEFAULT_CHUNK_SIZE if bulk else 10
+        with CheckpointJournal(file_path, self.scraping_round, resume=resume) as journal:
+            print(f"📒 Checkpoint journal: {journal.path} ({journal.summary().get('done', 0)} records done)")
+            for i in range(0, len(df), batch_size):
+                self.process_batch(df, i, batch_size, bulk=bulk, journal=journal)
 
         # Print summary
         print("\n" + "=" * 60)
@@ -361,9 +310,10 @@ class InfluencerDataProcessor:
         print("=" * 60)
         print(f"Total records: {self.stats['total']}")
         print(f"Processed: {self.stats['processed']}")
+        print(f"Skipped (already done): {self.stats['skipped']}")
         print(f"Images downloaded: {self.stats['images_downloaded']}")
         print(f"Images uploaded to R2: {self.stats['images_uploaded']}")
-        print(f"Database records inserted/updated: {self.stats['db_inserted']}")
+        print(f"Database records inserted/updated: {self.stats['db_inserted'] + self.stats['db_updated']}")
 
         if self.stats['errors']:
             print(f"\n⚠️  Errors encountered: {len(self.stats['errors'])}")
@@ -384,9 +334,12 @@ def main():
 
     # Check if test mode
     test_mode = '--test' in sys.argv
+    bulk = '--bulk' in sys.argv
+    # Ignore the checkpoint journal and reprocess everything
+    resume = '--fresh' not in sys.argv
 
     # Process the Excel file
-    processor.process_excel_file('verish_round_3.xlsx', test_mode=test_mode)
+    processor.process_excel_file('verish_round_3.xlsx', test_mode=test_mode, bulk=bulk, resume=resume)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
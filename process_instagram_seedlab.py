@@ -13,15 +13,17 @@ import os
 import sys
 import json
 import re
-import requests
-import numpy as np
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Optional, Any
+from functools import partial
 from supabase import create_client
 import boto3
 from botocore.config import Config
 import time
+from bulk_upsert import bulk_upsert_influencers
+from field_mapping import compile_mapping, INSTAGRAM_REEL
+from thumbnail_fetcher import ThumbnailFetcher
 
 class InstagramDataProcessor:
     def __init__(self, config_file: str = 'supabase_config.json', r2_config_file: str = 'r2_config_seedlab.json'):
@@ -52,7 +54,8 @@ class InstagramDataProcessor:
             region_name='auto',
             config=Config(
                 signature_version='s3v4',
-                retries={'max_attempts': 3}
+                # Retries/backoff are handled by the fetcher's adaptive throttle
+                retries={'total_max_attempts': 1}
             )
         )
 
@@ -60,10 +63,15 @@ class InstagramDataProcessor:
         self.thumbnails_dir = Path('thumbnails_instagram_round_1')
         self.thumbnails_dir.mkdir(exist_ok=True)
 
+        # Pooled keep-alive session for cover downloads
+        self.fetcher = ThumbnailFetcher()
+
         # Company and platform
         self.company = 'seedlab'
         self.platform = 'instagram'
         self.scraping_round = '1'
+        self.extract_reel = compile_mapping(INSTAGRAM_REEL, scraping_round=self.scraping_round,
+                                            company=self.company, platform=self.platform)
 
         # Stats tracking
         self.stats = {
@@ -74,45 +82,11 @@ class InstagramDataProcessor:
             'images_downloaded': 0,
             'images_uploaded': 0,
             'db_inserted': 0,
+            'db_updated': 0,
             'errors': [],
             'missing_profiles': []
         }
 
-    def format_number(self, num) -> str:
-        """Format number with K, M notation"""
-        if num is None or (isinstance(num, float) and np.isnan(num)):
-            return '0'
-
-        num = int(num)
-        if num >= 1_000_000:
-            return f"{num/1_000_000:.1f}M"
-        elif num >= 1_000:
-            return f"{num/1_000:.1f}K"
-        else:
-            return str(num)
-
-    def extract_email(self, text: str) -> Optional[str]:
-        """Extract email from text using regex"""
-        if not text:
-            return None
-
-        email_pattern = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
-        match = re.search(email_pattern, str(text))
-
-        if match:
-            return match.group(0).lower()
-        return None
-
-    def determine_follower_tier(self, follower_count: int) -> str:
-        """Determine follower tier (마이크로/메가)"""
-        if follower_count is None:
-            return "Unknown"
-
-        if follower_count < 100_000:
-            return "마이크로"
-        else:
-            return "메가"
-
     def download_image(self, url: str, username: str) -> Optional[Path]:
         """Download image from URL"""
         if not url:
@@ -126,13 +100,10 @@ class InstagramDataProcessor:
                 print(f"  ✓ Image already exists: {image_path.name}")
                 return image_path
 
-            response = requests.get(url, timeout=10, headers={
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            })
-            response.raise_for_status()
+            content = self.fetcher.fetch(url)
 
             with open(image_path, 'wb') as f:
-                f.write(response.content)
+                f.write(content)
 
             self.stats['images_downloaded'] += 1
             print(f"  ✓ Downloaded: {image_path.name}")
@@ -148,15 +119,15 @@ class InstagramDataProcessor:
         try:
             key = f"thumbnails_instagram_round_1/{file_path.name}"
 
-            self.s3_client.upload_file(
-                str(file_path),
-                self.bucket_name,
-                key,
-                ExtraArgs={
-                    'ContentType': 'image/jpeg',
-                    'CacheControl': 'public, max-age=31536000'
-                }
-            )
+            # Retried with backoff (and parked on repeated failures) by the throttle
+            self.fetcher.throttle.call('r2', partial(
+                self.s3_client.put_object,
+                Bucket=self.bucket_name,
+                Key=key,
+                Body=file_path.read_bytes(),
+                ContentType='image/jpeg',
+                CacheControl='public, max-age=31536000'
+            ))
 
             self.stats['images_uploaded'] += 1
             r2_url = f"{self.thumbnails_base_url}{key}"
@@ -168,99 +139,66 @@ class InstagramDataProcessor:
             self.stats['errors'].append(f"Upload failed for {file_path.name}: {str(e)}")
             return None
 
-    def safe_int(self, value, default=0, max_val=2147483647):
-        """Convert to int with bounds checking"""
-        if value is None or (isinstance(value, float) and np.isnan(value)):
-            return default
-        try:
-            val = int(value)
-            return min(val, max_val)
-        except:
-            return default
-
     def process_reel(self, reel: Dict, profile: Optional[Dict]) -> Dict[str, Any]:
         """Process a single reel with optional profile data"""
+        data = self.extract_reel(reel, profile)
 
-        username = reel.get('ownerUsername', '')
-        author_name = reel.get('ownerFullName', '') or username
-        author_id = str(reel.get('ownerId', ''))
-
-        data = {
-            'shares_count': 0,
-            'shares_count_formatted': '0',
-            'comments_count': self.safe_int(reel.get('commentsCount', 0)),
-            'comments_count_formatted': self.format_number(reel.get('commentsCount', 0)),
-            'views_count': self.safe_int(reel.get('videoPlayCount', 0)),
-            'views_count_formatted': self.format_number(reel.get('videoPlayCount', 0)),
-            'likes_count': self.safe_int(reel.get('likesCount', 0)),
-            'likes_count_formatted': self.format_number(reel.get('likesCount', 0)),
-
-            'account_id': username,
-            'author_id': author_id,
-            'author_name': author_name,
-
-            'upload_time': reel.get('timestamp', ''),
-            'video_duration': self.safe_int(reel.get('videoDuration', 0)),
-            'video_caption': reel.get('caption', ''),
-            'video_url': reel.get('url', ''),
-
-            'music_artist': '',
-            'music_title': '',
-
-            'profile_entry': reel.get('inputUrl', ''),
-
-            'company': self.company,
-            'platform': self.platform,
-            'scraping_round': self.scraping_round,
-        }
-
-        # Add profile data if available
         if profile:
-            data['follower_count'] = self.safe_int(profile.get('followersCount', 0))
-            data['follower_count_formatted'] = self.format_number(profile.get('followersCount', 0))
-            data['profile_intro'] = profile.get('biography', '')
-            data['upload_count'] = self.safe_int(profile.get('postsCount', 0))
-            data['email'] = self.extract_email(profile.get('biography', ''))
             self.stats['matched_profiles'] += 1
         else:
-            data['follower_count'] = 0
-            data['follower_count_formatted'] = '0'
-            data['profile_intro'] = ''
-            data['upload_count'] = 0
-            data['email'] = None
-            self.stats['missing_profiles'].append(username)
-            print(f"  ⚠️  No profile data found for {username}")
-
-        # Calculate metrics
-        plays = data['views_count']
-        likes = data['likes_count']
-        comments = data['comments_count']
-        shares = data['shares_count']
-        followers = data['follower_count']
-
-        if plays > 0:
-            data['engagement_rate'] = round((likes + comments + shares) / plays * 100, 2)
-            data['comment_conversion'] = round(comments / plays * 100, 2)
-        else:
-            data['engagement_rate'] = 0.0
-            data['comment_conversion'] = 0.0
-
-        if followers > 0:
-            data['follower_quality'] = round((likes + comments) / followers * 100, 2)
-        else:
-            data['follower_quality'] = 0.0
-
-        data['estimated_cpm'] = round(min(followers / 1000 * 1.5, 150), 2)
-        data['cost_efficiency'] = round(100 / (data['estimated_cpm'] + 1), 2)
-        data['follower_tier'] = self.determine_follower_tier(followers)
-
-        data['influencer_type'] = 'regular'
-        data['status'] = 'none'
-        data['saved'] = False
+            self.stats['missing_profiles'].append(data['account_id'])
+            print(f"  ⚠️  No profile data found for {data['account_id']}")
 
         return data
 
-    def process_data(self, reels_file: str, profiles_file: str, test_mode: bool = False):
+    def save_record(self, data: Dict[str, Any]) -> None:
+        """Insert or update a processed reel in the database"""
+        try:
+            existing = self.supabase.table('influencers').select('id').eq('author_id', data['author_id']).eq('account_id', data['account_id']).execute()
+
+            if existing.data and len(existing.data) > 0:
+                print(f"  Found existing record (ID: {existing.data[0]['id']})")
+                update_data = data.to_row()
+                result = self.supabase.table('influencers').update(update_data).eq('id', existing.data[0]['id']).execute()
+                print(f"  ✓ Updated in database (ID: {existing.data[0]['id']})")
+                self.stats['db_inserted'] += 1
+            else:
+                print(f"  Inserting new record...")
+                insert_data = data.to_row()
+
+                if not insert_data.get('author_id'):
+                    insert_data['author_id'] = f"unknown_{data.get('account_id', 'unknown')}"
+
+                result = self.supabase.table('influencers').insert(insert_data).execute()
+                if result.data and len(result.data) > 0:
+                    new_id = result.data[0].get('id', 'unknown')
+                    print(f"  ✓ Inserted into database (New ID: {new_id})")
+                    self.stats['db_inserted'] += 1
+                else:
+                    print(f"  ⚠ Insert returned no data")
+
+        except Exception as e:
+            print(f"  ✗ Database error: {str(e)}")
+            self.stats['errors'].append(f"DB error for {data['account_id']}: {str(e)}")
+
+    def save_records(self, rows: List[Dict[str, Any]]) -> None:
+        """Bulk upsert processed reels keyed on account_id"""
+        if not rows:
+            return
+
+        print(f"\nUpserting {len(rows)} records in bulk...")
+        for outcome in bulk_upsert_influencers(self.supabase, rows):
+            if outcome['action'] == 'inserted':
+                self.stats['db_inserted'] += 1
+            elif outcome['action'] == 'updated':
+                self.stats['db_updated'] += 1
+            else:
+                print(f"  ✗ Database error for @{outcome['account_id']}: {outcome['error']}")
+                self.stats['errors'].append(f"DB error for {outcome['account_id']}: {outcome['error']}")
+        print(f"  ✓ Bulk upsert done (inserted: {self.stats['db_inserted']}, updated: {self.stats['db_updated']})")
+
+    def process_data(self, reels_file: str, profiles_file: str, test_mode: bool = False,
+                     bulk: bool = False):
         """Main processing function"""
         print("=" * 60)
         print("Instagram Data Processor - Seedlab")
@@ -288,6 +226,7 @@ class InstagramDataProcessor:
             reels = reels[:3]
 
         # Process each reel
+        pending_rows = []
         for idx, reel in enumerate(reels):
             try:
                 username = reel.get('ownerUsername', 'Unknown')
@@ -314,42 +253,21 @@ class InstagramDataProcessor:
                     data['r2_thumbnail_url'] = ''
                     data['thumbnail_url'] = ''
 
-                # Insert into database
-                try:
-                    existing = self.supabase.table('influencers').select('id').eq('author_id', data['author_id']).eq('account_id', data['account_id']).execute()
-
-                    if existing.data and len(existing.data) > 0:
-                        print(f"  Found existing record (ID: {existing.data[0]['id']})")
-                        update_data = {k: v for k, v in data.items() if k != 'id'}
-                        result = self.supabase.table('influencers').update(update_data).eq('id', existing.data[0]['id']).execute()
-                        print(f"  ✓ Updated in database (ID: {existing.data[0]['id']})")
-                        self.stats['db_inserted'] += 1
-                    else:
-                        print(f"  Inserting new record...")
-                        insert_data = {k: v for k, v in data.items() if k != 'id'}
-
-                        if not insert_data.get('author_id'):
-                            insert_data['author_id'] = f"unknown_{data.get('account_id', 'unknown')}"
-
-                        result = self.supabase.table('influencers').insert(insert_data).execute()
-                        if result.data and len(result.data) > 0:
-                            new_id = result.data[0].get('id', 'unknown')
-                            print(f"  ✓ Inserted into database (New ID: {new_id})")
-                            self.stats['db_inserted'] += 1
-                        else:
-                            print(f"  ⚠ Insert returned no data")
-
-                except Exception as e:
-                    print(f"  ✗ Database error: {str(e)}")
-                    self.stats['errors'].append(f"DB error for {username}: {str(e)}")
+                # Insert into database (deferred to bulk upserts in bulk mode)
+                if bulk:
+                    pending_rows.append(data)
+                else:
+                    self.save_record(data)
 
                 self.stats['processed'] += 1
-                time.sleep(0.5)
 
             except Exception as e:
                 print(f"  ✗ Error processing reel {idx}: {str(e)}")
                 self.stats['errors'].append(f"Reel {idx} error: {str(e)}")
 
+        if bulk:
+            self.save_records(pending_rows)
+
         # Print summary
         print("\n" + "=" * 60)
         print("PROCESSING COMPLETE")
@@ -361,7 +279,7 @@ class InstagramDataProcessor:
         print(f"Processed: {self.stats['processed']}")
         print(f"Images downloaded: {self.stats['images_downloaded']}")
         print(f"Images uploaded to R2: {self.stats['images_uploaded']}")
-        print(f"Database records inserted/updated: {self.stats['db_inserted']}")
+        print(f"Database records inserted/updated: {self.stats['db_inserted'] + self.stats['db_updated']}")
 
         if self.stats['missing_profiles']:
             print(f"\n⚠️  Users without profile data ({len(self.stats['missing_profiles'])}):")
@@ -386,11 +304,12 @@ def main():
     processor = InstagramDataProcessor()
 
     test_mode = '--test' in sys.argv
+    bulk = '--bulk' in sys.argv
 
     reels_file = 'seedlab_data/1st_31.json'
     profiles_file = 'seedlab_data/1st_27_profile.json'
 
-    processor.process_data(reels_file, profiles_file, test_mode=test_mode)
+    processor.process_data(reels_file, profiles_file, test_mode=test_mode, bulk=bulk)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -6,21 +6,32 @@ Process NEW records from Excel that aren't already in database
 import sys
 import pandas as pd
 from process_influencers_round_3 import InfluencerDataProcessor
+from bulk_upsert import bulk_upsert_influencers, chunked, DEFAULT_CHUNK_SIZE
+from checkpoint_journal import CheckpointJournal, record_key, content_hash
+from excel_cache import load_excel, iter_rows
 
-def find_new_records(processor, df):
+def find_new_records(processor, df, chunk_size=DEFAULT_CHUNK_SIZE):
     """Find records that don't exist in database"""
     new_records = []
 
     print("🔍 Checking for new records...")
 
-    for idx, row in df.iterrows():
-        author_id = str(row.get('authorMeta/id', ''))
-        account_id = str(row.get('authorMeta/nickName', ''))
-
-        # Check if exists
-        existing = processor.supabase.table('influencers').select('id').eq('author_id', author_id).eq('account_id', account_id).execute()
-
-        if not existing.data:
+    rows = [
+        (idx, str(row.get('authorMeta/id', '')), str(row.get('authorMeta/nickName', '')))
+        for idx, row in iter_rows(df, ['authorMeta/id', 'authorMeta/nickName'])
+    ]
+
+    # One in.(…) lookup per chunk of account_ids instead of a query per row
+    existing = set()
+    account_ids = list(dict.fromkeys(account_id for _, _, account_id in rows))
+    for chunk in chunked(account_ids, chunk_size):
+        result = processor.supabase.table('influencers').select('author_id,account_id').in_(
+            'account_id', chunk
+        ).execute()
+        existing.update((str(r['author_id']), r['account_id']) for r in (result.data or []))
+
+    for idx, author_id, account_id in rows:
+        if (author_id, account_id) not in existing:
             new_records.append(idx)
             if len(new_records) <= 5:  # Show first 5 new records
                 print(f"  New record found at index {idx}: {account_id}")
@@ -32,93 +43,142 @@ def main():
     processor = InfluencerDataProcessor()
 
     # Read Excel file
+    input_file = 'verish_round_4.xlsx'
     print("\n📊 Reading Excel file...")
-    df = pd.read_excel('verish_round_4.xlsx')
+    df = load_excel(input_file)
     total_records = len(df)
 
     # Start from a specific index (skip known duplicates)
     start_idx = 100  # Start from record 101 to skip the first batch of duplicates
 
-    if len(sys.argv) > 1:
-        start_idx = int(sys.argv[1])
+    # Upsert each batch in one request instead of per record
+    bulk = '--bulk' in sys.argv
+    # Completed records are skipped via the checkpoint journal; --fresh ignores it
+    resume = '--fresh' not in sys.argv
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
 
-    print(f"\n🎯 Processing NEW records starting from index {start_idx}")
+    if args:
+        start_idx = int(args[0])
 
-    # Process records starting from start_idx
-    batch_size = 20
-    max_records = min(start_idx + 100, total_records)  # Process 100 records at a time
+    with CheckpointJournal(input_file, processor.scraping_round, resume=resume) as journal:
+        journal_summary = journal.summary()
+        print(f"📒 Checkpoint journal: {journal.path} "
+              f"({journal_summary.get('done', 0)} done, {journal_summary.get('failed', 0)} to retry)")
 
-    df_subset = df.iloc[start_idx:max_records]
+        print(f"\n🎯 Processing NEW records starting from index {start_idx}")
 
-    print(f"Processing records {start_idx+1} to {max_records} of {total_records} total")
+        # Process records starting from start_idx
+        batch_size = DEFAULT_CHUNK_SIZE if bulk else 20
+        max_records = total_records
 
-    processor.stats['total'] = len(df_subset)
+        df_subset = df.iloc[start_idx:max_records]
 
-    # Process in batches
-    success_count = 0
-    error_count = 0
+        print(f"Processing records {start_idx+1} to {max_records} of {total_records} total")
 
-    for i in range(0, len(df_subset), batch_size):
-        batch_df = df_subset.iloc[i:min(i+batch_size, len(df_subset))]
+        processor.stats['total'] = len(df_subset)
 
-        print(f"\n📦 Processing batch {i+1}-{min(i+batch_size, len(df_subset))} of {len(df_subset)}...")
+        # Process in batches
+        success_count = 0
+        error_count = 0
+        skipped_count = 0
 
-        for idx, row in batch_df.iterrows():
-            try:
-                print(f"\n[{idx+1}/{max_records}] Processing {row.get('authorMeta/nickName', 'Unknown')}...")
+        for i in range(0, len(df_subset), batch_size):
+            batch_df = df_subset.iloc[i:min(i+batch_size, len(df_subset))]
 
-                # Process row data
-                data = processor.process_row(row)
+            print(f"\n📦 Processing batch {i+1}-{min(i+batch_size, len(df_subset))} of {len(df_subset)}...")
+            pending_rows = []
 
-                # Download and upload thumbnail
-                thumbnail_url = row.get('videoMeta/coverUrl')
-                if thumbnail_url and not pd.isna(thumbnail_url):
-                    image_path = processor.download_image(thumbnail_url, data['account_id'])
-                    if image_path:
-                        r2_url = processor.upload_to_r2(image_path)
-                        data['r2_thumbnail_url'] = r2_url or ''
+            for idx, row in iter_rows(batch_df, processor.row_columns):
+                try:
+                    print(f"\n[{idx+1}/{max_records}] Processing {row.get('authorMeta/nickName', 'Unknown')}...")
+
+                    # Process row data
+                    data = processor.process_row(row)
+
+                    # Skip records the journal has already finished
+                    digest = content_hash(data)
+                    if journal.is_done(record_key(data), digest):
+                        print(f"  ↷ Already done (ID: {journal.get(record_key(data)).get('db_id')}), skipping")
+                        skipped_count += 1
+                        continue
+
+                    # Download and upload thumbnail
+                    thumbnail_url = row.get('videoMeta/coverUrl')
+                    thumbnail_failed = False
+                    if thumbnail_url and not pd.isna(thumbnail_url):
+                        image_path = processor.download_image(thumbnail_url, data['account_id'])
+                        if image_path:
+                            r2_url = processor.upload_to_r2(image_path)
+                            data['r2_thumbnail_url'] = r2_url or ''
+                        else:
+                            data['r2_thumbnail_url'] = ''
+                        thumbnail_failed = not data['r2_thumbnail_url']
                     else:
                         data['r2_thumbnail_url'] = ''
-                else:
-                    data['r2_thumbnail_url'] = ''
 
-                # Try to insert/update in database
-                try:
-                    # Check if exists
-                    existing = processor.supabase.table('influencers').select('id').eq('account_id', data['account_id']).execute()
-
-                    if existing.data and len(existing.data) > 0:
-                        # Update
-                        update_data = {k: v for k, v in data.items() if k != 'id'}
-                        result = processor.supabase.table('influencers').update(update_data).eq('id', existing.data[0]['id']).execute()
-                        print(f"  ✓ Updated existing record (ID: {existing.data[0]['id']})")
-                        success_count += 1
-                    else:
-                        # Insert new
-                        insert_data = {k: v for k, v in data.items() if k != 'id'}
-                        result = processor.supabase.table('influencers').insert(insert_data).execute()
-                        if result.data:
-                            print(f"  ✓ Inserted NEW record (ID: {result.data[0]['id']})")
+                    # Bulk mode collects the batch for a single upsert
+                    if bulk:
+                        pending_rows.append((idx, data, digest, thumbnail_failed))
+                        continue
+
+                    # Try to insert/update in database
+                    db_id = None
+                    try:
+                        # Check if exists
+                        existing = processor.supabase.table('influencers').select('id').eq('account_id', data['account_id']).execute()
+
+                        if existing.data and len(existing.data) > 0:
+                            # Update
+                            update_data = data.to_row()
+                            result = processor.supabase.table('influencers').update(update_data).eq('id', existing.data[0]['id']).execute()
+                            print(f"  ✓ Updated existing record (ID: {existing.data[0]['id']})")
                             success_count += 1
+                            db_id = existing.data[0]['id']
+                        else:
+                            # Insert new
+                            insert_data = data.to_row()
+                            result = processor.supabase.table('influencers').insert(insert_data).execute()
+                            if result.data:
+                                print(f"  ✓ Inserted NEW record (ID: {result.data[0]['id']})")
+                                success_count += 1
+                                db_id = result.data[0]['id']
+
+                    except Exception as e:
+                        if 'duplicate key' in str(e):
+                            print(f"  ⚠ Skipping - already exists (different key)")
+                            error_count += 1
+                        else:
+                            print(f"  ✗ Error: {str(e)[:100]}")
+                            error_count += 1
+
+                    processor.checkpoint(journal, idx, data, digest, db_id, thumbnail_failed)
 
                 except Exception as e:
-                    if 'duplicate key' in str(e):
-                        print(f"  ⚠ Skipping - already exists (different key)")
-                        error_count += 1
+                    print(f"  ✗ Failed to process: {str(e)[:100]}")
+                    error_count += 1
+
+            if pending_rows:
+                print(f"\n  Upserting {len(pending_rows)} records in bulk...")
+                outcomes = bulk_upsert_influencers(processor.supabase, [data for _, data, _, _ in pending_rows])
+                for (idx, data, digest, thumbnail_failed), outcome in zip(pending_rows, outcomes):
+                    processor.checkpoint(journal, idx, data, digest, outcome['id'], thumbnail_failed)
+                    if outcome['action'] == 'inserted':
+                        print(f"  ✓ Inserted NEW record (ID: {outcome['id']})")
+                        success_count += 1
+                    elif outcome['action'] == 'updated':
+                        print(f"  ✓ Updated existing record (ID: {outcome['id']})")
+                        success_count += 1
                     else:
-                        print(f"  ✗ Error: {str(e)[:100]}")
+                        print(f"  ✗ Error for {outcome['account_id']}: {outcome['error'][:100]}")
                         error_count += 1
 
-            except Exception as e:
-                print(f"  ✗ Failed to process: {str(e)[:100]}")
-                error_count += 1
-
     # Summary
     print("\n" + "="*60)
     print("PROCESSING COMPLETE")
     print("="*60)
     print(f"✅ Successfully processed: {success_count} records")
     print(f"⚠️  Skipped/Errors: {error_count} records")
+    print(f"↷  Already done (journal): {skipped_count} records")
     print(f"📊 Total attempted: {len(df_subset)} records")
 
     if success_count > 0:
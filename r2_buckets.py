@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Which R2 bucket each local thumbnail directory was uploaded to.
+
+The processors write to different buckets (r2_config.json for rounds 3-5
+and the regular/sales uploads, r2_config_seedlab.json for Instagram,
+r2_config_verish.json for round 6), but their thumbnail directories all
+look alike. Tools that compare or index local thumbnails against a bucket
+(reconcile_r2.py, perceptual_index.py) use this map to pick only the
+directories of the bucket they were given, and refuse the others.
+"""
+
+import json
+from pathlib import Path
+from typing import List, Optional
+
+ROOT = Path(__file__).resolve().parent
+
+# Thumbnail directory (relative to the repo root) → R2 config it was uploaded with
+THUMBNAIL_DIRECTORY_CONFIGS = {
+    'thumbnails_regular': 'r2_config.json',
+    'thumbnails_sales': 'r2_config.json',
+    'thumbnails_round_3': 'r2_config.json',
+    'thumbnails_round_4': 'r2_config.json',
+    'thumbnails_instagram_round_1': 'r2_config_seedlab.json',
+    'verish_data/5th/thumbnails_round_5': 'r2_config.json',
+    'verish_data/6th/thumbnails_round_6': 'r2_config_verish.json',
+}
+
+
+def bucket_of_config(config_file) -> Optional[str]:
+    """bucket_name of an R2 config file (None if it isn't there)"""
+    path = Path(config_file)
+    if not path.is_absolute():
+        path = ROOT / path
+    if not path.exists():
+        return None
+    with open(path, 'r') as f:
+        return json.load(f).get('bucket_name')
+
+
+def bucket_of_directory(directory) -> Optional[str]:
+    """Bucket a thumbnail directory was uploaded to (None if unknown)"""
+    try:
+        relative = Path(directory).resolve().relative_to(ROOT).as_posix()
+    except ValueError:
+        return None
+    config_file = THUMBNAIL_DIRECTORY_CONFIGS.get(relative)
+    return bucket_of_config(config_file) if config_file else None
+
+
+def directories_for_bucket(bucket: str) -> List[Path]:
+    """Existing thumbnail directories uploaded to `bucket`"""
+    return sorted(
+        ROOT / relative for relative in THUMBNAIL_DIRECTORY_CONFIGS
+        if (ROOT / relative).is_dir() and bucket_of_directory(ROOT / relative) == bucket
+    )
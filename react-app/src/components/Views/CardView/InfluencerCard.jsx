@@ -5,7 +5,7 @@ import ContactStatusService from '../../../services/ContactStatusService';
 import LikesService from '../../../services/LikesService';
 import InfluencerService from '../../../services/InfluencerService';
 import useAuthStore from '../../../stores/authStore';
-import { truncateText, formatNumber } from '../../../utils/formatters';
+import { truncateText, formatNumber, thumbnailUrl } from '../../../utils/formatters';
 import { getUserColor } from '../../../utils/userColors';
 import { isDevelopment } from '../../../config/mockUsers';
 
@@ -174,7 +174,7 @@ function InfluencerCard({ influencer, onShowDetail, onShowVideo, onDataUpdate })
         )}
         {(influencer.r2_thumbnail_url || influencer.local_thumbnail || influencer.thumbnail_url) ? (
           <img
-            src={influencer.r2_thumbnail_url || influencer.local_thumbnail || influencer.thumbnail_url}
+            src={thumbnailUrl(influencer, 'card')}
             alt={influencer.author_name}
             loading="lazy"
             onError={(e) => {
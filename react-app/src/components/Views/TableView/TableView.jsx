@@ -1,7 +1,7 @@
 import React from 'react';
 import StatusSelector from '../../common/StatusSelector';
 import ContactStatusService from '../../../services/ContactStatusService';
-import { formatNumber } from '../../../utils/formatters';
+import { formatNumber, thumbnailUrl } from '../../../utils/formatters';
 
 function TableView({ data, onShowDetail, onShowVideo, onDataUpdate, sortField, onSort }) {
   const handleShowVideo = (url, event) => {
@@ -54,7 +54,7 @@ function TableView({ data, onShowDetail, onShowVideo, onDataUpdate, sortField, o
                   <td className="thumbnail-cell">
                     {(item.r2_thumbnail_url || item.local_thumbnail || item.thumbnail_url) ? (
                       <img
-                        src={item.r2_thumbnail_url || item.local_thumbnail || item.thumbnail_url}
+                        src={thumbnailUrl(item, 'table')}
                         alt={item.author_name}
                         loading="lazy"
                         onError={(e) => {
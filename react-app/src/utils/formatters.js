@@ -13,4 +13,12 @@ export function truncateText(text, maxLength) {
   if (!text) return '';
   if (text.length <= maxLength) return text;
   return text.substring(0, maxLength) + '...';
-}
\ No newline at end of file
+}
+
+// Smallest stored thumbnail for a dashboard size ('card' | 'table'),
+// falling back to the full-size cover
+export function thumbnailUrl(item, size, format = 'webp') {
+  const variant = item.r2_thumbnail_variants?.[size];
+  return (variant && (variant[format] || variant.jpg))
+    || item.r2_thumbnail_url || item.local_thumbnail || item.thumbnail_url;
+}
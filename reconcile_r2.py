@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Reconcile the R2 thumbnail bucket with the local thumbnail directories and
+the influencers.r2_thumbnail_url column, in one pass:
+
+1. List the bucket once (paginated list_objects_v2) into a set of keys
+2. Inventory the local thumbnail dirs (a file's key is <dir name>/<file name>)
+3. Fetch every influencer's r2_thumbnail_url
+
+Local files missing from the bucket are uploaded. Rows whose URL points at
+a key that is not in the bucket (and could not be uploaded) are flagged as
+dangling, and with --clear-dangling their r2_thumbnail_url is cleared in
+bulk so the next processing run fetches the cover again. Bucket objects no
+local file or row refers to are reported as orphans.
+
+The bucket is the one of --r2-config (default r2_config.json). Only the
+thumbnail directories uploaded to that bucket (see r2_buckets.py) are
+compared with it; naming a directory of another bucket is an error.
+
+    python3 reconcile_r2.py --dry-run
+    python3 reconcile_r2.py thumbnails_regular thumbnails_sales --clear-dangling
+    python3 reconcile_r2.py --r2-config r2_config_verish.json --dry-run
+"""
+
+import os
+import sys
+import json
+import argparse
+from pathlib import Path
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Set
+
+from upload_to_r2 import R2Uploader
+from upload_manifest import UploadManifest, manifest_path
+from remove_duplicates_simple import SimpleSupabaseClient
+from fingerprint_index import FingerprintIndex
+from r2_buckets import bucket_of_directory, directories_for_bucket
+
+
+class R2Reconciler:
+    # Columns read by referenced_keys and the dangling report
+    COLUMNS = ('id', 'account_id', 'r2_thumbnail_url')
+
+    def __init__(self, config_file: str = 'supabase_config.json',
+                 r2_config_file: str = 'r2_config.json', dry_run: bool = True,
+                 clear_dangling: bool = False, max_workers: int = 10):
+        """Load the Supabase and R2 configs"""
+        self.dry_run = dry_run
+        self.clear_dangling = clear_dangling
+        self.max_workers = max_workers
+        self.stats = {
+            'bucket_objects': 0,
+            'local_files': 0,
+            'rows_with_url': 0,
+            'missing_in_bucket': 0,
+            'uploaded': 0,
+            'dangling': 0,
+            'dangling_cleared': 0,
+            'foreign_urls': 0,
+            'orphans': 0,
+            'errors': []
+        }
+
+        if not os.path.exists(config_file):
+            print(f"Error: Config file '{config_file}' not found!")
+            sys.exit(1)
+        with open(config_file, 'r') as f:
+            config = json.load(f)
+        self.client = SimpleSupabaseClient(config['supabase_url'], config['supabase_key'])
+
+        if not os.path.exists(r2_config_file):
+            print(f"Error: R2 config file '{r2_config_file}' not found!")
+            sys.exit(1)
+        with open(r2_config_file, 'r') as f:
+            r2_config = json.load(f)
+        self.uploader = R2Uploader(
+            r2_config['account_id'],
+            r2_config['access_key_id'],
+            r2_config['secret_access_key'],
+            r2_config['bucket_name']
+        )
+        self.base_url = r2_config.get('thumbnails_base_url', f"https://{r2_config['bucket_name']}.r2.dev/")
+
+    def local_inventory(self, directories: List[Path]) -> Dict[str, Path]:
+        """Key → local file for every thumbnail in the directories"""
+        inventory = {}
+        for directory in directories:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_file() and entry.name.endswith('.jpg'):
+                        inventory[f"{Path(directory).name}/{entry.name}"] = Path(entry.path)
+        return inventory
+
+    def referenced_keys(self, rows: List[Dict]) -> Dict[str, List[Dict]]:
+        """Key → rows whose r2_thumbnail_url points into the bucket"""
+        referenced = {}
+        for row in rows:
+            url = row.get('r2_thumbnail_url')
+            if not url:
+                continue
+            self.stats['rows_with_url'] += 1
+            if not url.startswith(self.base_url):
+                self.stats['foreign_urls'] += 1
+                continue
+            referenced.setdefault(url[len(self.base_url):], []).append(row)
+        return referenced
+
+    def upload_missing(self, missing: Dict[str, Path]) -> Set[str]:
+        """Upload files missing from the bucket, returning the keys now stored"""
+        uploaded = set()
+        manifests = {}
+        total = len(missing)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self.uploader.upload_file, path, key[:-len(path.name)]): key
+                for key, path in missing.items()
+            }
+            for completed, future in enumerate(as_completed(futures), start=1):
+                key = futures[future]
+                success, result = future.result()
+                if success:
+                    uploaded.add(key)
+                    print(f"✓ [{completed}/{total}] Uploaded: {key}")
+                else:
+                    print(f"✗ [{completed}/{total}] Failed: {key} - {result}")
+                    self.stats['errors'].append(f"Upload failed for {key}: {result}")
+
+        # Keep upload_directory's manifests in step with what is now in R2
+        for key in uploaded:
+            directory = missing[key].parent
+            if directory not in manifests:
+                manifests[directory] = UploadManifest(manifest_path(directory))
+            manifests[directory].record(self.uploader.bucket_name, key, missing[key])
+        for manifest in manifests.values():
+            manifest.close()
+
+        return uploaded
+
+    def run(self, directories: List[Path], prefix: str = ''):
+        """Inventory all three sides, then upload and flag in bulk"""
+        print(f"\n📋 Listing bucket {self.uploader.bucket_name}/{prefix}...")
+        bucket = self.uploader.list_keys(prefix)
+        self.stats['bucket_objects'] = len(bucket)
+        print(f"   {len(bucket)} objects")
+
+        print(f"\n📁 Scanning {len(directories)} local thumbnail directories...")
+        local = self.local_inventory(directories)
+        self.stats['local_files'] = len(local)
+        print(f"   {len(local)} files")
+
+        print("\n🗄  Fetching r2_thumbnail_url of every influencer...")
+        referenced = self.referenced_keys(self.client.select_all('influencers', columns=self.COLUMNS))
+        print(f"   {self.stats['rows_with_url']} rows with an R2 URL")
+
+        missing = {key: path for key, path in local.items()
+                   if key.startswith(prefix) and key not in bucket}
+        self.stats['missing_in_bucket'] = len(missing)
+        if missing and not self.dry_run:
+            print(f"\n📤 Uploading {len(missing)} files missing from the bucket...")
+            uploaded = self.upload_missing(missing)
+            self.stats['uploaded'] = len(uploaded)
+            bucket |= uploaded
+
+        dangling = [
+            {'id': row['id'], 'account_id': row.get('account_id'), 'r2_thumbnail_url': row['r2_thumbnail_url'],
+             'has_local_copy': key in missing}
+            for key, rows in referenced.items()
+            if key.startswith(prefix) and key not in bucket
+            for row in rows
+        ]
+        self.stats['dangling'] = len(dangling)
+
+        orphans = sorted(bucket - set(referenced) - set(local))
+        self.stats['orphans'] = len(orphans)
+
+        if dangling and self.clear_dangling and not self.dry_run:
+            # Rows whose file is local but failed to upload are left for a re-run
+            cleared = [row for row in dangling if not row['has_local_copy']]
+            ids = [row['id'] for row in cleared]
+            print(f"\n🧹 Clearing {len(ids)} dangling r2_thumbnail_url values...")
+
+            # Let the next processing run re-fetch these covers instead of skipping them
+            fingerprints = FingerprintIndex()
+            fingerprints.forget(row['account_id'] for row in cleared if row['account_id'])
+            fingerprints.close()
+            if self.client.update_by_ids('influencers', ids, {'r2_thumbnail_url': ''}):
+                self.stats['dangling_cleared'] = len(ids)
+            else:
+                self.stats['errors'].append("Clearing dangling URLs failed")
+
+        self.save_report(sorted(missing), dangling, orphans)
+        self.print_summary()
+
+    def save_report(self, missing: List[str], dangling: List[Dict], orphans: List[str]):
+        """Save the full diff for follow-up"""
+        report_file = f"r2_reconcile_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        with open(report_file, 'w', encoding='utf-8') as f:
+            json.dump({
+                'stats': self.stats,
+                'missing_in_bucket': missing,
+                'dangling': dangling,
+                'orphans': orphans
+            }, f, indent=2, ensure_ascii=False)
+        print(f"\n📊 Report saved to: {report_file}")
+
+    def print_summary(self):
+        """Print summary of the reconciliation."""
+        print("\n" + "=" * 60)
+        print("R2 RECONCILIATION SUMMARY")
+        print("=" * 60)
+        print(f"Bucket objects: {self.stats['bucket_objects']}")
+        print(f"Local thumbnails: {self.stats['local_files']}")
+        print(f"Rows with an R2 URL: {self.stats['rows_with_url']} ({self.stats['foreign_urls']} outside the bucket)")
+        print(f"Missing from bucket: {self.stats['missing_in_bucket']} (uploaded: {self.stats['uploaded']})")
+        print(f"Dangling URLs: {self.stats['dangling']} (cleared: {self.stats['dangling_cleared']})")
+        print(f"Orphaned objects: {self.stats['orphans']}")
+
+        if self.stats['errors']:
+            print(f"\n⚠️  Errors encountered: {len(self.stats['errors'])}")
+            for error in self.stats['errors'][:10]:
+                print(f"  - {error}")
+
+        if self.dry_run:
+            print("\n⚠️  DRY RUN MODE - Nothing was uploaded or changed")
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(
+        description='Reconcile R2 thumbnails with local files and influencers.r2_thumbnail_url'
+    )
+    parser.add_argument(
+        'directories',
+        nargs='*',
+        help='Local thumbnail directories (default: every one uploaded to the --r2-config bucket)'
+    )
+    parser.add_argument(
+        '--prefix',
+        default='',
+        help='Only reconcile keys under this bucket prefix'
+    )
+    parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='Report the diff without uploading or changing the database'
+    )
+    parser.add_argument(
+        '--clear-dangling',
+        action='store_true',
+        help='Clear r2_thumbnail_url on rows whose object is not in the bucket'
+    )
+    parser.add_argument(
+        '--config',
+        default='supabase_config.json',
+        help='Path to Supabase configuration file'
+    )
+    parser.add_argument(
+        '--r2-config',
+        default='r2_config.json',
+        help='Path to the R2 configuration file of the bucket to reconcile'
+    )
+
+    args = parser.parse_args()
+
+    reconciler = R2Reconciler(
+        config_file=args.config,
+        r2_config_file=args.r2_config,
+        dry_run=args.dry_run,
+        clear_dangling=args.clear_dangling
+    )
+    bucket = reconciler.uploader.bucket_name
+    directories = [Path(d) for d in args.directories]
+    for directory in directories:
+        if bucket_of_directory(directory) != bucket:
+            print(f"Error: {directory} was not uploaded to bucket '{bucket}'")
+            sys.exit(1)
+    directories = directories or directories_for_bucket(bucket)
+    reconciler.run(directories, prefix=args.prefix)
+
+
+if __name__ == '__main__':
+    main()
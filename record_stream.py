@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Streaming reader/writer for scraper dumps.
+
+iter_records yields records one at a time from:
+- JSON arrays (Apify-style exports: `[{...}, {...}]`)
+- JSON Lines / concatenated JSON (`{...}\\n{...}`)
+- Either of the above gzip-compressed (detected by magic bytes)
+
+Only a small read buffer plus the current record is kept in memory, so
+multi-GB dumps can be processed in constant memory. JsonArrayWriter writes
+the same layout json.dump(..., indent=2, ensure_ascii=False) produces, one
+record at a time.
+
+Wrapped dumps like data_combined.json (`{"summary": {...}, "data": [...]}`)
+are read with iter_members, which streams the big array member item by item,
+and written back with JsonObjectWriter.
+"""
+
+import gzip
+import json
+from itertools import islice
+from pathlib import Path
+from typing import Any, Collection, Iterable, Iterator, List, TextIO, Tuple, Union
+
+# Characters read from the file per refill
+CHUNK_SIZE = 1 << 20
+
+_WHITESPACE = ' \t\r\n'
+_ARRAY_SEPARATORS = _WHITESPACE + ','
+_NUMBER_CHARS = '0123456789.eE+-'
+
+PathLike = Union[str, Path]
+
+
+def is_gzip(path: PathLike) -> bool:
+    """Check the gzip magic bytes rather than trusting the file extension"""
+    with open(path, 'rb') as f:
+        return f.read(2) == b'\x1f\x8b'
+
+
+def open_text(path: PathLike, mode: str = 'r') -> TextIO:
+    """Open a UTF-8 text file, transparently handling gzip"""
+    if 'r' in mode:
+        gzipped = is_gzip(path)
+    else:
+        gzipped = str(path).endswith('.gz')
+
+    if gzipped:
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def iter_records(path: PathLike, chunk_size: int = CHUNK_SIZE) -> Iterator[Any]:
+    """
+    Yield records from a JSON array or JSON Lines file without loading it whole.
+
+    Raises json.JSONDecodeError on malformed input, like json.load would.
+    """
+    decoder = json.JSONDecoder()
+
+    with open_text(path) as f:
+        buf = f.read(chunk_size)
+        eof = not buf
+        pos = 0
+        if buf.startswith('\ufeff'):
+            pos = 1
+        in_array = None
+
+        while True:
+            separators = _ARRAY_SEPARATORS if in_array else _WHITESPACE
+
+            # Skip whitespace (and commas inside an array), refilling as needed
+            while True:
+                while pos < len(buf) and buf[pos] in separators:
+                    pos += 1
+                if pos < len(buf) or eof:
+                    break
+                buf = f.read(chunk_size)
+                eof = not buf
+                pos = 0
+
+            if pos >= len(buf):
+                if in_array:
+                    raise json.JSONDecodeError("Unterminated JSON array", buf, pos)
+                return
+
+            if in_array is None:
+                in_array = buf[pos] == '['
+                if in_array:
+                    pos += 1
+                    continue
+
+            if in_array and buf[pos] == ']':
+                return
+
+            try:
+                record, end = decoder.raw_decode(buf, pos)
+                # A bare number at the buffer edge may have been cut short
+                truncated = (not eof and isinstance(record, (int, float))
+                             and not isinstance(record, bool)
+                             and (end == len(buf) or buf[end] in _NUMBER_CHARS))
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                truncated = True
+
+            if truncated:
+                # Record spans the buffer edge - drop consumed text and read more
+                more = f.read(max(chunk_size, len(buf) - pos))
+                eof = not more
+                buf = buf[pos:] + more
+                pos = 0
+                continue
+
+            yield record
+            pos = end
+
+            # Keep the buffer bounded by discarding consumed text
+            if pos >= chunk_size:
+                buf = buf[pos:]
+                pos = 0
+
+
+class _Scanner:
+    """Buffered cursor over a text file for incremental JSON decoding"""
+
+    def __init__(self, f: TextIO, chunk_size: int):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buf = f.read(chunk_size)
+        self.eof = not self.buf
+        self.pos = 1 if self.buf.startswith('\ufeff') else 0
+
+    def peek(self, separators: str = _WHITESPACE) -> str:
+        """Skip separators and return the next character ('' at end of file)"""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in separators:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if self.eof:
+                return ''
+            self.buf = self.f.read(self.chunk_size)
+            self.eof = not self.buf
+            self.pos = 0
+
+    def expect(self, char: str) -> None:
+        """Consume `char` (after whitespace) or raise"""
+        if self.peek() != char:
+            raise json.JSONDecodeError(f"Expecting '{char}'", self.buf, self.pos)
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Decode the JSON value at the cursor, reading more text as needed"""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                # A bare number at the buffer edge may have been cut short
+                truncated = (not self.eof and isinstance(value, (int, float))
+                             and not isinstance(value, bool)
+                             and (end == len(self.buf) or self.buf[end] in _NUMBER_CHARS))
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                truncated = True
+
+            if not truncated:
+                self.pos = end
+                # Keep the buffer bounded by discarding consumed text
+                if self.pos >= self.chunk_size:
+                    self.buf = self.buf[self.pos:]
+                    self.pos = 0
+                return value
+
+            more = self.f.read(max(self.chunk_size, len(self.buf) - self.pos))
+            self.eof = not more
+            self.buf = self.buf[self.pos:] + more
+            self.pos = 0
+
+    def array_items(self) -> Iterator[Any]:
+        """Yield the items of the array whose '[' was just consumed"""
+        while True:
+            char = self.peek(_ARRAY_SEPARATORS)
+            if char == ']':
+                self.pos += 1
+                return
+            if not char:
+                raise json.JSONDecodeError("Unterminated JSON array", self.buf, self.pos)
+            yield self.value()
+
+
+def iter_members(path: PathLike, stream_keys: Collection[str] = (),
+                 chunk_size: int = CHUNK_SIZE) -> Iterator[Tuple[str, Any]]:
+    """
+    Yield (key, value) for each member of a top-level JSON object.
+
+    Array members named in stream_keys are not loaded: their value is an
+    iterator over the array's items, valid until the next member is read.
+    """
+    with open_text(path) as f:
+        scanner = _Scanner(f, chunk_size)
+        scanner.expect('{')
+        if scanner.peek() == '}':
+            return
+
+        while True:
+            key = scanner.value()
+            scanner.expect(':')
+            if key in stream_keys and scanner.peek() == '[':
+                scanner.pos += 1
+                items = scanner.array_items()
+                yield key, items
+                # Skip whatever the caller left unread
+                for _ in items:
+                    pass
+            else:
+                yield key, scanner.value()
+
+            char = scanner.peek()
+            if char == ',':
+                scanner.pos += 1
+            elif char == '}':
+                return
+            else:
+                raise json.JSONDecodeError("Expecting ',' or '}'", scanner.buf, scanner.pos)
+
+
+def iter_batches(records: Iterable[Any], batch_size: int) -> Iterator[List[Any]]:
+    """Group an iterable of records into lists of at most batch_size"""
+    iterator = iter(records)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+class JsonArrayWriter:
+    """Write records to a JSON array file incrementally"""
+
+    def __init__(self, path: PathLike, indent: int = 2):
+        self.path = path
+        self.indent = indent
+        self.count = 0
+        self._file = None
+
+    def __enter__(self) -> 'JsonArrayWriter':
+        self._file = open_text(self.path, 'w')
+        self._file.write('[')
+        return self
+
+    def write(self, record: Any) -> None:
+        """Append one record to the array"""
+        text = json.dumps(record, indent=self.indent, ensure_ascii=False)
+        pad = ' ' * self.indent
+        self._file.write((',\n' if self.count else '\n') + pad + text.replace('\n', '\n' + pad))
+        self.count += 1
+
+    def write_all(self, records: Iterable[Any]) -> int:
+        """Append every record from an iterable, returning how many were written"""
+        for record in records:
+            self.write(record)
+        return self.count
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._file.write('\n]' if self.count else ']')
+        self._file.close()
+
+
+class JsonObjectWriter:
+    """Write a JSON object member by member, streaming array members"""
+
+    def __init__(self, path: PathLike, indent: int = 2):
+        self.path = path
+        self.indent = indent
+        self.count = 0
+        self._file = None
+
+    def __enter__(self) -> 'JsonObjectWriter':
+        self._file = open_text(self.path, 'w')
+        self._file.write('{')
+        return self
+
+    def _dumps(self, value: Any, depth: int) -> str:
+        text = json.dumps(value, indent=self.indent, ensure_ascii=False)
+        return text.replace('\n', '\n' + ' ' * (self.indent * depth))
+
+    def _write_key(self, key: str) -> None:
+        pad = ' ' * self.indent
+        self._file.write((',\n' if self.count else '\n') + pad + json.dumps(key, ensure_ascii=False) + ': ')
+        self.count += 1
+
+    def write_member(self, key: str, value: Any) -> None:
+        """Write one member with a fully loaded value"""
+        self._write_key(key)
+        self._file.write(self._dumps(value, 1))
+
+    def write_array(self, key: str, items: Iterable[Any]) -> int:
+        """Write an array member one item at a time, returning how many were written"""
+        self._write_key(key)
+        self._file.write('[')
+        pad = ' ' * (self.indent * 2)
+        count = 0
+        for item in items:
+            self._file.write((',\n' if count else '\n') + pad + self._dumps(item, 2))
+            count += 1
+        self._file.write('\n' + ' ' * self.indent + ']' if count else ']')
+        return count
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._file.write('\n}' if self.count else '}')
+        self._file.close()
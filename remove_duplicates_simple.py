@@ -8,16 +8,59 @@ import os
 import sys
 import json
 import argparse
+import threading
 import requests
+from requests.adapters import HTTPAdapter
 from datetime import datetime
-from typing import Dict, List, Tuple
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from fingerprint_index import FingerprintIndex
+
+# Columns read by find_duplicates, score_record and the deletion log of both
+# dedup scripts; long text columns like profile_intro are never fetched
+DEDUP_COLUMNS = ('id', 'author_name', 'account_id', 'email', 'video_caption',
+                 'follower_count', 'views_count', 'likes_count', 'thumbnail_url',
+                 'status', 'saved', 'created_at')
+
+# score_record only checks video_caption is non-empty, so the remote select
+# casts it to char(1): its first character comes back instead of the caption
+DEDUP_SELECT = tuple(f'{c}::char' if c == 'video_caption' else c for c in DEDUP_COLUMNS)
+
+
+def keyset_pages(fetch_page: Callable[[Any, int], Optional[List[Dict]]],
+                 page_size: int = 1000, key: Union[str, Tuple[str, ...]] = 'id',
+                 after=None) -> Iterator[List[Dict]]:
+    """
+    Yield pages of rows ordered by `key`, each starting after the last key seen.
+
+    fetch_page(after, limit) returns the first `limit` rows with key > after
+    (all rows from the start when after is None), or None on error. A tuple
+    of columns pages by a composite key, e.g. ('updated_at', 'id'), and
+    `after` is then the tuple of the last row's values. Unlike offset
+    paging, every page is an index seek and rows inserted or deleted
+    mid-scan never shift later pages.
+    """
+    while True:
+        rows = fetch_page(after, page_size)
+        if not rows:
+            return
+        yield rows
+        if len(rows) < page_size:
+            return
+        if isinstance(key, tuple):
+            after = tuple(rows[-1][k] for k in key)
+        else:
+            after = rows[-1][key]
+
 
 class SimpleSupabaseClient:
-    def __init__(self, url: str, key: str):
+    def __init__(self, url: str, key: str, workers: int = 4):
         """Initialize simple Supabase client."""
         self.base_url = url
         self.api_key = key
+        self.workers = workers
         self.headers = {
             'apikey': key,
             'Authorization': f'Bearer {key}',
@@ -25,39 +68,134 @@ class SimpleSupabaseClient:
             'Prefer': 'return=representation'
         }
 
-    def select_all(self, table: str, page_size: int = 1000) -> List[Dict]:
-        """Fetch all records from a table."""
-        all_records = []
-        offset = 0
-
-        while True:
-            url = f"{self.base_url}/rest/v1/{table}"
-            params = {
-                'select': '*',
-                'offset': offset,
-                'limit': page_size
-            }
-
-            response = requests.get(url, headers=self.headers, params=params)
-            if response.status_code != 200:
-                print(f"Error fetching data: {response.status_code} - {response.text}")
-                break
-
-            records = response.json()
-            if not records:
-                break
+        # One keep-alive session (gzip responses) shared by all requests and page workers
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self.session.headers['Accept-Encoding'] = 'gzip'
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(workers, 1))
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
 
-            all_records.extend(records)
-            print(f"Fetched {len(records)} records (total: {len(all_records)})")
+    def count(self, table: str) -> Optional[int]:
+        """Exact row count of a table, from the Content-Range of a HEAD request."""
+        url = f"{self.base_url}/rest/v1/{table}"
+        response = self.session.head(url, params={'select': 'id'},
+                                     headers={'Prefer': 'count=exact'})
+        content_range = response.headers.get('Content-Range', '')
+        if response.status_code not in [200, 206] or '/' not in content_range:
+            return None
+        total = content_range.rsplit('/', 1)[1]
+        return int(total) if total.isdigit() else None
+
+    def fetch_page(self, table: str, after: int = None, page_size: int = 1000,
+                   upto: int = None, columns: Sequence[str] = ('*',)) -> Optional[List[Dict]]:
+        """Fetch the page of records following id `after` (None on error)."""
+        params = [('select', ','.join(columns)), ('order', 'id'), ('limit', page_size)]
+        if after is not None:
+            params.append(('id', f'gt.{after}'))
+        if upto is not None:
+            params.append(('id', f'lte.{upto}'))
+        return self.get(table, params)
+
+    def get(self, table: str, params) -> Optional[List[Dict]]:
+        """GET rows of a table with raw PostgREST query params (None on error)."""
+        url = f"{self.base_url}/rest/v1/{table}"
+        response = self.session.get(url, params=params)
+        if response.status_code not in [200, 206]:
+            print(f"Error fetching data: {response.status_code} - {response.text}")
+            return None
+        return response.json()
+
+    def iter_pages(self, table: str, page_size: int = 1000, after: int = None,
+                   upto: int = None, columns: Sequence[str] = ('*',)) -> Iterator[List[Dict]]:
+        """Keyset-paginate a table by id, optionally within the id range (after, upto]."""
+        return keyset_pages(
+            lambda last, limit: self.fetch_page(table, last, limit, upto, columns),
+            page_size=page_size,
+            after=after
+        )
 
-            if len(records) < page_size:
-                break
-            offset += page_size
+    def id_bounds(self, table: str) -> Optional[Tuple[int, int]]:
+        """Smallest and largest id of a table (None if empty or on error)."""
+        url = f"{self.base_url}/rest/v1/{table}"
+        bounds = []
+        for order in ['id.asc', 'id.desc']:
+            response = self.session.get(url, params={'select': 'id', 'order': order, 'limit': 1})
+            if response.status_code not in [200, 206] or not response.json():
+                return None
+            bounds.append(response.json()[0]['id'])
+        return bounds[0], bounds[1]
+
+    def select_all(self, table: str, page_size: int = 1000, workers: int = None,
+                   columns: Sequence[str] = ('*',)) -> List[Dict]:
+        """
+        Fetch all records (only the given columns) from a table, in id order.
+
+        With more than one worker the id range is split into one slice per
+        worker and the slices are paged concurrently; otherwise the whole
+        table is paged in turn.
+        """
+        if workers is None:
+            workers = self.workers
+
+        bounds = self.id_bounds(table) if workers > 1 else None
+        if bounds is None:
+            all_records = []
+            for records in self.iter_pages(table, page_size, columns=columns):
+                all_records.extend(records)
+                print(f"Fetched {len(records)} records (total: {len(all_records)})")
+            return all_records
+
+        low, high = bounds
+        step = -(-(high - low + 1) // workers)
+        # (after, upto] per slice; the last one is open so rows inserted meanwhile are kept
+        slices = [(start - 1, start + step - 1) for start in range(low, high + 1, step)]
+        slices[-1] = (slices[-1][0], None)
+        print(f"Fetching {self.count(table)} records in {len(slices)} id slices")
+
+        fetched = [0]
+        lock = threading.Lock()
+
+        def fetch_slice(bounds: Tuple[int, Optional[int]]) -> List[Dict]:
+            records = []
+            for page in self.iter_pages(table, page_size, *bounds, columns=columns):
+                records.extend(page)
+                with lock:
+                    fetched[0] += len(page)
+                    print(f"Fetched {len(page)} records (total: {fetched[0]})")
+            return records
 
+        all_records = []
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for records in executor.map(fetch_slice, slices):
+                all_records.extend(records)
         return all_records
 
-    def delete_by_ids(self, table: str, ids: List[int]) -> bool:
-        """Delete records by IDs."""
+    def update_by_ids(self, table: str, ids: List[int], values: Dict) -> bool:
+        """Set the same column values on records by IDs."""
+        if not ids:
+            return True
+
+        url = f"{self.base_url}/rest/v1/{table}"
+
+        # Update in batches
+        batch_size = 100
+        for i in range(0, len(ids), batch_size):
+            batch = ids[i:i + batch_size]
+
+            id_list = ','.join(str(id) for id in batch)
+            params = {'id': f'in.({id_list})'}
+
+            response = self.session.patch(url, params=params, json=values)
+            if response.status_code not in [200, 204]:
+                print(f"Error updating batch: {response.status_code} - {response.text}")
+                return False
+            print(f"Updated batch of {len(batch)} records")
+
+        return True
+
+    def delete_by_ids(self, table: str, ids: List[int], deleted: Optional[List[int]] = None) -> bool:
+        """Delete records by IDs; ids of the batches that went through are appended to `deleted`."""
         if not ids:
             return True
 
@@ -72,19 +210,23 @@ class SimpleSupabaseClient:
             id_list = ','.join(str(id) for id in batch)
             params = {'id': f'in.({id_list})'}
 
-            response = requests.delete(url, headers=self.headers, params=params)
+            response = self.session.delete(url, params=params)
             if response.status_code not in [200, 204]:
                 print(f"Error deleting batch: {response.status_code} - {response.text}")
                 return False
+            if deleted is not None:
+                deleted.extend(batch)
             print(f"Deleted batch of {len(batch)} records")
 
         return True
 
 
 class DuplicateRemover:
-    def __init__(self, config_file: str = 'supabase_config.json', dry_run: bool = True):
+    def __init__(self, config_file: str = 'supabase_config.json', dry_run: bool = True,
+                 workers: int = 4, use_mirror: bool = False):
         """Initialize the duplicate remover."""
         self.dry_run = dry_run
+        self.mirror = None
         self.stats = {
             'total_records': 0,
             'duplicate_groups': 0,
@@ -107,9 +249,15 @@ class DuplicateRemover:
         # Initialize simple Supabase client
         self.client = SimpleSupabaseClient(
             config['supabase_url'],
-            config['supabase_key']
+            config['supabase_key'],
+            workers=workers
         )
 
+        if use_mirror:
+            # Imported here: influencer_mirror builds on this module's client
+            from influencer_mirror import InfluencerMirror
+            self.mirror = InfluencerMirror(self.client)
+
     def setup_logging(self):
         """Setup logging file."""
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
@@ -256,17 +404,31 @@ class DuplicateRemover:
         if not self.dry_run and records_to_delete:
             self.log(f"\nDeleting {len(records_to_delete)} duplicate records...")
 
-            if self.client.delete_by_ids('influencers', records_to_delete):
-                self.stats['duplicates_removed'] = len(records_to_delete)
-                self.log(f"Successfully deleted {len(records_to_delete)} duplicates")
+            # Otherwise the processors keep skipping these accounts as unchanged
+            self.forget_fingerprints(entry['deleted_account_id'] for entry in backup_data)
+
+            deleted = []
+            succeeded = self.client.delete_by_ids('influencers', records_to_delete, deleted)
+            # Batches deleted before a failure are gone remotely too
+            if self.mirror:
+                self.mirror.forget('influencers', deleted)
+            self.stats['duplicates_removed'] = len(deleted)
+            if succeeded:
+                self.log(f"Successfully deleted {len(deleted)} duplicates")
             else:
-                self.log("Error occurred during deletion")
+                self.log(f"Error occurred during deletion ({len(deleted)} deleted before it)")
                 self.stats['errors'].append("Deletion failed")
 
         elif self.dry_run:
             self.log(f"\nDRY RUN: Would delete {len(records_to_delete)} records")
             self.stats['duplicates_removed'] = len(records_to_delete)
 
+    def forget_fingerprints(self, account_ids) -> None:
+        """Drop deleted accounts from the processors' fingerprint index"""
+        fingerprints = FingerprintIndex()
+        fingerprints.forget(a for a in account_ids if a)
+        fingerprints.close()
+
     def save_backup(self, backup_data: List[Dict]):
         """Save backup information."""
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
@@ -306,8 +468,17 @@ class DuplicateRemover:
         """Main execution method."""
         try:
             # Fetch all records
-            self.log("Fetching all influencers from database...")
-            records = self.client.select_all('influencers')
+            if self.mirror:
+                # Only rows changed since the last run cross the network
+                self.log("Syncing the local influencers mirror...")
+                self.mirror.sync('influencers')
+                # Rows deleted remotely leave no watermark; without pruning, a
+                # kept record could be one that no longer exists
+                self.log(f"Dropped {self.mirror.prune('influencers')} mirrored rows deleted remotely")
+                records = self.mirror.rows('influencers', columns=DEDUP_COLUMNS)
+            else:
+                self.log("Fetching all influencers from database...")
+                records = self.client.select_all('influencers', columns=DEDUP_SELECT)
 
             if not records:
                 self.log("No records fetched. Exiting.")
@@ -355,13 +526,26 @@ def main():
         default='supabase_config.json',
         help='Path to Supabase configuration file'
     )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=4,
+        help='Pages fetched concurrently (1 fetches them one by one)'
+    )
+    parser.add_argument(
+        '--mirror',
+        action='store_true',
+        help='Read from the local influencers mirror, syncing only what changed'
+    )
 
     args = parser.parse_args()
 
     # Create and run the duplicate remover
     remover = DuplicateRemover(
         config_file=args.config,
-        dry_run=args.dry_run
+        dry_run=args.dry_run,
+        workers=args.workers,
+        use_mirror=args.mirror
     )
 
     print(f"Starting duplicate removal {'(DRY RUN)' if args.dry_run else ''}...")
@@ -22,6 +22,8 @@ from datetime import datetime
 from typing import Dict, List, Tuple, Set
 from collections import defaultdict
 from supabase import create_client
+from remove_duplicates_simple import keyset_pages, DEDUP_SELECT
+from fingerprint_index import FingerprintIndex
 import logging
 
 class DuplicateRemover:
@@ -127,32 +129,24 @@ class DuplicateRemover:
         self.logger.info("Fetching all influencers from database...")
 
         all_records = []
-        page = 0
-        page_size = 1000
 
-        while True:
-            try:
-                response = self.supabase.table('influencers') \
-                    .select('*') \
-                    .range(page * page_size, (page + 1) * page_size - 1) \
-                    .execute()
-
-                records = response.data
-                if not records:
-                    break
+        def fetch_page(after, limit):
+            query = self.supabase.table('influencers') \
+                .select(','.join(DEDUP_SELECT)) \
+                .order('id') \
+                .limit(limit)
+            if after is not None:
+                query = query.gt('id', after)
+            return query.execute().data
 
+        try:
+            for page, records in enumerate(keyset_pages(fetch_page, page_size=1000), start=1):
                 all_records.extend(records)
-                self.logger.info(f"Fetched page {page + 1}: {len(records)} records")
-
-                if len(records) < page_size:
-                    break
-
-                page += 1
-
-            except Exception as e:
-                self.logger.error(f"Error fetching page {page}: {e}")
-                self.stats['errors'].append(f"Fetch error page {page}: {e}")
-                break
+                self.logger.info(f"Fetched page {page}: {len(records)} records")
+        except Exception as e:
+            last_id = all_records[-1]['id'] if all_records else None
+            self.logger.error(f"Error fetching records after id {last_id}: {e}")
+            self.stats['errors'].append(f"Fetch error after id {last_id}: {e}")
 
         self.stats['total_records'] = len(all_records)
         self.logger.info(f"Total records fetched: {len(all_records)}")
@@ -208,6 +202,7 @@ class DuplicateRemover:
         self.logger.info(f"{'DRY RUN: ' if self.dry_run else ''}Starting duplicate removal...")
 
         records_to_delete = []
+        accounts_to_forget = []
 
         for key, records in duplicate_groups.items():
             keep, delete = self.select_record_to_keep(records)
@@ -223,11 +218,18 @@ class DuplicateRemover:
                                f"author_name={record.get('author_name')}, "
                                f"account_id={record.get('account_id')}")
                 records_to_delete.append(record['id'])
+                if record.get('account_id'):
+                    accounts_to_forget.append(record['account_id'])
 
         # Delete records if not in dry run mode
         if not self.dry_run and records_to_delete:
             self.logger.info(f"\nDeleting {len(records_to_delete)} duplicate records...")
 
+            # Otherwise the processors keep skipping these accounts as unchanged
+            fingerprints = FingerprintIndex()
+            fingerprints.forget(accounts_to_forget)
+            fingerprints.close()
+
             # Delete in batches to avoid timeout
             batch_size = 100
             for i in range(0, len(records_to_delete), batch_size):
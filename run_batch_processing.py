@@ -4,40 +4,49 @@ Batch processor for influencer data - processes in smaller chunks with better er
 """
 
 import sys
-import pandas as pd
 from process_influencers_round_3 import InfluencerDataProcessor
+from checkpoint_journal import CheckpointJournal
+from excel_cache import load_excel
 
 def main():
     # Create processor instance
     processor = InfluencerDataProcessor()
 
     # Read Excel file
+    input_file = 'verish_round_3.xlsx'
     print("\n📊 Reading Excel file...")
-    df = pd.read_excel('verish_round_3.xlsx')
+    df = load_excel(input_file)
     total_records = len(df)
 
     # Process in smaller batches
     batch_size = 20  # Process 20 records at a time
     start_idx = 0
 
-    # Check if we should start from a specific index (for resuming)
-    if len(sys.argv) > 1:
-        start_idx = int(sys.argv[1])
+    # Completed records are skipped via the checkpoint journal; --fresh ignores it
+    resume = '--fresh' not in sys.argv
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+
+    # Optionally start from a specific index
+    if args:
+        start_idx = int(args[0])
         print(f"Starting from index: {start_idx}")
 
-    # Process just the first 100 records for now
-    max_records = min(100, total_records)
+    journal = CheckpointJournal(input_file, processor.scraping_round, resume=resume)
+    journal_summary = journal.summary()
+    print(f"📒 Checkpoint journal: {journal.path} "
+          f"({journal_summary.get('done', 0)} done, {journal_summary.get('failed', 0)} to retry)")
 
-    print(f"\n🎯 Processing records {start_idx+1} to {max_records} out of {total_records} total")
+    print(f"\n🎯 Processing records {start_idx+1} to {total_records} out of {total_records} total")
 
     # Process the subset
-    df_subset = df.iloc[start_idx:max_records]
+    df_subset = df.iloc[start_idx:]
     processor.stats['total'] = len(df_subset)
 
     # Process in batches
-    for i in range(0, len(df_subset), batch_size):
-        processor.process_batch(df_subset, i, batch_size)
-        print(f"\n⏸  Batch complete. Processed {min(i+batch_size, len(df_subset))} of {len(df_subset)} records")
+    with journal:
+        for i in range(0, len(df_subset), batch_size):
+            processor.process_batch(df_subset, i, batch_size, journal=journal)
+            print(f"\n⏸  Batch complete. Processed {min(i+batch_size, len(df_subset))} of {len(df_subset)} records")
 
     # Print final summary
     print("\n" + "="*60)
@@ -45,7 +54,8 @@ def main():
     print("="*60)
     print(f"Total in batch: {len(df_subset)}")
     print(f"Successfully processed: {processor.stats['processed']}")
-    print(f"Database updates: {processor.stats['db_inserted']}")
+    print(f"Skipped (already done): {processor.stats['skipped']}")
+    print(f"Database updates: {processor.stats['db_inserted'] + processor.stats['db_updated']}")
     print(f"Errors: {len(processor.stats['errors'])}")
 
     if processor.stats['errors']:
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Multi-process sharded ingestion for the round processors.
+
+Records are partitioned by a stable hash of their account_id, so every
+influencer always lands in the same shard and no two workers write the
+same row. The parent parses the input once and splits it into one JSON
+Lines file per shard (split_shards); each worker process builds its own
+processor (and with it its own Supabase and boto3 clients), streams its
+shard file and returns its stats. The parent merges them (merge_stats) into
+one stats dict in the usual processing_stats format.
+"""
+
+import os
+import json
+import zlib
+import tempfile
+import multiprocessing
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List
+
+from record_stream import iter_records
+
+
+def shard_of(account_id: str, workers: int) -> int:
+    """Stable shard index for an account_id (unlike hash(), same in every process)"""
+    return zlib.crc32(str(account_id).encode('utf-8')) % workers
+
+
+def merge_stats(stats_list: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Sum counters and concatenate lists (errors) across worker stats"""
+    merged: Dict[str, Any] = {}
+    for stats in stats_list:
+        for key, value in stats.items():
+            if isinstance(value, list):
+                merged.setdefault(key, []).extend(value)
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                merged[key] = merged.get(key, 0) + value
+            else:
+                merged.setdefault(key, value)
+    return merged
+
+
+def split_shards(file_path: str, key_of: Callable[[Any], str], workers: int,
+                 directory: str, limit: int = None) -> List[str]:
+    """Stream file_path once into one JSON Lines file per shard, returning their paths"""
+    paths = [os.path.join(directory, f'shard_{shard}.jsonl') for shard in range(workers)]
+    files = [open(path, 'w', encoding='utf-8') for path in paths]
+    try:
+        for record in islice(iter_records(file_path), limit):
+            files[shard_of(key_of(record), workers)].write(json.dumps(record, ensure_ascii=False) + '\n')
+    finally:
+        for f in files:
+            f.close()
+    return paths
+
+
+def _run_shard(processor_cls, processor_kwargs: Dict[str, Any], shard_path: str,
+               options: Dict[str, Any]) -> Dict[str, Any]:
+    """Worker entry point: process one shard file with a fresh processor"""
+    processor = processor_cls(**processor_kwargs)
+    processor.process_json_stream(shard_path, **options)
+    return processor.stats
+
+
+def run_sharded(processor_cls, processor_kwargs: Dict[str, Any], file_path: str,
+                workers: int, key_of: Callable[[Any], str], limit: int = None,
+                **options) -> List[Dict[str, Any]]:
+    """
+    Process file_path across `workers` processes and return each worker's stats.
+
+    key_of(record) gives the account_id a record is sharded by; only the
+    first `limit` records are processed when given. processor_cls(**processor_kwargs)
+    must build a processor whose process_json_stream accepts `options`.
+    """
+    # spawn: workers never inherit the parent's open client connections
+    context = multiprocessing.get_context('spawn')
+    results = []
+
+    with tempfile.TemporaryDirectory(prefix='shards_') as directory, \
+            ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        print(f"\nSplitting {file_path} into {workers} shard files...")
+        shard_paths = split_shards(file_path, key_of, workers, directory, limit)
+        futures = {
+            executor.submit(_run_shard, processor_cls, processor_kwargs, path, options): shard
+            for shard, path in enumerate(shard_paths)
+        }
+        for future in as_completed(futures):
+            shard = futures[future]
+            try:
+                results.append(future.result())
+                print(f"\n✓ Worker {shard + 1}/{workers} finished")
+            except Exception as e:
+                print(f"\n✗ Worker {shard + 1}/{workers} failed: {str(e)}")
+                results.append({'errors': [f"Worker {shard} failed: {str(e)}"]})
+
+    return results
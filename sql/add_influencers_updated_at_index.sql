@@ -0,0 +1,13 @@
+-- Migration: Index influencers by (updated_at, id) for the local mirror sync
+-- influencers.updated_at and its update_updated_at_column() trigger already
+-- exist (see README_DATABASE_KR.md); influencer_mirror.py keyset-pages by
+-- (updated_at, id) from the last pair it has seen
+
+CREATE INDEX IF NOT EXISTS idx_influencers_updated_at_id
+    ON influencers(updated_at, id);
+
+-- Verification query
+SELECT
+    COUNT(*) as total_records,
+    MAX(updated_at) as last_updated
+FROM influencers;
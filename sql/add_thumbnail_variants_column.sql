@@ -0,0 +1,12 @@
+-- Migration: Add resized thumbnail variants to influencers table
+-- Filled by the round processors when run with --transcode:
+-- {"card": {"webp": "...", "jpg": "..."}, "table": {"webp": "...", "jpg": "..."}}
+
+ALTER TABLE influencers
+ADD COLUMN IF NOT EXISTS r2_thumbnail_variants JSONB;
+
+-- Verification query
+SELECT
+    COUNT(*) as total_records,
+    COUNT(r2_thumbnail_variants) as records_with_variants
+FROM influencers;
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Pooled, concurrent thumbnail downloader.
+
+One ThumbnailFetcher owns a keep-alive requests.Session (connections to the
+TikTok/Instagram CDNs are reused instead of a TLS handshake per cover) and a
+thread pool. Requests go through an AdaptiveThrottle (host_throttle), which
+adapts how many requests hit the same CDN host at once, retries 429/5xx and
+connection errors with backoff, and parks hosts that keep failing.
+
+    fetcher = ThumbnailFetcher()
+    for result in fetcher.download_all([(url, Path('thumbs/a.jpg')), ...]):
+        print(result.target, result.error)
+
+download_all streams results back as downloads finish, keeping at most a
+bounded number of jobs in flight, so it also works on generators.
+
+With write=False nothing is written to disk and keep_content=True returns
+the bytes in result.content, for uploading straight from memory.
+"""
+
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+from typing import Iterable, Iterator, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from host_throttle import AdaptiveThrottle
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+# path: the target file (None on failure or when not written); cached: it
+# already existed; content: the image bytes when requested
+FetchResult = namedtuple('FetchResult', ['url', 'target', 'path', 'error', 'cached', 'content'],
+                         defaults=(None,))
+
+
+class MemoryImage(namedtuple('MemoryImage', ['target', 'content'])):
+    """A downloaded image held in memory, named after the file it would be saved as"""
+    __slots__ = ()
+
+    @property
+    def name(self) -> str:
+        return self.target.name
+
+    @property
+    def stem(self) -> str:
+        return self.target.stem
+
+    @property
+    def suffix(self) -> str:
+        return self.target.suffix
+
+
+class ThumbnailFetcher:
+    def __init__(self, max_workers: int = 16, per_host: int = 8, timeout: int = 10,
+                 throttle: AdaptiveThrottle = None):
+        """
+        Create the pooled session and thread pool.
+
+        per_host is the starting concurrency per CDN host; the throttle
+        raises it up to max_workers while the host keeps up.
+        """
+        self.max_workers = max_workers
+        self.per_host = per_host
+        self.timeout = timeout
+        self.throttle = throttle or AdaptiveThrottle(initial=per_host, max_limit=max_workers)
+
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = USER_AGENT
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def _get(self, url: str) -> bytes:
+        response = self.session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        return response.content
+
+    def fetch(self, url: str) -> bytes:
+        """GET a URL through the pooled session under the host's adaptive throttle"""
+        return self.throttle.call(urlsplit(url).netloc, lambda: self._get(url))
+
+    def download(self, url: str, target: Path, write: bool = True,
+                 keep_content: bool = False) -> FetchResult:
+        """
+        Download url to target unless the file already exists.
+
+        write=False keeps the disk out of it entirely (target only names the
+        image); keep_content returns the bytes in result.content.
+        """
+        target = Path(target)
+        try:
+            if write and target.exists():
+                content = target.read_bytes() if keep_content else None
+                return FetchResult(url, target, target, None, True, content)
+
+            content = self.fetch(url)
+            if write:
+                # Write via a temp file so a crash never leaves a truncated image
+                tmp = target.with_name(f"{target.name}.{threading.get_ident()}.part")
+                with open(tmp, 'wb') as f:
+                    f.write(content)
+                tmp.replace(target)
+            return FetchResult(url, target, target if write else None, None, False,
+                               content if keep_content else None)
+        except Exception as e:
+            return FetchResult(url, target, None, str(e), False)
+
+    def download_all(self, jobs: Iterable[Tuple[str, Path]], write: bool = True,
+                     keep_content: bool = False) -> Iterator[FetchResult]:
+        """Download (url, target) pairs concurrently, yielding results as they finish"""
+        max_in_flight = self.max_workers * 4
+        pending = set()
+
+        for url, target in jobs:
+            pending.add(self._executor.submit(self.download, url, target, write, keep_content))
+            if len(pending) >= max_in_flight:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        self.session.close()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Dashboard-sized thumbnail variants.
+
+Covers come off the CDN as full-size JPEGs (often 1080p) while the dashboard
+only shows them as card and table thumbnails. transcode() turns one cover
+into a small WebP plus a JPEG fallback for every size in VARIANT_SIZES:
+
+    card   480px wide   kai grace_card.webp / kai grace_card.jpg
+    table  120px wide   kai grace_table.webp / kai grace_table.jpg
+
+Resizing and encoding is CPU bound, so ThumbnailTranscoder runs it in a
+process pool; transcode_all takes a whole batch of covers at once. The
+pool spawns its workers: forking a processor that already runs fetcher and
+pipeline threads can copy a held lock into the child.
+"""
+
+import multiprocessing
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from io import BytesIO
+from typing import Any, Dict, Iterator, List, Tuple
+
+from PIL import Image, ImageOps
+
+# (name, max width) per dashboard use; covers are never upscaled
+VARIANT_SIZES = (('card', 480), ('table', 120))
+
+# (suffix, content type, Pillow format) of every encoded variant
+VARIANT_FORMATS = (
+    ('.webp', 'image/webp', 'WEBP'),
+    ('.jpg', 'image/jpeg', 'JPEG'),
+)
+
+Variant = namedtuple('Variant', ['size', 'suffix', 'content_type', 'content'])
+
+
+def transcode(source, sizes=VARIANT_SIZES, quality: int = 80) -> List[Variant]:
+    """Resize an image (path or bytes) to every size, encoded in every format"""
+    if isinstance(source, (bytes, bytearray)):
+        source = BytesIO(source)
+
+    variants = []
+    with Image.open(source) as image:
+        # Phone covers often rely on EXIF rotation; bake it in before resizing
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        for size, width in sizes:
+            resized = image.copy()
+            # Bound only the width; tall covers keep their aspect ratio
+            resized.thumbnail((width, width * 4), Image.LANCZOS)
+            for suffix, content_type, pil_format in VARIANT_FORMATS:
+                buffer = BytesIO()
+                resized.save(buffer, pil_format, quality=quality)
+                variants.append(Variant(size, suffix, content_type, buffer.getvalue()))
+    return variants
+
+
+class ThumbnailTranscoder:
+    def __init__(self, max_workers: int = None, sizes=VARIANT_SIZES, quality: int = 80):
+        """Create the transcoding process pool (one worker per CPU by default)"""
+        self.sizes = sizes
+        self.quality = quality
+        self._executor = ProcessPoolExecutor(max_workers=max_workers,
+                                             mp_context=multiprocessing.get_context('spawn'))
+
+    def transcode(self, source) -> List[Variant]:
+        """Transcode one image in the pool and wait for the result"""
+        return self._executor.submit(transcode, source, self.sizes, self.quality).result()
+
+    def transcode_all(self, sources: Dict[Any, Any]) -> Iterator[Tuple[Any, List[Variant], str]]:
+        """
+        Transcode many images (key → path or bytes) concurrently.
+
+        Yields (key, variants, error) as images finish; variants is None
+        when the image could not be decoded.
+        """
+        futures = {
+            self._executor.submit(transcode, source, self.sizes, self.quality): key
+            for key, source in sources.items()
+        }
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as e:
+                yield futures[future], None, str(e)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
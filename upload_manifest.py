@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Local manifest of files uploaded to R2.
+
+For every uploaded object the manifest keeps the bucket, key, and the
+local file's size, mtime and MD5 (the ETag R2 reports for single-part
+uploads). R2Uploader.upload_directory compares each file against it with
+one stat() call and only sends new or changed files, without a HEAD
+request per file.
+
+A file whose mtime changed but whose size and MD5 did not (e.g. it was
+re-downloaded with the same bytes) is not re-uploaded either; only its
+manifest entry is refreshed.
+
+The manifest is a SQLite file next to the uploaded directory
+(thumbnails_regular → .thumbnails_regular.r2_manifest.sqlite).
+"""
+
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from datetime import datetime
+from typing import Optional
+
+
+def manifest_path(directory) -> Path:
+    """Manifest file kept next to an upload directory"""
+    directory = Path(directory).resolve()
+    return directory.parent / f".{directory.name}.r2_manifest.sqlite"
+
+
+def file_md5(file_path) -> str:
+    """Hex MD5 of a file, read in chunks"""
+    digest = hashlib.md5()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class UploadManifest:
+    def __init__(self, path):
+        """Open (or create) the manifest"""
+        self.path = Path(path)
+        # upload_directory checks and records from its worker threads
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS uploads (
+                bucket TEXT NOT NULL,
+                key TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                md5 TEXT NOT NULL,
+                uploaded_at TEXT,
+                PRIMARY KEY (bucket, key)
+            )
+        """)
+        self._conn.commit()
+
+    def get(self, bucket: str, key: str) -> Optional[tuple]:
+        """(size, mtime_ns, md5) recorded for an object, if any"""
+        with self._lock:
+            return self._conn.execute(
+                'SELECT size, mtime_ns, md5 FROM uploads WHERE bucket = ? AND key = ?',
+                (bucket, key)
+            ).fetchone()
+
+    def is_current(self, bucket: str, key: str, file_path) -> bool:
+        """
+        True if file_path is what was last uploaded to key.
+
+        Size and mtime are compared first; the MD5 is only computed when
+        the mtime moved but the size did not.
+        """
+        entry = self.get(bucket, key)
+        if entry is None:
+            return False
+
+        size, mtime_ns, md5 = entry
+        st = Path(file_path).stat()
+        if st.st_size != size:
+            return False
+        if st.st_mtime_ns == mtime_ns:
+            return True
+
+        if file_md5(file_path) != md5:
+            return False
+        # Same bytes with a new mtime: refresh the entry, skip the upload
+        self.record(bucket, key, file_path, md5)
+        return True
+
+    def record(self, bucket: str, key: str, file_path, md5: str = None) -> None:
+        """Record that file_path's current contents are stored at key"""
+        st = Path(file_path).stat()
+        if md5 is None:
+            md5 = file_md5(file_path)
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO uploads VALUES (?, ?, ?, ?, ?, ?)',
+                (bucket, key, st.st_size, st.st_mtime_ns, md5,
+                 datetime.now().isoformat(timespec='seconds'))
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        self._conn.close()
@@ -10,6 +10,8 @@ import boto3
 from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from botocore.config import Config
+from upload_manifest import UploadManifest, manifest_path
+from record_stream import iter_members, JsonObjectWriter
 
 class R2Uploader:
     def __init__(self, account_id, access_key_id, secret_access_key, bucket_name):
@@ -50,22 +52,59 @@ class R2Uploader:
         except Exception as e:
             return False, str(e)
 
-    def upload_directory(self, directory, key_prefix='', max_workers=5):
-        """Upload all files from a directory"""
+    def list_keys(self, prefix=''):
+        """Every object key under prefix, listed 1000 per request"""
+        keys = set()
+        paginator = self.s3_client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix):
+            keys.update(obj['Key'] for obj in page.get('Contents', []))
+        return keys
+
+    def sync_file(self, file_path, key_prefix, manifest):
+        """Upload a file unless the manifest shows it is already in R2"""
+        file_path = Path(file_path)
+        key = f"{key_prefix}{file_path.name}" if key_prefix else file_path.name
+
+        try:
+            if manifest.is_current(self.bucket_name, key, file_path):
+                return None, key
+        except Exception as e:
+            return False, str(e)
+
+        success, result = self.upload_file(file_path, key_prefix)
+        if success:
+            manifest.record(self.bucket_name, key, file_path)
+        return success, result
+
+    def upload_directory(self, directory, key_prefix='', max_workers=5, use_manifest=True):
+        """
+        Upload all files from a directory.
+
+        With use_manifest (the default) only files that are new or changed
+        since their last upload are sent; the rest are reported as skipped.
+        """
         directory = Path(directory)
         files = list(directory.glob('*.jpg'))
 
-        results = {'success': [], 'failed': []}
+        results = {'success': [], 'failed': [], 'skipped': []}
         total = len(files)
 
         print(f"\nUploading {total} files from {directory}...")
 
+        manifest = UploadManifest(manifest_path(directory)) if use_manifest else None
+
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
             # Submit all upload tasks
-            futures = {
-                executor.submit(self.upload_file, file, key_prefix): file
-                for file in files
-            }
+            if manifest is not None:
+                futures = {
+                    executor.submit(self.sync_file, file, key_prefix, manifest): file
+                    for file in files
+                }
+            else:
+                futures = {
+                    executor.submit(self.upload_file, file, key_prefix): file
+                    for file in files
+                }
 
             # Process completed uploads
             completed = 0
@@ -74,13 +113,20 @@ class R2Uploader:
                 file = futures[future]
                 success, result = future.result()
 
-                if success:
+                if success is None:
+                    results['skipped'].append(file.name)
+                elif success:
                     results['success'].append(file.name)
                     print(f"✓ [{completed}/{total}] Uploaded: {file.name}")
                 else:
                     results['failed'].append((file.name, result))
                     print(f"✗ [{completed}/{total}] Failed: {file.name} - {result}")
 
+        if manifest is not None:
+            manifest.close()
+            if results['skipped']:
+                print(f"↷ Skipped {len(results['skipped'])} unchanged files (already in R2)")
+
         return results
 
 def load_config():
@@ -121,43 +167,65 @@ def save_config_template():
     print("Created r2_config_template.json")
     print("Please copy it to r2_config.json and fill in your credentials")
 
+def thumbnail_index(folders=('thumbnails_regular', 'thumbnails_sales')):
+    """File names in each thumbnail folder, from one os.scandir pass per folder"""
+    index = {}
+    for folder in folders:
+        try:
+            with os.scandir(folder) as entries:
+                index[folder] = {entry.name for entry in entries if entry.is_file()}
+        except FileNotFoundError:
+            index[folder] = set()
+    return index
+
 def update_data_with_urls(base_url, dry_run=False):
     """Update data_combined.json with R2 URLs"""
-    with open('data_combined.json', 'r', encoding='utf-8') as f:
-        data = json.load(f)
-
+    # Resolve files with set lookups instead of two exists() calls per item
+    index = thumbnail_index()
     updated = 0
-    for item in data['data']:
-        if 'account_id' in item and item['account_id']:
-            # Clean account_id for filename
-            account_id = str(item['account_id'])
-            account_id = account_id.replace('/', '_').replace('\\', '_').replace(':', '_')
-
-            # Determine which folder based on influencer_type
-            folder = 'thumbnails_sales' if item.get('influencer_type') == 'sales' else 'thumbnails_regular'
-
-            # Build the R2 URL
-            # Check for duplicates (files with _ID suffix)
-            possible_files = [
-                f"{account_id}.jpg",
-                f"{account_id}_{item['id']}.jpg"
-            ]
-
-            # Check which file exists
-            for filename in possible_files:
-                file_path = Path(folder) / filename
-                if file_path.exists():
-                    item['r2_thumbnail_url'] = f"{base_url}{folder}/{filename}"
-                    updated += 1
-                    break
 
+    def with_urls(items):
+        nonlocal updated
+        for item in items:
+            if 'account_id' in item and item['account_id']:
+                # Clean account_id for filename
+                account_id = str(item['account_id'])
+                account_id = account_id.replace('/', '_').replace('\\', '_').replace(':', '_')
+
+                # Determine which folder based on influencer_type
+                folder = 'thumbnails_sales' if item.get('influencer_type') == 'sales' else 'thumbnails_regular'
+
+                # Build the R2 URL
+                # Check for duplicates (files with _ID suffix)
+                possible_files = [
+                    f"{account_id}.jpg",
+                    f"{account_id}_{item['id']}.jpg"
+                ]
+
+                # Check which file exists
+                for filename in possible_files:
+                    if filename in index[folder]:
+                        item['r2_thumbnail_url'] = f"{base_url}{folder}/{filename}"
+                        updated += 1
+                        break
+            yield item
+
+    # Stream the items through, one at a time, in the same layout json.dump wrote
+    members = iter_members('data_combined.json', stream_keys={'data'})
     if not dry_run:
-        # Save updated data
-        with open('data_combined_with_r2.json', 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        with JsonObjectWriter('data_combined_with_r2.json') as writer:
+            for key, value in members:
+                if key == 'data':
+                    writer.write_array(key, with_urls(value))
+                else:
+                    writer.write_member(key, value)
         print(f"\n✅ Updated {updated} items with R2 URLs")
         print("Saved to: data_combined_with_r2.json")
     else:
+        for key, value in members:
+            if key == 'data':
+                for _ in with_urls(value):
+                    pass
         print(f"\n📋 DRY RUN: Would update {updated} items with R2 URLs")
 
     return updated
@@ -224,15 +292,20 @@ def main():
             ('thumbnails_sales', 'thumbnails_sales/')
         ]
 
+    # Re-upload every file, ignoring the upload manifest
+    use_manifest = '--full' not in sys.argv
+
     # Upload directories
-    all_results = {'success': [], 'failed': []}
+    all_results = {'success': [], 'failed': [], 'skipped': []}
 
     for local_dir, r2_prefix in directories:
         if os.path.exists(local_dir):
             print(f"\n📤 Uploading {local_dir} to R2...")
-            results = uploader.upload_directory(local_dir, r2_prefix, max_workers=10)
+            results = uploader.upload_directory(local_dir, r2_prefix, max_workers=10,
+                                                use_manifest=use_manifest)
             all_results['success'].extend(results['success'])
             all_results['failed'].extend(results['failed'])
+            all_results['skipped'].extend(results['skipped'])
         else:
             print(f"\n⚠️  Directory {local_dir} not found!")
 
@@ -241,6 +314,7 @@ def main():
     print("UPLOAD SUMMARY")
     print("=" * 60)
     print(f"✅ Successfully uploaded: {len(all_results['success'])} files")
+    print(f"↷ Unchanged (skipped): {len(all_results['skipped'])} files")
     print(f"❌ Failed: {len(all_results['failed'])} files")
 
     if all_results['failed']:
@@ -11,22 +11,45 @@ import os
 import sys
 import json
 import re
-import requests
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Set, Tuple
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
 from supabase import create_client
 import boto3
 from botocore.config import Config
 import time
-import hashlib
+import asyncio
+import threading
+
+# Shared pipeline modules live at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from ingest_pipeline import StagedIngestPipeline
+from bulk_upsert import bulk_upsert_influencers, chunked, DEFAULT_CHUNK_SIZE
+from record_stream import iter_records, iter_batches
+from field_mapping import compile_mapping, TIKTOK_JSON
+from sharded_ingest import run_sharded, merge_stats
+from fingerprint_index import FingerprintIndex, row_fingerprint
+from thumbnail_fetcher import ThumbnailFetcher, FetchResult, MemoryImage
+from content_store import ContentIndex, image_digest, content_key
+from thumbnail_variants import ThumbnailTranscoder, Variant
+from cover_expiry import url_expiry, is_expired, by_expiry, format_expiry
+from perceptual_index import PerceptualIndex, dhash
+from itertools import islice
 
 class InfluencerDataProcessor:
     def __init__(self, config_file: str = '../../supabase_config.json',
                  r2_config_file: str = '../../r2_config.json',
-                 scraping_round: int = 5):
+                 scraping_round: int = 5, skip_unchanged: bool = True,
+                 content_addressed: bool = False, diskless: bool = False,
+                 write_through: bool = False, transcode: bool = False,
+                 perceptual: bool = False, transcode_workers: int = None):
         """Initialize processor with configs"""
+        if perceptual and not content_addressed:
+            # Reused keys must never change content, which only content-addressed keys guarantee
+            raise ValueError("perceptual reuse needs content_addressed keys")
+
         # Load Supabase config
         config_path = Path(__file__).parent / config_file
         with open(config_path, 'r') as f:
@@ -37,6 +60,7 @@ class InfluencerDataProcessor:
             supabase_config['supabase_key']
         )
         self.scraping_round = scraping_round
+        self.extract_record = compile_mapping(TIKTOK_JSON, scraping_round=scraping_round)
 
         # Load R2 config
         r2_path = Path(__file__).parent / r2_config_file
@@ -56,13 +80,35 @@ class InfluencerDataProcessor:
             region_name='auto',
             config=Config(
                 signature_version='s3v4',
-                retries={'max_attempts': 3}
+                # Retries/backoff are handled by the fetcher's adaptive throttle
+                retries={'total_max_attempts': 1}
             )
         )
 
+        # Diskless mode: covers go from the download buffer straight to R2;
+        # write_through still saves (and reuses) the local copies
+        self.diskless = diskless
+        self.write_through = write_through
+
         # Create directories for thumbnails
         self.thumbnails_dir = Path(f'thumbnails_round_{self.scraping_round}')
-        self.thumbnails_dir.mkdir(exist_ok=True)
+        if self.keeps_local_files:
+            self.thumbnails_dir.mkdir(exist_ok=True)
+
+        # Pooled keep-alive session shared by all cover downloads
+        self.fetcher = ThumbnailFetcher()
+
+        # Dashboard-sized WebP/JPEG variants, encoded in a process pool
+        self.transcoder = ThumbnailTranscoder(max_workers=transcode_workers) if transcode else None
+
+        # Rows already written with identical content are skipped
+        self.fingerprints = FingerprintIndex() if skip_unchanged else None
+
+        # Content-addressed mode: R2 keys by image SHA-256, each image uploaded once
+        self.content_index = ContentIndex(self.bucket_name) if content_addressed else None
+
+        # Covers that look like one already in R2 (re-encoded copies) reuse its key
+        self.perceptual_index = PerceptualIndex(self.bucket_name) if perceptual else None
 
         # Stats tracking
         self.stats = {
@@ -70,113 +116,159 @@ class InfluencerDataProcessor:
             'processed': 0,
             'images_downloaded': 0,
             'images_uploaded': 0,
+            'uploads_deduplicated': 0,
+            'near_duplicates_reused': 0,
+            'variants_uploaded': 0,
             'db_inserted': 0,
             'db_updated': 0,
-            'errors': []
+            'unchanged': 0,
+            'covers_expired': 0,
+            'errors': [],
+            # Rows whose signed cover URL expired before it could be fetched
+            'needs_rescrape': []
         }
-
-    def format_number(self, num) -> str:
-        """Format number with K, M notation"""
-        if num is None or (isinstance(num, float) and num != num):
-            return '0'
-
-        try:
-            num = int(num)
-        except:
-            return '0'
-
-        if num >= 1_000_000:
-            return f"{num/1_000_000:.1f}M"
-        elif num >= 1_000:
-            return f"{num/1_000:.1f}K"
-        else:
-            return str(num)
-
-    def extract_email(self, text: str) -> Optional[str]:
-        """Extract email from text using regex"""
-        if not text:
+        # Counters are bumped from worker threads in pipeline mode
+        self._stats_lock = threading.Lock()
+
+    def count(self, key: str, amount: int = 1) -> None:
+        """Increment a stats counter (thread-safe)"""
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    @property
+    def keeps_local_files(self) -> bool:
+        """Whether covers are written to the thumbnails dir"""
+        return not self.diskless or self.write_through
+
+    def thumbnail_path(self, author_name: str) -> Path:
+        """Local cover file for an author (author_name cleaned for the filename)"""
+        clean_author_name = re.sub(r'[/\\:*?"<>|]', '_', str(author_name))
+        return self.thumbnails_dir / f"{clean_author_name}.jpg"
+
+    def report_download(self, result: FetchResult, author_name: str):
+        """
+        Print and count a fetch result, returning the image (None on failure).
+
+        The image is its local path, or a MemoryImage in diskless mode.
+        """
+        if result.error:
+            print(f"  ✗ Failed to download image for {author_name}: {result.error}")
+            self.stats['errors'].append(f"Download failed for {author_name}: {result.error}")
             return None
 
-        email_pattern = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
-        match = re.search(email_pattern, str(text))
-
-        if match:
-            return match.group(0).lower()
-        return None
-
-    def determine_follower_tier(self, follower_count: int) -> str:
-        """Determine follower tier (마이크로/메가)"""
-        if not follower_count:
-            return "Unknown"
-
-        if follower_count < 100_000:
-            return "마이크로"
+        if result.cached:
+            print(f"  ✓ Image already exists: {result.target.name}")
         else:
-            return "메가"
-
-    def safe_int(self, value, default=0, max_val=2147483647):
-        """Convert to int with bounds checking"""
-        if value is None or (isinstance(value, float) and value != value):
-            return default
-        try:
-            val = int(value)
-            return min(val, max_val)
-        except:
-            return default
+            self.count('images_downloaded')
+            print(f"  ✓ Downloaded: {result.target.name}")
+
+        if self.diskless:
+            return MemoryImage(result.target, result.content)
+        return result.path
+
+    def cover_url(self, record: Dict[str, Any], data: Dict[str, Any]) -> Optional[str]:
+        """
+        The record's cover URL, or None if there is none to fetch.
+
+        Expired signed URLs are not requested at all; the row is added to
+        the needs_rescrape report instead.
+        """
+        url = record.get('videoMeta', {}).get('coverUrl')
+        if not url or not is_expired(url):
+            return url
+
+        print(f"  ⌛ Cover URL expired {format_expiry(url)}, needs re-scrape")
+        with self._stats_lock:
+            self.stats['covers_expired'] += 1
+            self.stats['needs_rescrape'].append({
+                'account_id': data['account_id'],
+                'author_name': data['author_name'],
+                'video_url': data.get('video_url'),
+                'expired_at': url_expiry(url),
+            })
+        return None
 
-    def download_image(self, url: str, author_name: str) -> Optional[Path]:
+    def download_image(self, url: str, author_name: str):
         """Download image from URL using author_name for filename"""
         if not url:
             return None
 
-        try:
-            # Clean author_name for filename
-            clean_author_name = re.sub(r'[/\\:*?"<>|]', '_', str(author_name))
-            image_path = self.thumbnails_dir / f"{clean_author_name}.jpg"
-
-            # Skip if already exists
-            if image_path.exists():
-                print(f"  ✓ Image already exists: {image_path.name}")
-                return image_path
-
-            # Download image
-            response = requests.get(url, timeout=10, headers={
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            })
-            response.raise_for_status()
-
-            # Save image
-            with open(image_path, 'wb') as f:
-                f.write(response.content)
-
-            self.stats['images_downloaded'] += 1
-            print(f"  ✓ Downloaded: {image_path.name}")
-            return image_path
+        result = self.fetcher.download(url, self.thumbnail_path(author_name),
+                                       write=self.keeps_local_files, keep_content=self.diskless)
+        return self.report_download(result, author_name)
+
+    def download_images(self, covers: Dict[Path, Tuple[str, str]]) -> Dict[Path, Any]:
+        """
+        Download many covers concurrently.
+
+        `covers` maps each target file to its (url, author_name); returns the
+        image (None on failure) for every target.
+        """
+        if not covers:
+            return {}
+
+        # Soonest-expiring signed URLs first, before their signature runs out
+        print(f"\n  Downloading {len(covers)} covers...")
+        jobs = by_expiry(((url, target) for target, (url, _) in covers.items()), lambda job: job[0])
+        results = self.fetcher.download_all(jobs, write=self.keeps_local_files,
+                                            keep_content=self.diskless)
+        return {
+            result.target: self.report_download(result, covers[result.target][1])
+            for result in results
+        }
 
-        except Exception as e:
-            print(f"  ✗ Failed to download image for {author_name}: {str(e)}")
-            self.stats['errors'].append(f"Download failed for {author_name}: {str(e)}")
-            return None
+    def upload_to_r2(self, file_path, key_prefix: str = None, variant: str = '',
+                     content_type: str = 'image/jpeg') -> Optional[str]:
+        """
+        Upload file (a local Path or a MemoryImage) to R2 and return URL.
 
-    def upload_to_r2(self, file_path: Path, key_prefix: str = None) -> Optional[str]:
-        """Upload file to R2 and return URL"""
+        variant (e.g. '_card') is appended to the key before the extension.
+        """
         try:
-            if key_prefix is None:
-                key_prefix = f'thumbnails_round_{self.scraping_round}/'
-            key = f"{key_prefix}{file_path.name}"
-
-            # Upload to R2
-            self.s3_client.upload_file(
-                str(file_path),
-                self.bucket_name,
-                key,
-                ExtraArgs={
-                    'ContentType': 'image/jpeg',
-                    'CacheControl': 'public, max-age=31536000'
-                }
-            )
-
-            self.stats['images_uploaded'] += 1
+            in_memory = isinstance(file_path, MemoryImage)
+            digest = None
+            if self.content_index is not None and key_prefix is None:
+                # Key by the image bytes; skip the PUT if they are already stored
+                digest = image_digest(file_path.content if in_memory else file_path)
+                stored_key = self.content_index.get(digest)
+                if stored_key:
+                    self.count('uploads_deduplicated')
+                    print(f"  ↷ Already in R2: {stored_key}")
+                    return f"{self.thumbnails_base_url}{stored_key}"
+                key = content_key(digest, f"{variant}{file_path.suffix}")
+            else:
+                if key_prefix is None:
+                    key_prefix = f'thumbnails_round_{self.scraping_round}/'
+                key = f"{key_prefix}{file_path.stem}{variant}{file_path.suffix}"
+
+            # Only content-addressed keys are reused: a name key is overwritten by the next upload
+            phash = None
+            if self.perceptual_index is not None and digest and not variant:
+                phash = self.perceptual_hash(file_path)
+                match = self.perceptual_index.lookup(phash) if phash is not None else None
+                if match:
+                    self.count('near_duplicates_reused')
+                    print(f"  ↷ Near-duplicate of {match[0]} ({match[1]} bits apart), reusing it")
+                    return f"{self.thumbnails_base_url}{match[0]}"
+
+            # Upload to R2 (straight from the buffer in diskless mode), retried
+            # with backoff and parked on repeated failures by the throttle
+            body = file_path.content if in_memory else file_path.read_bytes()
+            self.fetcher.throttle.call('r2', partial(
+                self.s3_client.put_object,
+                Bucket=self.bucket_name,
+                Key=key,
+                Body=body,
+                ContentType=content_type,
+                CacheControl='public, max-age=31536000'
+            ))
+
+            if digest:
+                self.content_index.store(digest, key, len(body))
+            if phash is not None:
+                self.perceptual_index.add(phash, key, None if in_memory else str(file_path.resolve()))
+
+            self.count('variants_uploaded' if variant else 'images_uploaded')
             r2_url = f"{self.thumbnails_base_url}{key}"
             print(f"  ✓ Uploaded to R2: {key}")
             return r2_url
@@ -186,159 +278,244 @@ class InfluencerDataProcessor:
             self.stats['errors'].append(f"Upload failed for {file_path.name}: {str(e)}")
             return None
 
-    def process_record(self, record: Dict[str, Any]) -> Dict[str, Any]:
-        """Process a single record from the JSON data"""
+    def perceptual_hash(self, image) -> Optional[int]:
+        """dHash of a cover (None if it can't be decoded; it is then uploaded as is)"""
+        try:
+            return dhash(image.content if isinstance(image, MemoryImage) else image)
+        except Exception as e:
+            print(f"  ⚠ Could not hash {image.name}: {str(e)}")
+            return None
 
-        # Extract nested fields safely
-        author_meta = record.get('authorMeta', {})
-        video_meta = record.get('videoMeta', {})
-        music_meta = record.get('musicMeta', {})
-
-        # Basic fields mapping
-        data = {
-            # Counts and formatted versions
-            'shares_count': self.safe_int(record.get('shareCount', 0)),
-            'shares_count_formatted': self.format_number(record.get('shareCount', 0)),
-            'comments_count': self.safe_int(record.get('commentCount', 0)),
-            'comments_count_formatted': self.format_number(record.get('commentCount', 0)),
-            'views_count': self.safe_int(record.get('playCount', 0)),
-            'views_count_formatted': self.format_number(record.get('playCount', 0)),
-            'likes_count': self.safe_int(record.get('diggCount', 0)),
-            'likes_count_formatted': self.format_number(record.get('diggCount', 0)),
-            'follower_count': self.safe_int(author_meta.get('fans', 0)),
-            'follower_count_formatted': self.format_number(author_meta.get('fans', 0)),
-
-            # Account info
-            'account_id': str(author_meta.get('name', '')),  # username
-            'author_id': str(author_meta.get('id', '')),
-            'author_name': str(author_meta.get('nickName', '')),  # display name
-
-            # Video info
-            'upload_time': record.get('createTimeISO'),
-            'upload_count': self.safe_int(author_meta.get('video', 0)),
-            'video_duration': self.safe_int(video_meta.get('duration', 0)),
-            'video_caption': str(record.get('text', '')),
-            'thumbnail_url': str(video_meta.get('coverUrl', '')),
-            'video_url': str(record.get('webVideoUrl', '')),
-
-            # Music info
-            'music_artist': str(music_meta.get('musicAuthor', '')),
-            'music_title': str(music_meta.get('musicName', '')),
-
-            # Profile info
-            'profile_intro': str(author_meta.get('signature', '')),
-            'profile_entry': str(author_meta.get('profileUrl', '')),
-
-            # Scraping info
-            'scraping_round': self.scraping_round
-        }
+    def transcode_images(self, images: Dict[Path, Any]) -> Dict[Path, List[Variant]]:
+        """Transcode downloaded covers (target → image) into dashboard variants"""
+        if self.transcoder is None:
+            return {}
 
-        # Calculate metrics
-        plays = data['views_count']
-        likes = data['likes_count']
-        comments = data['comments_count']
-        shares = data['shares_count']
-        followers = data['follower_count']
-
-        # Engagement rate
-        if plays > 0:
-            data['engagement_rate'] = round((likes + comments + shares) / plays * 100, 2)
-            data['comment_conversion'] = round(comments / plays * 100, 2)
-        else:
-            data['engagement_rate'] = 0.0
-            data['comment_conversion'] = 0.0
+        sources = {
+            target: image.content if isinstance(image, MemoryImage) else image
+            for target, image in images.items() if image
+        }
+        variants = {}
+        for target, result, error in self.transcoder.transcode_all(sources):
+            if error:
+                print(f"  ✗ Failed to transcode {target.name}: {error}")
+                self.stats['errors'].append(f"Transcode failed for {target.name}: {error}")
+            else:
+                variants[target] = result
+        return variants
+
+    def upload_variants(self, image, variants: List[Variant]) -> Dict[str, Dict[str, str]]:
+        """Upload a cover's variants under size-suffixed keys, returning {size: {format: url}}"""
+        target = image.target if isinstance(image, MemoryImage) else image
+        urls = {}
+        for variant in variants:
+            variant_image = MemoryImage(target.with_suffix(variant.suffix), variant.content)
+            r2_url = self.upload_to_r2(variant_image, variant=f"_{variant.size}",
+                                       content_type=variant.content_type)
+            if r2_url:
+                urls.setdefault(variant.size, {})[variant.suffix.lstrip('.')] = r2_url
+        return urls
+
+    def upload_thumbnail(self, image, data: Dict[str, Any], variants: List[Variant] = None) -> None:
+        """
+        Upload a downloaded cover and record its R2 URLs on the row.
+
+        With transcoding enabled the variants are uploaded too; variants=None
+        transcodes the cover here (pipeline mode transcodes one at a time).
+        """
+        r2_url = self.upload_to_r2(image) if image else None
+        data['r2_thumbnail_url'] = r2_url or ''
+
+        if self.transcoder is not None:
+            if r2_url and variants is None:
+                target = image.target if isinstance(image, MemoryImage) else image
+                variants = self.transcode_images({target: image}).get(target)
+            data['r2_thumbnail_variants'] = self.upload_variants(image, variants) if r2_url and variants else None
+
+    def account_key(self, record: Dict[str, Any]) -> str:
+        """account_id of a raw record (authorMeta.name), used to pick its shard"""
+        return str((record.get('authorMeta') or {}).get('name', ''))
 
-        # Follower quality
-        if followers > 0:
-            data['follower_quality'] = round((likes + comments) / followers * 100, 2)
-        else:
-            data['follower_quality'] = 0.0
+    def process_record(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Process a single record from the JSON data"""
+        return self.extract_record(record)
+
+    def unchanged_accounts(self, rows: List[Dict[str, Any]]) -> Set[str]:
+        """account_ids of rows already written with the same fingerprint and still in the DB"""
+        if self.fingerprints is None:
+            return set()
+
+        hits = {}
+        for data in rows:
+            entry = self.fingerprints.get(data['account_id'])
+            if entry is not None and entry['fingerprint'] == row_fingerprint(data):
+                hits[data['account_id']] = entry['r2_thumbnail_url'] or ''
+        if not hits:
+            return set()
+
+        # The local index can't see rows deleted or thumbnails cleared by the
+        # maintenance tools, so confirm every hit against the DB in one lookup per chunk
+        live = {}
+        try:
+            for chunk in chunked(list(hits), DEFAULT_CHUNK_SIZE):
+                result = self.supabase.table('influencers').select('account_id,r2_thumbnail_url').in_(
+                    'account_id', chunk
+                ).execute()
+                live.update((r['account_id'], r.get('r2_thumbnail_url') or '') for r in (result.data or []))
+        except Exception as e:
+            print(f"  ⚠ Could not confirm unchanged rows, writing them: {str(e)}")
+            return set()
 
-        # Estimated CPM
-        data['estimated_cpm'] = round(min(followers / 1000 * 1.5, 150), 2)
+        unchanged = {account_id for account_id, url in hits.items() if live.get(account_id) == url}
+        self.fingerprints.forget(set(hits) - unchanged)
+        return unchanged
 
-        # Cost efficiency
-        data['cost_efficiency'] = round(100 / (data['estimated_cpm'] + 1), 2)
+    def remember(self, data: Dict[str, Any]) -> None:
+        """Store the fingerprint of a row written to the DB with its thumbnail"""
+        if self.fingerprints is None:
+            return
 
-        # Follower tier
-        data['follower_tier'] = self.determine_follower_tier(followers)
+        # Leave rows whose thumbnail failed out, so the next run retries them
+        if data['thumbnail_url'] and not data['r2_thumbnail_url']:
+            return
+        self.fingerprints.store(data['account_id'], row_fingerprint(data), data['r2_thumbnail_url'])
 
-        # Extract email
-        data['email'] = self.extract_email(data['profile_intro'])
+    def save_record(self, data: Dict[str, Any]) -> Optional[Any]:
+        """Insert or update a processed record in the database, returning its ID"""
+        try:
+            # Check if record exists by account_id (which is unique)
+            existing = self.supabase.table('influencers').select('id').eq(
+                'account_id', data['account_id']
+            ).execute()
+
+            if existing.data and len(existing.data) > 0:
+                # Update existing record
+                print(f"  Found existing record (ID: {existing.data[0]['id']})")
+                update_data = data.to_row()
+                result = self.supabase.table('influencers').update(update_data).eq(
+                    'id', existing.data[0]['id']
+                ).execute()
+                print(f"  ✓ Updated in database (ID: {existing.data[0]['id']})")
+                self.count('db_updated')
+                return existing.data[0]['id']
+            else:
+                # Insert new record
+                print(f"  Inserting new record...")
+                insert_data = data.to_row()
+
+                # Ensure required fields
+                if not insert_data.get('author_id'):
+                    insert_data['author_id'] = f"unknown_{data.get('account_id', 'unknown')}"
+
+                result = self.supabase.table('influencers').insert(insert_data).execute()
+                if result.data and len(result.data) > 0:
+                    new_id = result.data[0].get('id', 'unknown')
+                    print(f"  ✓ Inserted into database (New ID: {new_id})")
+                    self.count('db_inserted')
+                    return new_id
+                else:
+                    print(f"  ⚠ Insert returned no data")
 
-        # Set default values for additional fields
-        data['influencer_type'] = 'regular'
-        data['status'] = 'none'
-        data['saved'] = False
+        except Exception as e:
+            print(f"  ✗ Database error: {str(e)}")
+            self.stats['errors'].append(f"DB error for {data['account_id']}: {str(e)}")
 
-        return data
+        return None
 
-    def process_batch(self, records: List[Dict], start_idx: int = 0, batch_size: int = 10) -> None:
-        """Process a batch of records"""
+    def save_records(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Bulk upsert processed records keyed on account_id, returning one outcome per row"""
+        if not rows:
+            return []
+
+        print(f"\n  Upserting {len(rows)} records in bulk...")
+        # Like save_record, match on account_id (the TikTok handle) alone
+        outcomes = bulk_upsert_influencers(self.supabase, rows, match_author=False)
+        for outcome in outcomes:
+            if outcome['action'] == 'inserted':
+                self.count('db_inserted')
+            elif outcome['action'] == 'updated':
+                self.count('db_updated')
+            else:
+                print(f"  ✗ Database error for {outcome['account_id']}: {outcome['error']}")
+                self.stats['errors'].append(f"DB error for {outcome['account_id']}: {outcome['error']}")
+        print(f"  ✓ Bulk upsert done (inserted: {self.stats['db_inserted']}, updated: {self.stats['db_updated']})")
+        return outcomes
+
+    def process_batch(self, records: List[Dict], start_idx: int = 0, batch_size: int = 10,
+                      bulk: bool = False, offset: int = 0, total=None) -> None:
+        """
+        Process a batch of records.
+
+        When streaming, `records` is one batch read from the file; offset is its
+        position in the file and total ('?' if unknown) is used for progress output.
+        """
         end_idx = min(start_idx + batch_size, len(records))
         batch = records[start_idx:end_idx]
+        pending_rows = []
+        if total is None:
+            total = len(records)
 
-        print(f"\nProcessing batch {start_idx+1}-{end_idx} of {len(records)} records...")
+        print(f"\nProcessing batch {offset+start_idx+1}-{offset+end_idx} of {total} records...")
 
-        for idx, record in enumerate(batch, start=start_idx):
+        # Normalize the batch first so its covers can be fetched together
+        normalized = []
+        for idx, record in enumerate(batch, start=offset + start_idx):
             try:
                 author_meta = record.get('authorMeta', {})
                 account_name = author_meta.get('nickName', 'Unknown')
-                print(f"\n[{idx+1}/{len(records)}] Processing {account_name}...")
+                print(f"\n[{idx+1}/{total}] Processing {account_name}...")
 
                 # Process record data
-                data = self.process_record(record)
+                normalized.append((idx, record, self.process_record(record)))
 
-                # Download and upload thumbnail
-                thumbnail_url = record.get('videoMeta', {}).get('coverUrl')
+            except Exception as e:
+                print(f"  ✗ Error processing record {idx}: {str(e)}")
+                self.stats['errors'].append(f"Record {idx} error: {str(e)}")
+
+        # Skip the thumbnail and DB write for rows that haven't changed
+        unchanged = self.unchanged_accounts([data for _, _, data in normalized])
+
+        items = []
+        covers = {}
+        for idx, record, data in normalized:
+            try:
+                if data['account_id'] in unchanged:
+                    print(f"\n[{idx+1}/{total}] ↷ {data['author_name']} unchanged since last write, skipping")
+                    self.count('unchanged')
+                    continue
+
+                thumbnail_url = self.cover_url(record, data)
                 if thumbnail_url:
-                    image_path = self.download_image(thumbnail_url, data['author_name'])
-                    if image_path:
-                        r2_url = self.upload_to_r2(image_path)
-                        data['r2_thumbnail_url'] = r2_url or ''
-                    else:
-                        data['r2_thumbnail_url'] = ''
-                else:
-                    data['r2_thumbnail_url'] = ''
-
-                # Insert into database
-                try:
-                    # Check if record exists by account_id (which is unique)
-                    existing = self.supabase.table('influencers').select('id').eq(
-                        'account_id', data['account_id']
-                    ).execute()
-
-                    if existing.data and len(existing.data) > 0:
-                        # Update existing record
-                        print(f"  Found existing record (ID: {existing.data[0]['id']})")
-                        update_data = {k: v for k, v in data.items() if k != 'id'}
-                        result = self.supabase.table('influencers').update(update_data).eq(
-                            'id', existing.data[0]['id']
-                        ).execute()
-                        print(f"  ✓ Updated in database (ID: {existing.data[0]['id']})")
-                        self.stats['db_updated'] += 1
-                    else:
-                        # Insert new record
-                        print(f"  Inserting new record...")
-                        insert_data = {k: v for k, v in data.items() if k != 'id'}
-
-                        # Ensure required fields
-                        if not insert_data.get('author_id'):
-                            insert_data['author_id'] = f"unknown_{data.get('account_id', 'unknown')}"
-
-                        result = self.supabase.table('influencers').insert(insert_data).execute()
-                        if result.data and len(result.data) > 0:
-                            new_id = result.data[0].get('id', 'unknown')
-                            print(f"  ✓ Inserted into database (New ID: {new_id})")
-                            self.stats['db_inserted'] += 1
-                        else:
-                            print(f"  ⚠ Insert returned no data")
-
-                except Exception as e:
-                    print(f"  ✗ Database error: {str(e)}")
-                    self.stats['errors'].append(f"DB error for {data['account_id']}: {str(e)}")
-
-                self.stats['processed'] += 1
+                    covers.setdefault(self.thumbnail_path(data['author_name']),
+                                      (thumbnail_url, data['author_name']))
+                items.append((idx, data, thumbnail_url))
+
+            except Exception as e:
+                print(f"  ✗ Error processing record {idx}: {str(e)}")
+                self.stats['errors'].append(f"Record {idx} error: {str(e)}")
+
+        # Download every cover of the batch in parallel
+        image_paths = self.download_images(covers)
+
+        # Resize them into dashboard variants across the transcoding pool
+        variants = self.transcode_images(image_paths)
+
+        for idx, data, thumbnail_url in items:
+            try:
+                print(f"\n[{idx+1}/{total}] Saving {data['author_name']}...")
+
+                # Upload thumbnail
+                target = self.thumbnail_path(data['author_name'])
+                image_path = image_paths.get(target) if thumbnail_url else None
+                self.upload_thumbnail(image_path, data, variants.get(target, []))
+
+                # Insert into database (deferred to one upsert per batch in bulk mode)
+                if bulk:
+                    pending_rows.append(data)
+                elif self.save_record(data) is not None:
+                    self.remember(data)
+
+                self.count('processed')
 
                 # No delay for faster processing
                 # time.sleep(0.1)
@@ -347,12 +524,28 @@ class InfluencerDataProcessor:
                 print(f"  ✗ Error processing record {idx}: {str(e)}")
                 self.stats['errors'].append(f"Record {idx} error: {str(e)}")
 
-    def process_json_file(self, file_path: str, test_mode: bool = False):
-        """Main processing function"""
+        if bulk:
+            for data, outcome in zip(pending_rows, self.save_records(pending_rows)):
+                if outcome['id'] is not None:
+                    self.remember(data)
+
+    def process_json_file(self, file_path: str, test_mode: bool = False, pipeline: bool = False,
+                          bulk: bool = False, stream: bool = False, workers: int = 1,
+                          expiry_first: bool = False):
+        """Main processing function; expiry_first processes soonest-expiring covers first"""
         print("=" * 60)
         print(f"Influencer Data Processor - Round {self.scraping_round}")
         print("=" * 60)
 
+        if workers > 1:
+            self.process_json_sharded(file_path, workers, test_mode=test_mode, pipeline=pipeline, bulk=bulk)
+            return
+
+        if stream:
+            self.process_json_stream(file_path, test_mode=test_mode, pipeline=pipeline, bulk=bulk)
+            self.print_summary()
+            return
+
         # Read JSON file
         print(f"\nReading JSON file: {file_path}")
         with open(file_path, 'r', encoding='utf-8') as f:
@@ -365,12 +558,76 @@ class InfluencerDataProcessor:
             print("\n⚠️  TEST MODE: Processing only first 5 records")
             records = records[:5]
 
-        # Process in batches
-        batch_size = 10
-        for i in range(0, len(records), batch_size):
-            self.process_batch(records, i, batch_size)
+        if expiry_first:
+            # Fetch the covers whose signed URLs expire soonest first (rows are written in that order too)
+            print("\n⌛ EXPIRY-FIRST: Processing records by cover URL expiry")
+            records = by_expiry(records, lambda r: r.get('videoMeta', {}).get('coverUrl'))
+
+        if pipeline:
+            # Overlap download, R2 upload and DB upsert across records
+            print("\n⚡ PIPELINE MODE: Running fetch/upload/upsert stages concurrently")
+            asyncio.run(StagedIngestPipeline(self).run(records, total=len(records)))
+        else:
+            # Process in batches (bulk mode writes each batch with one upsert)
+            batch_size = DEFAULT_CHUNK_SIZE if bulk else 10
+            for i in range(0, len(records), batch_size):
+                self.process_batch(records, i, batch_size, bulk=bulk)
+
+        self.print_summary()
+
+    def process_json_stream(self, file_path: str, test_mode: bool = False, pipeline: bool = False,
+                            bulk: bool = False):
+        """Process a JSON array / JSON Lines (optionally gzipped) file in constant memory"""
+        print(f"\nStreaming records from: {file_path}")
+        records = iter_records(file_path)
 
-        # Print summary
+        if test_mode:
+            print("\n⚠️  TEST MODE: Processing only first 5 records")
+            records = islice(records, 5)
+
+        if pipeline:
+            # Overlap download, R2 upload and DB upsert across records
+            print("\n⚡ PIPELINE MODE: Running fetch/upload/upsert stages concurrently")
+            asyncio.run(StagedIngestPipeline(self).run(self._count_total(records)))
+        else:
+            # Only one batch is held in memory at a time
+            batch_size = DEFAULT_CHUNK_SIZE if bulk else 10
+            offset = 0
+            for batch in iter_batches(records, batch_size):
+                self.count('total', len(batch))
+                self.process_batch(batch, 0, batch_size, bulk=bulk, offset=offset, total='?')
+                offset += len(batch)
+
+    def process_json_sharded(self, file_path: str, workers: int, test_mode: bool = False,
+                             pipeline: bool = False, bulk: bool = False):
+        """Process the file in `workers` processes, partitioned by account_id hash"""
+        print(f"\n🔀 SHARDED MODE: {workers} worker processes, partitioned by account_id")
+        processor_kwargs = {'scraping_round': self.scraping_round,
+                            'skip_unchanged': self.fingerprints is not None,
+                            'content_addressed': self.content_index is not None,
+                            'diskless': self.diskless,
+                            'write_through': self.write_through,
+                            'transcode': self.transcoder is not None,
+                            # Shards share the CPUs instead of each starting one encoder per CPU
+                            'transcode_workers': max(1, (os.cpu_count() or 1) // workers),
+                            'perceptual': self.perceptual_index is not None}
+        if test_mode:
+            print("\n⚠️  TEST MODE: Processing only first 5 records")
+        shard_stats = run_sharded(type(self), processor_kwargs, file_path, workers,
+                                  key_of=self.account_key, limit=5 if test_mode else None,
+                                  pipeline=pipeline, bulk=bulk)
+
+        self.stats = merge_stats([self.stats] + shard_stats)
+        self.print_summary()
+
+    def _count_total(self, records):
+        """Count records into stats['total'] as they are streamed"""
+        for record in records:
+            self.count('total')
+            yield record
+
+    def print_summary(self):
+        """Print the run summary and save stats to file"""
         print("\n" + "=" * 60)
         print("PROCESSING COMPLETE")
         print("=" * 60)
@@ -378,8 +635,13 @@ class InfluencerDataProcessor:
         print(f"Processed: {self.stats['processed']}")
         print(f"Images downloaded: {self.stats['images_downloaded']}")
         print(f"Images uploaded to R2: {self.stats['images_uploaded']}")
+        print(f"Uploads skipped (already in R2): {self.stats['uploads_deduplicated']}")
+        print(f"Near-duplicate covers reused: {self.stats['near_duplicates_reused']}")
+        print(f"Thumbnail variants uploaded: {self.stats['variants_uploaded']}")
         print(f"Database records inserted: {self.stats['db_inserted']}")
         print(f"Database records updated: {self.stats['db_updated']}")
+        print(f"Unchanged (skipped): {self.stats['unchanged']}")
+        print(f"Expired cover URLs: {self.stats['covers_expired']}")
 
         if self.stats['errors']:
             print(f"\n⚠️  Errors encountered: {len(self.stats['errors'])}")
@@ -394,16 +656,47 @@ class InfluencerDataProcessor:
             json.dump(self.stats, f, indent=2, ensure_ascii=False)
         print(f"\n📊 Stats saved to: {stats_file}")
 
+        if self.stats['needs_rescrape']:
+            rescrape_file = f"needs_rescrape_round_{self.scraping_round}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+            with open(rescrape_file, 'w', encoding='utf-8') as f:
+                json.dump(self.stats['needs_rescrape'], f, indent=2, ensure_ascii=False)
+            print(f"⌛ {len(self.stats['needs_rescrape'])} rows need a re-scrape for fresh cover URLs: {rescrape_file}")
+
 def main():
     """Main entry point"""
     # Check if test mode
     test_mode = '--test' in sys.argv
+    pipeline = '--pipeline' in sys.argv
+    bulk = '--bulk' in sys.argv
+    stream = '--stream' in sys.argv
+    # Write every row even if its fingerprint is unchanged
+    force = '--force' in sys.argv
+    # Key R2 thumbnails by image SHA-256 and skip already-stored images
+    content_addressed = '--content-addressed' in sys.argv
+    # Upload covers from memory; --write-through also keeps the local copies
+    diskless = '--diskless' in sys.argv
+    write_through = '--write-through' in sys.argv
+    # Also upload card/table sized WebP + JPEG variants of every cover
+    transcode = '--transcode' in sys.argv
+    # Reuse the R2 key of a perceptually identical cover (see perceptual_index.py)
+    perceptual = '--perceptual' in sys.argv
+    if perceptual and not content_addressed:
+        print("Error: --perceptual needs --content-addressed")
+        sys.exit(1)
+    # Process records soonest-expiring cover URL first instead of in file order
+    expiry_first = '--expiry-first' in sys.argv
+    # Shard records by account_id across N processes (--workers N)
+    workers = int(sys.argv[sys.argv.index('--workers') + 1]) if '--workers' in sys.argv else 1
 
     # Initialize processor for round 5
-    processor = InfluencerDataProcessor(scraping_round=5)
+    processor = InfluencerDataProcessor(scraping_round=5, skip_unchanged=not force,
+                                        content_addressed=content_addressed,
+                                        diskless=diskless, write_through=write_through,
+                                        transcode=transcode, perceptual=perceptual)
 
     # Process the merged JSON file
-    processor.process_json_file('merged_influencers_1000.json', test_mode=test_mode)
+    processor.process_json_file('merged_influencers_1000.json', test_mode=test_mode, pipeline=pipeline,
+                                bulk=bulk, stream=stream, workers=workers, expiry_first=expiry_first)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -4,9 +4,13 @@ Extract video URLs from merged_influencers_1000.json
 and save them to a text file (one URL per line).
 """
 
-import json
+import sys
 from pathlib import Path
 
+# Shared pipeline modules live at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from record_stream import iter_records
+
 def extract_video_urls():
     """Extract video URLs from the merged influencers JSON file"""
 
@@ -19,34 +23,27 @@ def extract_video_urls():
         print(f"Error: {input_file} not found!")
         return
 
-    # Load JSON data
-    print(f"Loading {input_file}...")
-    with open(input_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-
-    print(f"Found {len(data)} records")
-
-    # Extract video URLs
-    video_urls = []
-    for record in data:
-        # Try to get video URL from webVideoUrl field
-        video_url = record.get('webVideoUrl', '')
-        if video_url:
-            video_urls.append(video_url)
-
-    # Write URLs to file
-    print(f"Writing {len(video_urls)} URLs to {output_file}...")
+    # Stream records and write URLs as they are found
+    print(f"Streaming {input_file} to {output_file}...")
+    total_records = 0
+    url_count = 0
     with open(output_file, 'w', encoding='utf-8') as f:
-        for url in video_urls:
-            f.write(url + '\n')
+        for record in iter_records(input_file):
+            total_records += 1
+
+            # Try to get video URL from webVideoUrl field
+            video_url = record.get('webVideoUrl', '')
+            if video_url:
+                f.write(video_url + '\n')
+                url_count += 1
 
-    print(f"✅ Successfully extracted {len(video_urls)} video URLs to {output_file}")
+    print(f"✅ Successfully extracted {url_count} video URLs to {output_file}")
 
     # Print some stats
     print(f"\nStats:")
-    print(f"  Total records: {len(data)}")
-    print(f"  Records with video URLs: {len(video_urls)}")
-    print(f"  Records without video URLs: {len(data) - len(video_urls)}")
+    print(f"  Total records: {total_records}")
+    print(f"  Records with video URLs: {url_count}")
+    print(f"  Records without video URLs: {total_records - url_count}")
 
 if __name__ == "__main__":
     extract_video_urls()
\ No newline at end of file
@@ -4,18 +4,15 @@ Merge script to combine 6th_vibers_pick.json and influencers_us_merged.json
 to create merged_influencers_1000.json for round 6 processing.
 """
 
+import sys
 import json
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Dict, Iterable, List, Any
 
-def load_json_file(file_path: str) -> List[Dict[str, Any]]:
-    """Load a JSON file and return its contents"""
-    print(f"Loading {file_path}...")
-    with open(file_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    print(f"  Loaded {len(data) if isinstance(data, list) else 1} records")
-    return data
+# Shared pipeline modules live at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from record_stream import iter_records
 
 def get_unique_key(record: Dict[str, Any]) -> str:
     """Generate a unique key for deduplication based on author info"""
@@ -32,10 +29,13 @@ def get_unique_key(record: Dict[str, Any]) -> str:
         # Fallback to video URL if no author info
         return record.get('webVideoUrl', str(hash(str(record))))
 
-def merge_and_deduplicate(vibers_data: List[Dict], us_data: List[Dict], target_count: int = 1000) -> List[Dict]:
+def merge_and_deduplicate(vibers_data: Iterable[Dict], us_data: Iterable[Dict], target_count: int = 1000) -> List[Dict]:
     """
     Merge two datasets and deduplicate, prioritizing vibers pick data.
     Returns up to target_count unique influencers.
+
+    Inputs may be lists or record streams (see record_stream.iter_records);
+    only the unique records kept are held in memory.
     """
     print("\n" + "=" * 60)
     print("MERGING INFLUENCER DATA")
@@ -139,9 +139,10 @@ def main():
         print(f"Error: {us_file} not found!")
         return
 
-    # Load data
-    vibers_data = load_json_file(str(vibers_file))
-    us_data = load_json_file(str(us_file))
+    # Stream both inputs - the US dump is only read until the target is reached
+    print(f"Streaming {vibers_file} and {us_file}...")
+    vibers_data = iter_records(vibers_file)
+    us_data = iter_records(us_file)
 
     # Merge and deduplicate
     merged_data = merge_and_deduplicate(vibers_data, us_data, target_count=1000)
@@ -4,20 +4,18 @@ Update image URLs in merged_influencers_1000.json with fresh URLs from 6th_for_i
 Remove records that don't have matching data in 6th_for_images.json
 """
 
+import sys
 import json
+import shutil
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Dict, Iterable, Iterator, Optional
 
-def load_json_file(file_path: str) -> List[Dict[str, Any]]:
-    """Load a JSON file and return its contents"""
-    print(f"Loading {file_path}...")
-    with open(file_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    print(f"  Loaded {len(data) if isinstance(data, list) else 1} records")
-    return data
+# Shared pipeline modules live at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from record_stream import iter_records, JsonArrayWriter
 
-def create_lookup_map(images_data: List[Dict]) -> Dict[str, str]:
+def create_lookup_map(images_data: Iterable[Dict], stats: Optional[Dict[str, int]] = None) -> Dict[str, str]:
     """
     Create a lookup map from various identifiers to new image URLs
     Key can be: webVideoUrl, author_id, or account_id
@@ -25,6 +23,9 @@ def create_lookup_map(images_data: List[Dict]) -> Dict[str, str]:
     lookup = {}
 
     for record in images_data:
+        if stats is not None:
+            stats['images_available'] = stats.get('images_available', 0) + 1
+
         # Get the new cover URL
         cover_url = record.get('videoMeta', {}).get('coverUrl')
         if not cover_url:
@@ -47,19 +48,22 @@ def create_lookup_map(images_data: List[Dict]) -> Dict[str, str]:
 
     return lookup
 
-def update_and_filter_records(merged_data: List[Dict], lookup_map: Dict[str, str]) -> List[Dict]:
+def update_and_filter_records(merged_data: Iterable[Dict], lookup_map: Dict[str, str],
+                              stats: Dict[str, int]) -> Iterator[Dict]:
     """
-    Update image URLs in merged data and filter out records without matches
+    Update image URLs in merged data and filter out records without matches.
+    Yields updated records one at a time and fills in `stats` as it goes.
     """
-    updated_records = []
-    stats = {
-        'total': len(merged_data),
+    stats.update({
+        'total': 0,
         'updated': 0,
         'removed': 0,
         'kept_without_update': 0
-    }
+    })
 
     for record in merged_data:
+        stats['total'] += 1
+
         # Try to find new image URL using various keys
         new_image_url = None
 
@@ -92,12 +96,13 @@ def update_and_filter_records(merged_data: List[Dict], lookup_map: Dict[str, str
                 record['videoMeta'] = {}
             record['videoMeta']['coverUrl'] = new_image_url
 
-            updated_records.append(record)
             stats['updated'] += 1
 
             # Show progress
             if stats['updated'] % 100 == 0:
                 print(f"  Updated {stats['updated']} records...")
+
+            yield record
         else:
             # No matching image found - remove this record
             stats['removed'] += 1
@@ -105,17 +110,16 @@ def update_and_filter_records(merged_data: List[Dict], lookup_map: Dict[str, str
             if stats['removed'] <= 5:  # Only show first 5 removed
                 print(f"  ✗ Removing record for {author_name} (no matching image)")
 
-    # Print statistics
+def print_update_stats(stats: Dict[str, int]) -> None:
+    """Print statistics collected by update_and_filter_records"""
     print("\n" + "=" * 60)
     print("UPDATE STATISTICS")
     print("=" * 60)
     print(f"Total original records: {stats['total']}")
     print(f"Records updated with new images: {stats['updated']}")
     print(f"Records removed (no matching image): {stats['removed']}")
-    print(f"Final record count: {len(updated_records)}")
-    print(f"Retention rate: {len(updated_records)/stats['total']*100:.1f}%")
-
-    return updated_records
+    print(f"Final record count: {stats['updated']}")
+    print(f"Retention rate: {stats['updated']/stats['total']*100:.1f}%")
 
 def main():
     """Main entry point"""
@@ -139,51 +143,45 @@ def main():
     print("IMAGE URL UPDATER")
     print("=" * 60)
 
-    merged_data = load_json_file(str(merged_file))
-    images_data = load_json_file(str(images_file))
-
-    # Create backup of original file
+    # Create backup of original file (byte copy, no need to parse it)
     print(f"\nCreating backup at {backup_file}...")
-    with open(backup_file, 'w', encoding='utf-8') as f:
-        json.dump(merged_data, f, indent=2, ensure_ascii=False)
+    shutil.copyfile(merged_file, backup_file)
     print("✓ Backup created")
 
-    # Create lookup map from images data
+    # Create lookup map from images data (only the URL map is kept in memory)
     print("\nCreating image URL lookup map...")
-    lookup_map = create_lookup_map(images_data)
+    stats = {}
+    lookup_map = create_lookup_map(iter_records(images_file), stats)
     print(f"  Created lookup map with {len(lookup_map)} entries")
 
-    # Update and filter records
+    # Update, filter and save records as a stream
     print("\nUpdating image URLs and filtering records...")
-    updated_data = update_and_filter_records(merged_data, lookup_map)
-
-    # Save updated data
-    print(f"\nSaving updated data to {output_file}...")
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(updated_data, f, indent=2, ensure_ascii=False)
+    print(f"Saving updated data to {output_file}...")
+    with JsonArrayWriter(output_file) as writer:
+        writer.write_all(update_and_filter_records(iter_records(backup_file), lookup_map, stats))
+    print_update_stats(stats)
 
-    print(f"✅ Successfully saved {len(updated_data)} records to {output_file}")
+    print(f"✅ Successfully saved {stats['updated']} records to {output_file}")
 
     # Also overwrite the original file with updated data
     print(f"\nOverwriting original {merged_file} with updated data...")
-    with open(merged_file, 'w', encoding='utf-8') as f:
-        json.dump(updated_data, f, indent=2, ensure_ascii=False)
+    shutil.copyfile(output_file, merged_file)
 
-    print(f"✅ Original file updated with {len(updated_data)} records")
+    print(f"✅ Original file updated with {stats['updated']} records")
     print(f"\n📁 Backup of original data saved to: {backup_file}")
 
     # Save update statistics
     stats_file = f"image_update_stats_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-    stats = {
-        'original_count': len(merged_data),
-        'images_available': len(images_data),
+    summary = {
+        'original_count': stats['total'],
+        'images_available': stats.get('images_available', 0),
         'lookup_entries': len(lookup_map),
-        'updated_count': len(updated_data),
-        'removed_count': len(merged_data) - len(updated_data),
-        'retention_rate': f"{len(updated_data)/len(merged_data)*100:.1f}%"
+        'updated_count': stats['updated'],
+        'removed_count': stats['total'] - stats['updated'],
+        'retention_rate': f"{stats['updated']/stats['total']*100:.1f}%"
     }
     with open(stats_file, 'w') as f:
-        json.dump(stats, f, indent=2)
+        json.dump(summary, f, indent=2)
     print(f"📊 Statistics saved to: {stats_file}")
 
 if __name__ == "__main__":
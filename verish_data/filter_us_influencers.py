@@ -8,11 +8,17 @@ This script filters influencer data to identify:
 3. Uncertain influencers (no clear location indicators)
 """
 
+import sys
 import json
 import re
+from pathlib import Path
 from typing import Dict, List, Tuple
 from datetime import datetime
 
+# Shared pipeline modules live at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from record_stream import iter_records, JsonArrayWriter
+
 
 class USInfluencerFilter:
     def __init__(self):
@@ -199,21 +205,31 @@ class USInfluencerFilter:
         }
 
         for influencer in data:
-            signature = influencer.get('authorMeta', {}).get('signature', '')
-            is_us, reason = self.is_us_influencer(signature)
+            category, influencer_copy = self.classify_influencer(influencer)
+            results[category].append(influencer_copy)
 
-            # Add reason to the influencer data for tracking
-            influencer_copy = influencer.copy()
-            influencer_copy['location_filter_reason'] = reason
+        return results
 
-            if is_us is True:
-                results['us'].append(influencer_copy)
-            elif is_us is False:
-                results['non_us'].append(influencer_copy)
-            else:
-                results['uncertain'].append(influencer_copy)
+    def classify_influencer(self, influencer: Dict) -> Tuple[str, Dict]:
+        """
+        Classify a single influencer.
 
-        return results
+        Returns:
+            Tuple[str, Dict]: ('us' | 'non_us' | 'uncertain', copy of the
+            influencer with location_filter_reason added)
+        """
+        signature = influencer.get('authorMeta', {}).get('signature', '')
+        is_us, reason = self.is_us_influencer(signature)
+
+        # Add reason to the influencer data for tracking
+        influencer_copy = influencer.copy()
+        influencer_copy['location_filter_reason'] = reason
+
+        if is_us is True:
+            return 'us', influencer_copy
+        elif is_us is False:
+            return 'non_us', influencer_copy
+        return 'uncertain', influencer_copy
 
 
 def main():
@@ -225,36 +241,52 @@ def main():
     # Initialize filter
     filter_tool = USInfluencerFilter()
 
-    # Load the data
+    # Stream the data - records are classified and written one at a time
     input_file = 'influencers_filtered_clean.json'
-    print(f"\nLoading data from {input_file}...")
-
-    try:
-        with open(input_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        print(f"Loaded {len(data)} influencers")
-    except FileNotFoundError:
+    if not Path(input_file).exists():
         print(f"Error: {input_file} not found!")
         return
-    except json.JSONDecodeError as e:
-        print(f"Error: Invalid JSON in {input_file}: {e}")
-        return
 
-    # Filter the data
-    print("\nFiltering influencers by location...")
-    results = filter_tool.filter_influencers(data)
-
-    # Save results to separate files
     output_files = {
-        'influencers_us_confirmed.json': results['us'],
-        'influencers_non_us.json': results['non_us'],
-        'influencers_uncertain.json': results['uncertain']
+        'us': 'influencers_us_confirmed.json',
+        'non_us': 'influencers_non_us.json',
+        'uncertain': 'influencers_uncertain.json'
     }
 
-    for filename, data_list in output_files.items():
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(data_list, f, indent=2, ensure_ascii=False)
-        print(f"Saved {len(data_list)} influencers to {filename}")
+    # Only counts and the samples needed for the report are kept in memory
+    counts = {'us': 0, 'non_us': 0, 'uncertain': 0}
+    us_reasons = {}
+    non_us_reasons = {}
+    uncertain_samples = []
+    total = 0
+
+    print(f"\nStreaming data from {input_file} and filtering influencers by location...")
+    try:
+        with JsonArrayWriter(output_files['us']) as us_writer, \
+                JsonArrayWriter(output_files['non_us']) as non_us_writer, \
+                JsonArrayWriter(output_files['uncertain']) as uncertain_writer:
+            writers = {'us': us_writer, 'non_us': non_us_writer, 'uncertain': uncertain_writer}
+
+            for influencer in iter_records(input_file):
+                category, influencer_copy = filter_tool.classify_influencer(influencer)
+                writers[category].write(influencer_copy)
+                total += 1
+
+                reason = influencer_copy.get('location_filter_reason', 'unknown')
+                if category == 'us' and counts['us'] < 100:  # Sample first 100
+                    us_reasons[reason] = us_reasons.get(reason, 0) + 1
+                elif category == 'non_us':
+                    non_us_reasons[reason] = non_us_reasons.get(reason, 0) + 1
+                elif category == 'uncertain' and len(uncertain_samples) < 10:
+                    uncertain_samples.append(influencer.get('authorMeta', {}).get('signature', 'No signature'))
+                counts[category] += 1
+    except json.JSONDecodeError as e:
+        print(f"Error: Invalid JSON in {input_file}: {e}")
+        return
+
+    print(f"Loaded {total} influencers")
+    for category, filename in output_files.items():
+        print(f"Saved {counts[category]} influencers to {filename}")
 
     # Generate summary report
     report_filename = f'filter_report_{datetime.now().strftime("%Y%m%d_%H%M%S")}.txt'
@@ -264,39 +296,30 @@ def main():
         f.write("=" * 50 + "\n\n")
         f.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
         f.write(f"Input file: {input_file}\n")
-        f.write(f"Total influencers processed: {len(data)}\n\n")
+        f.write(f"Total influencers processed: {total}\n\n")
 
         f.write("Results Summary:\n")
         f.write("-" * 30 + "\n")
-        f.write(f"US Confirmed: {len(results['us'])} ({len(results['us'])/len(data)*100:.1f}%)\n")
-        f.write(f"Non-US: {len(results['non_us'])} ({len(results['non_us'])/len(data)*100:.1f}%)\n")
-        f.write(f"Uncertain: {len(results['uncertain'])} ({len(results['uncertain'])/len(data)*100:.1f}%)\n\n")
+        f.write(f"US Confirmed: {counts['us']} ({counts['us']/total*100:.1f}%)\n")
+        f.write(f"Non-US: {counts['non_us']} ({counts['non_us']/total*100:.1f}%)\n")
+        f.write(f"Uncertain: {counts['uncertain']} ({counts['uncertain']/total*100:.1f}%)\n\n")
 
         # Sample reasons for US influencers
         f.write("Sample US Detection Reasons:\n")
         f.write("-" * 30 + "\n")
-        us_reasons = {}
-        for inf in results['us'][:100]:  # Sample first 100
-            reason = inf.get('location_filter_reason', 'unknown')
-            us_reasons[reason] = us_reasons.get(reason, 0) + 1
         for reason, count in sorted(us_reasons.items(), key=lambda x: -x[1])[:10]:
             f.write(f"  {reason}: {count}\n")
 
         # Sample reasons for non-US influencers
         f.write("\nSample Non-US Detection Reasons:\n")
         f.write("-" * 30 + "\n")
-        non_us_reasons = {}
-        for inf in results['non_us']:
-            reason = inf.get('location_filter_reason', 'unknown')
-            non_us_reasons[reason] = non_us_reasons.get(reason, 0) + 1
         for reason, count in sorted(non_us_reasons.items(), key=lambda x: -x[1])[:10]:
             f.write(f"  {reason}: {count}\n")
 
         # Sample uncertain signatures
         f.write("\nSample Uncertain Signatures:\n")
         f.write("-" * 30 + "\n")
-        for inf in results['uncertain'][:10]:
-            sig = inf.get('authorMeta', {}).get('signature', 'No signature')
+        for sig in uncertain_samples:
             # Clean signature for display
             sig_clean = sig.replace('\n', ' | ')[:100]
             f.write(f"  - {sig_clean}...\n" if len(sig) > 100 else f"  - {sig_clean}\n")